@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .models import User
+
+# Values are cached positionally: bump the version when User's columns change
+USER_KEY = 'auth-user:2:{}'
+
+# Never cached; loaded on first access, and save() then skips it
+UNCACHED_FIELDS = {'password'}
+
+
+class LocalUserCache:
+    """LRU of user field values with a per-entry TTL, shared by the threads of one process"""
+    
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            expires, values = entry
+            if expires < time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return values
+    
+    def set(self, user_id, values):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.timeout, values)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+    
+    def delete(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_users = LocalUserCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_LOCAL_TIMEOUT)
+
+
+def cached_fields():
+    return [field.attname for field in User._meta.concrete_fields if field.attname not in UNCACHED_FIELDS]
+
+
+def user_values(user):
+    return tuple(getattr(user, name) for name in cached_fields())
+
+
+def build_user(values):
+    # A fresh instance per request, with `password` deferred
+    return User.from_db('default', cached_fields(), values)
+
+
+def cache_user(user):
+    values = user_values(user)
+    local_users.set(user.pk, values)
+    cache.set(USER_KEY.format(user.pk), values, settings.AUTH_USER_CACHE_TIMEOUT)
+
+
+def forget_user(user_id):
+    """ลบผู้ใช้ออกจาก cache ทั้งในโปรเซสและ cache กลาง"""
+    local_users.delete(user_id)
+    cache.delete(USER_KEY.format(user_id))
+
+
+def lookup_id(user_id):
+    # Cache keys use the primary key; the token claim may be a string
+    field = User._meta.get_field(jwt_settings.USER_ID_FIELD)
+    return field.to_python(user_id)
+
+
+def get_cached_user(user_id):
+    """ผู้ใช้จาก cache ในโปรเซส, cache กลาง หรือฐานข้อมูล ตามลำดับ"""
+    user_id = lookup_id(user_id)
+    values = local_users.get(user_id)
+    if values is None:
+        values = cache.get(USER_KEY.format(user_id))
+        if values is None:
+            user = User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).defer(*UNCACHED_FIELDS).first()
+            if user is None:
+                return None
+            cache_user(user)
+            return user
+        local_users.set(user_id, values)
+    return build_user(values)
+
+
+async def aget_cached_user(user_id):
+    user_id = lookup_id(user_id)
+    values = local_users.get(user_id)
+    if values is None:
+        values = await cache.aget(USER_KEY.format(user_id))
+        if values is None:
+            user = await User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).defer(*UNCACHED_FIELDS).afirst()
+            if user is None:
+                return None
+            local_users.set(user_id, user_values(user))
+            await cache.aset(USER_KEY.format(user_id), user_values(user), settings.AUTH_USER_CACHE_TIMEOUT)
+            return user
+        local_users.set(user_id, values)
+    return build_user(values)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the user from a short-lived in-process
+    LRU, then the shared cache, before the database. Entries are dropped
+    when the user is saved (see accounts.signals), so profile edits,
+    password changes and deactivation take effect on the next request in
+    this process and within AUTH_USER_LOCAL_TIMEOUT seconds elsewhere.
+    """
+    
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
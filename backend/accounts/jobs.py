@@ -0,0 +1,19 @@
+from django.db import transaction
+
+from core.jobs import job
+from .authentication import forget_user
+from .models import User
+from .tokens import prune_revoked_tokens
+
+
+@job('accounts.mark_seller')
+def mark_seller(user_id):
+    """ตั้งผู้ใช้เป็นผู้ขายหลังเปิดร้าน"""
+    User.objects.filter(pk=user_id).update(is_seller=True)
+    # update() skips the post_save receiver that drops the cached user
+    transaction.on_commit(lambda: forget_user(user_id))
+
+
+@job('accounts.prune_revoked_tokens', concurrency=1)
+def prune_revoked_tokens_job():
+    prune_revoked_tokens()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.tokens import prune_revoked_tokens
+
+
+class Command(BaseCommand):
+    help = 'ลบ refresh token ที่ถูกยกเลิกและหมดอายุแล้ว (ควรตั้งให้รันวันละครั้ง)'
+    
+    def handle(self, *args, **options):
+        deleted = prune_revoked_tokens()
+        self.stdout.write(self.style.SUCCESS(f'ลบ token ที่หมดอายุแล้ว {deleted} รายการ'))
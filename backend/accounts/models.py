@@ -5,6 +5,8 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=20, blank=True)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    # Widths of the WebP/JPEG variants made from avatar so far (see core.images)
+    avatar_variants = models.JSONField(default=list, blank=True, editable=False)
     is_seller = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -29,4 +31,17 @@ class Address(models.Model):
         verbose_name_plural = "Addresses"
     
     def __str__(self):
-        return f"{self.full_name} - {self.city}"
\ No newline at end of file
+        return f"{self.full_name} - {self.city}"
+
+class RevokedToken(models.Model):
+    """
+    Refresh tokens that may no longer be used (rotated or logged out).
+    
+    Rows are only needed until the token would have expired anyway, so
+    they are bucketed by expiry day and pruned a day at a time.
+    """
+    jti = models.CharField(max_length=64, primary_key=True)
+    expires_on = models.DateField(db_index=True)
+    
+    def __str__(self):
+        return self.jti
@@ -1,13 +1,25 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.contrib.auth.password_validation import validate_password
+from core.images import variant_srcset
+from .authentication import get_cached_user
 from .models import User, Address
+from .tokens import is_revoked, revoke
 
 class UserSerializer(serializers.ModelSerializer):
+    avatar_srcset = serializers.SerializerMethodField()
+    
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 
-                  'phone', 'avatar', 'is_seller', 'created_at']
+                  'phone', 'avatar', 'avatar_srcset', 'is_seller', 'created_at']
         read_only_fields = ['id', 'created_at']
+    
+    def get_avatar_srcset(self, obj):
+        return variant_srcset(obj.avatar, obj.avatar_variants, self.context.get('request'))
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, 
@@ -35,4 +47,30 @@ class AddressSerializer(serializers.ModelSerializer):
     class Meta:
         model = Address
         fields = '__all__'
-        read_only_fields = ['user']
\ No newline at end of file
+        read_only_fields = ['user']
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """ต่ออายุ token โดยตรวจ/บันทึกการยกเลิกผ่าน accounts.tokens แทน token_blacklist"""
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if is_revoked(refresh):
+            raise InvalidToken('Token is blacklisted')
+        
+        user = get_cached_user(refresh.payload.get(jwt_settings.USER_ID_CLAIM))
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        
+        data = {'access': str(refresh.access_token)}
+        
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            # Losing this race means the token was already used
+            if jwt_settings.BLACKLIST_AFTER_ROTATION and not revoke(refresh):
+                raise InvalidToken('Token is blacklisted')
+            
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        
+        return data
@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.images import track_image_fields
+from .authentication import forget_user
+from .models import User
+
+track_image_fields(User, 'avatar')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def expire_cached_user(sender, instance, **kwargs):
+    # Profile edits, password changes and deactivation all save the user
+    user_id = instance.pk
+    forget_user(user_id)
+    # Again after commit, in case a request re-cached the old row meanwhile
+    transaction.on_commit(lambda: forget_user(user_id))
@@ -1,3 +1,129 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from core.jobs import run_pending
+from core.models import Job
+from .authentication import local_users
+from .models import RevokedToken, User
+from .tokens import prune_revoked_tokens
+
+
+def png(name):
+    image = BytesIO()
+    Image.new('RGB', (300, 300), 'blue').save(image, 'PNG')
+    return SimpleUploadedFile(name, image.getvalue(), content_type='image/png')
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_users.clear()
+        self.user = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='secret-pass-1'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+    
+    def test_user_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.client.get('/api/auth/profile/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.data['email'], 'buyer@example.com')
+    
+    def test_shared_cache_serves_other_processes(self):
+        self.client.get('/api/auth/profile/')
+        # Another process starts with an empty local LRU
+        local_users.clear()
+        with self.assertNumQueries(0):
+            self.client.get('/api/auth/profile/')
+    
+    def test_profile_update_invalidates(self):
+        self.client.get('/api/auth/profile/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch('/api/auth/profile/', {'phone': '0812345678'})
+        response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.data['phone'], '0812345678')
+        
+        # Saving the cached user must not touch the uncached password
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('secret-pass-1'))
+    
+    def test_deactivated_user_is_rejected(self):
+        self.client.get('/api/auth/profile/')
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.get(pk=self.user.pk)
+            user.is_active = False
+            user.save()
+        response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, 401)
+    
+    
+    def test_avatar_update(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, IMAGE_VARIANT_WIDTHS=(100,))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        for name in ('first.png', 'second.png'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch('/api/auth/profile/', {'avatar': png(name)}, format='multipart')
+            self.assertEqual(response.status_code, 200)
+            # The new file has no variants until the job has made them
+            self.assertIsNone(response.data['avatar_srcset'])
+            with self.captureOnCommitCallbacks(execute=True):
+                run_pending()
+            self.assertEqual(Job.objects.filter(status=Job.DONE).count(), Job.objects.count())
+            
+            response = self.client.get('/api/auth/profile/')
+            self.assertIn(name.replace('.png', '__w100.webp 100w'), response.data['avatar_srcset']['webp'])
+            self.assertEqual(User.objects.get(pk=self.user.pk).avatar_variants, [100])
+
+
+class RevokedTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_users.clear()
+        self.user = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='secret-pass-1'
+        )
+        self.client = APIClient()
+        self.refresh = str(RefreshToken.for_user(self.user))
+    
+    def test_rotated_token_cannot_be_reused(self):
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 200)
+        rotated = response.data['refresh']
+        self.assertNotEqual(rotated, self.refresh)
+        
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 401)
+        
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': rotated})
+        self.assertEqual(response.status_code, 200)
+    
+    def test_logout_revokes_refresh_token(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/auth/logout/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 200)
+        
+        cache.clear()  # answered by the table, not only the cache
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 401)
+    
+    def test_prune_drops_expired_days_only(self):
+        today = date(2026, 1, 10)
+        RevokedToken.objects.create(jti='old', expires_on=today - timedelta(days=1))
+        RevokedToken.objects.create(jti='current', expires_on=today)
+        
+        self.assertEqual(prune_revoked_tokens(today), 1)
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['current'])
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone as django_timezone
+
+from .models import RevokedToken
+
+REVOKED_KEY = 'revoked-token:{}'
+
+
+def expires_at(token):
+    return datetime.fromtimestamp(token['exp'], tz=timezone.utc)
+
+
+def remaining_seconds(token):
+    return max(int((expires_at(token) - django_timezone.now()).total_seconds()), 1)
+
+
+def is_revoked(token):
+    """ตรวจว่า refresh token ถูกยกเลิกแล้วหรือไม่ (cache ก่อน แล้วจึงถามฐานข้อมูล)"""
+    key = REVOKED_KEY.format(token['jti'])
+    revoked = cache.get(key)
+    if revoked is None:
+        revoked = RevokedToken.objects.filter(jti=token['jti']).exists()
+        # Both answers are kept until the token expires; revoke() overwrites
+        cache.set(key, revoked, remaining_seconds(token))
+    return revoked
+
+
+def revoke(token):
+    """
+    Revoke a refresh token. Returns False when it was already revoked, so
+    two concurrent refreshes of the same token cannot both rotate it.
+    """
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=token['jti'], expires_on=expires_at(token).date())
+    except IntegrityError:
+        return False
+    finally:
+        cache.set(REVOKED_KEY.format(token['jti']), True, remaining_seconds(token))
+    return True
+
+
+def prune_revoked_tokens(today=None):
+    """ลบรายการที่ token หมดอายุไปแล้ว คืนจำนวนแถวที่ลบ"""
+    # Tokens expiring today may still be valid for a few hours
+    today = today or datetime.now(timezone.utc).date()
+    deleted, _ = RevokedToken.objects.filter(expires_on__lt=today).delete()
+    return deleted
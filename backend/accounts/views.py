@@ -6,6 +6,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from .models import User, Address
 from .serializers import UserSerializer, RegisterSerializer, AddressSerializer
+from .tokens import revoke
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -77,7 +78,7 @@ class LogoutView(APIView):
         try:
             refresh_token = request.data["refresh"]
             token = RefreshToken(refresh_token)
-            token.blacklist()
+            revoke(token)
             return Response({'message': 'ออกจากระบบสำเร็จ'})
         except Exception:
             return Response({
@@ -9,9 +9,12 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import os
 from datetime import timedelta
 from pathlib import Path
 
+from .database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -40,6 +43,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
+    'core',
     'accounts',
     'products',
     'orders',
@@ -48,6 +52,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.db_router.PrimaryPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -81,13 +88,104 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# Configured from DATABASE_URL / DATABASE_REPLICA_URLS (see config/database.py)
+DATABASES = database_config(f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+
+# Apps whose reads may be served by a replica
+DATABASE_REPLICA_APPS = {'products', 'shops', 'orders'}
+
+# Seconds a user's reads stay on the primary after they write
+DATABASE_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'muangthai',
     }
 }
 
+# Seconds a cached API response is kept (see core.cache)
+RESPONSE_CACHE_TIMEOUT = 60 * 10
+
+# Authenticated users (see accounts.authentication): shared cache TTL, and
+# the size and TTL of each process's own LRU in front of it
+AUTH_USER_CACHE_TIMEOUT = 60 * 5
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_LOCAL_TIMEOUT = 10
+
+
+# Rows each hot counter (Product.sold/stock, Shop.total_sold) is spread
+# over; compact_counters folds them back (see core.counters)
+COUNTER_SHARDS = 8
+
+# Bulk product import (see shops.imports): rows per INSERT, and how many
+# row errors are listed in the report
+PRODUCT_IMPORT_BATCH_SIZE = 500
+PRODUCT_IMPORT_MAX_ERRORS = 1000
+
+# Stock reservations (see orders.reservations): rows each product's
+# unreserved stock is spread over, and how long a cart holds its stock
+STOCK_SHARDS = 8
+STOCK_RESERVATION_SECONDS = 60 * 10
+
+
+# Worker id (0-1023) for time-ordered IDs such as order numbers (see
+# core.ids); must differ between processes running at the same time.
+# Unset, each process leases one from the database for this many seconds
+# at a time and renews it while it runs
+ID_WORKER_ID = os.environ.get('ID_WORKER_ID')
+ID_WORKER_LEASE_SECONDS = 60 * 10
+
+
+# Background jobs (see core.jobs and `manage.py run_jobs`): seconds before a
+# running job is presumed dead, retry backoff cap, how often workers look for
+# dead jobs, and how long finished jobs are kept
+JOB_TIMEOUT = 60 * 10
+JOB_MAX_RETRY_DELAY = 60 * 60
+JOB_MAINTENANCE_INTERVAL = 60
+JOB_RETENTION_DAYS = 7
+
+# Home page snapshot (see products.home): rebuilt every N seconds, with this
+# many best sellers/new arrivals and products per category
+HOME_FEED_INTERVAL = 60 * 5
+HOME_FEED_SIZE = 12
+HOME_FEED_CATEGORY_SIZE = 6
+
+# Jobs queued every N seconds by the workers
+JOB_SCHEDULE = {
+    'core.compact_counters': 60,
+    'core.prune_jobs': 60 * 60,
+    'orders.release_expired_reservations': 60 * 2,
+    'accounts.prune_revoked_tokens': 60 * 60 * 24,
+    'products.build_home_feed': HOME_FEED_INTERVAL,
+}
+
+
+# Response compression (see core.middleware.CompressionMiddleware): gzip, or
+# brotli when the brotli package is installed
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+# 4 is much faster than the default 11 for a few percent larger output
+COMPRESSION_BROTLI_QUALITY = 4
+COMPRESSION_CONTENT_TYPES = [
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/plain',
+    'text/css', 'text/javascript', 'application/javascript', 'image/svg+xml',
+]
+
+
+# Request instrumentation (see core.middleware)
+# Fraction of requests whose individual SQL timings are recorded
+METRICS_QUERY_SAMPLE_RATE = 0.01
+# /metrics requires "Authorization: Bearer <token>"; without a token it is
+# not served at all
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -135,14 +233,26 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",  # Vite default port
     "http://127.0.0.1:5173",
 ]
+# Lets the frontend read the file name of a download (e.g. order exports)
+CORS_EXPOSE_HEADERS = ['Content-Disposition']
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
-    ]
+    ],
+    # orjson-backed, same output as DRF's JSON classes (see core.renderers)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # JWT Settings
@@ -151,8 +261,17 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    # Revoked tokens live in accounts.RevokedToken (pruned by prune_revoked_tokens)
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.TokenRefreshSerializer',
 }
 
 AUTH_USER_MODEL = 'accounts.User'
 MEDIA_URL = '/media/'
+# Public address of the API, for absolute URLs built outside a request
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Widths of the resized WebP/JPEG copies made for uploaded images (see core.images)
+IMAGE_VARIANT_WIDTHS = (200, 400, 800)
+# Largest image fetched from a seller-supplied URL
+IMAGE_DOWNLOAD_MAX_BYTES = 10 * 1024 * 1024
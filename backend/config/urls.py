@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from core.views import metrics_view
 
 
 urlpatterns = [
@@ -10,6 +11,7 @@ urlpatterns = [
     path('api/', include('products.urls')),
      path('api/', include('orders.urls')), 
      path('api/', include('shops.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,18 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'run_at', 'locked_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'idempotency_key']
+    readonly_fields = ['locked_by', 'locked_at', 'slot', 'created_at', 'finished_at', 'last_error']
+    actions = ['retry']
+    
+    @admin.action(description='รันงานที่เลือกใหม่อีกครั้ง')
+    def retry(self, request, queryset):
+        retried = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(), slot=None, finished_at=None,
+        )
+        self.message_user(request, f'ส่งงานกลับเข้าคิว {retried} งาน')
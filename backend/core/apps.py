@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+    
+    def ready(self):
+        from django.utils.module_loading import autodiscover_modules
+        from rest_framework.serializers import BaseSerializer
+        from .middleware import timed_serializer_data
+        
+        BaseSerializer.data = timed_serializer_data(BaseSerializer.data)
+        # Register every app's background jobs (see core.jobs)
+        autodiscover_modules('jobs')
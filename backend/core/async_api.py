@@ -0,0 +1,60 @@
+from functools import wraps
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from accounts.authentication import aget_cached_user
+from .renderers import FastJSONRenderer
+
+renderer = FastJSONRenderer()
+
+
+def json_response(data, status=200):
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json')
+
+
+async def aget_user(request):
+    """ผู้ใช้จาก JWT ใน header (ผ่าน cache ของ accounts) หรือ AnonymousUser"""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = header and authentication.get_raw_token(header)
+    if not raw_token:
+        return AnonymousUser()
+    try:
+        token = authentication.get_validated_token(raw_token)
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except (InvalidToken, TokenError, KeyError):
+        raise exceptions.AuthenticationFailed('Given token not valid for any token type')
+    
+    user = await aget_cached_user(user_id)
+    if user is None:
+        raise exceptions.AuthenticationFailed('User not found')
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed('User is inactive')
+    return user
+
+
+def async_api_view(view):
+    """
+    Wrap an async read-only view: GET/HEAD only, DRF Request for query
+    parameters and absolute URLs, and DRF-style JSON error bodies.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        try:
+            return await view(Request(request), *args, **kwargs)
+        except exceptions.APIException as exc:
+            return json_response({'detail': exc.detail}, status=exc.status_code)
+        except Http404 as exc:
+            return json_response({'detail': str(exc) or 'Not found.'}, status=404)
+        except (ValidationError, ValueError) as exc:
+            return json_response({'detail': str(exc)}, status=400)
+    return wrapper
@@ -0,0 +1,82 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = 'response-cache:version:{}'
+RESPONSE_KEY = 'response-cache:{}'
+
+
+def get_versions(namespaces):
+    """เลขเวอร์ชันปัจจุบันของแต่ละ namespace"""
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Seed from the clock so an evicted counter never repeats an old version
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_version(*namespaces):
+    """ทำให้ response ที่ cache ไว้ของ namespace เหล่านี้หมดอายุ (หลัง commit)"""
+    def bump():
+        for namespace in namespaces:
+            key = VERSION_KEY.format(namespace)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, time.time_ns(), timeout=None)
+    transaction.on_commit(bump)
+
+
+def response_key(request, namespaces):
+    # Normalized query: sorted keys, empty values dropped
+    params = sorted(
+        (key, tuple(value for value in values if value != ''))
+        for key, values in request.query_params.lists()
+    )
+    params = [(key, values) for key, values in params if values]
+    parts = [request.path, repr(params), repr(get_versions(namespaces))]
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def cache_response(*namespaces, timeout=None):
+    """
+    Cache a viewset handler's response data under the current versions of
+    `namespaces` and answer If-None-Match with 304.
+    
+    The ETag is derived from the path, normalized query and versions, so
+    a revalidation costs a cache read and no database query.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            key = response_key(request, namespaces)
+            renderer = getattr(request, 'accepted_renderer', None)
+            etag = '"{}-{}"'.format(key, getattr(renderer, 'format', ''))
+            
+            if etag in request.headers.get('If-None-Match', ''):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                cached = cache.get(RESPONSE_KEY.format(key))
+                if cached is not None:
+                    response = Response(cached)
+                else:
+                    response = handler(self, request, *args, **kwargs)
+                    if response.status_code != status.HTTP_200_OK:
+                        return response
+                    cache.set(RESPONSE_KEY.format(key), response.data,
+                              timeout or settings.RESPONSE_CACHE_TIMEOUT)
+            
+            response['ETag'] = etag
+            response['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,115 @@
+import random
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import CounterShard
+
+
+def shard_key(model, object_id, field):
+    return {'model': model._meta.label_lower, 'object_id': object_id, 'field': field}
+
+
+def increment(model, object_id, field, delta):
+    """บวก `delta` เข้าที่ shard แบบสุ่มของคอลัมน์ `field` ของแถว `object_id`"""
+    if not delta:
+        return
+    index = random.randrange(settings.COUNTER_SHARDS)
+    shard = CounterShard.objects.filter(index=index, **shard_key(model, object_id, field))
+    if not shard.update(delta=F('delta') + delta):
+        CounterShard.objects.bulk_create(
+            [CounterShard(index=index, **shard_key(model, object_id, field))], ignore_conflicts=True
+        )
+        shard.update(delta=F('delta') + delta)
+
+
+def pending(model, field, object_ids):
+    """ส่วนต่างที่ยังไม่ถูกรวมเข้าคอลัมน์: {object_id: delta}"""
+    rows = (CounterShard.objects
+            .filter(model=model._meta.label_lower, field=field, object_id__in=object_ids)
+            .values('object_id')
+            .annotate(total=Sum('delta'))
+            .order_by())
+    return {row['object_id']: row['total'] for row in rows}
+
+
+def current(instance, field):
+    return getattr(instance, field) + pending(type(instance), field, [instance.pk]).get(instance.pk, 0)
+
+
+def with_pending(queryset, *fields):
+    """เติม `<field>_pending` (ผลรวมของ shard) ในแต่ละแถว โดยไม่เพิ่มจำนวน query"""
+    annotations = {}
+    for field in fields:
+        total = (CounterShard.objects
+                 .filter(model=queryset.model._meta.label_lower, field=field, object_id=OuterRef('pk'))
+                 .values('object_id')
+                 .annotate(total=Sum('delta'))
+                 .values('total'))
+        annotations[f'{field}_pending'] = Coalesce(Subquery(total, output_field=IntegerField()), 0)
+    return queryset.annotate(**annotations)
+
+
+def add_pending(data, instance, fields):
+    """Serializer helper: add annotated shard totals to the column values in `data`"""
+    for field in fields:
+        if field in data and hasattr(instance, f'{field}_pending'):
+            data[field] += getattr(instance, f'{field}_pending')
+    return data
+
+
+class SaveChangedFieldsMixin:
+    """
+    ModelSerializer mixin: an update writes only the fields it was given.
+    
+    A plain save() writes every column back as it was loaded, including
+    counters that compact() or another request moved in the meantime, so
+    those changes would be lost.
+    """
+    
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        auto_now = [field.name for field in instance._meta.concrete_fields if getattr(field, 'auto_now', False)]
+        instance.save(update_fields=[*validated_data, *auto_now])
+        return instance
+
+
+def discard(model, object_id, field):
+    """ทิ้งส่วนต่างที่ค้างอยู่ เมื่อคอลัมน์ถูกตั้งค่าใหม่ทั้งค่า (เช่น ผู้ขายแก้สต็อก)"""
+    CounterShard.objects.filter(**shard_key(model, object_id, field)).delete()
+
+
+def compact(batch_size=1000):
+    """
+    Fold shard deltas into their canonical columns and return how many
+    shards were folded. Each shard is reduced by exactly the amount that
+    was read, so increments made meanwhile are kept for the next pass.
+    """
+    folded = 0
+    last_id = 0
+    while True:
+        rows = list(CounterShard.objects
+                    .filter(id__gt=last_id)
+                    .exclude(delta=0)
+                    .order_by('id')
+                    .values_list('id', 'model', 'object_id', 'field', 'delta')[:batch_size])
+        if not rows:
+            return folded
+        last_id = rows[-1][0]
+        
+        totals = defaultdict(int)
+        with transaction.atomic():
+            for shard_id, label, object_id, field, delta in rows:
+                CounterShard.objects.filter(id=shard_id).update(delta=F('delta') - delta)
+                totals[label, object_id, field] += delta
+            for (label, object_id, field), delta in totals.items():
+                model = apps.get_model(label)
+                if not model.objects.filter(pk=object_id).update(**{field: F(field) + delta}):
+                    # The row is gone; its shards are garbage
+                    CounterShard.objects.filter(model=label, object_id=object_id).delete()
+        folded += len(rows)
@@ -0,0 +1,116 @@
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+# True once the current request should read from the primary
+use_primary = ContextVar('use_primary', default=False)
+
+PIN_KEY = 'db-primary-pin:{}'
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+class PrimaryReplicaRouter:
+    """
+    Reads of catalog, shop and order data go to a random replica; all
+    writes, and every read after a write, go to the primary.
+    """
+    
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if (not replicas or use_primary.get()
+                or model._meta.app_label not in settings.DATABASE_REPLICA_APPS):
+            return 'default'
+        return random.choice(replicas)
+    
+    def db_for_write(self, model, **hints):
+        # Read-after-write: the rest of this request reads from the primary
+        use_primary.set(True)
+        return 'default'
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def token_user_id(request):
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    try:
+        return AccessToken(header.split(' ', 1)[1])[jwt_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+
+
+def is_write(request):
+    return request.method not in ('GET', 'HEAD', 'OPTIONS')
+
+
+class PrimaryPinningMiddleware:
+    """
+    Sticky primary per user: after a user writes, their reads go to the
+    primary for DATABASE_PIN_SECONDS so they see their own changes while
+    replicas catch up.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+        
+        user_id = token_user_id(request)
+        pinned = is_write(request) or (
+            user_id is not None and cache.get(PIN_KEY.format(user_id)) is not None
+        )
+        token = use_primary.set(pinned)
+        try:
+            response = self.get_response(request)
+            wrote = use_primary.get() and is_write(request)
+        finally:
+            use_primary.reset(token)
+        
+        if wrote and user_id is not None:
+            cache.set(PIN_KEY.format(user_id), True, settings.DATABASE_PIN_SECONDS)
+        return response
+    
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+        
+        user_id = token_user_id(request)
+        pinned = is_write(request) or (
+            user_id is not None and await cache.aget(PIN_KEY.format(user_id)) is not None
+        )
+        token = use_primary.set(pinned)
+        try:
+            # Writes made through sync_to_async set use_primary in a copy of
+            # this context, which asgiref copies back when the call returns
+            response = await self.get_response(request)
+            wrote = use_primary.get() and is_write(request)
+        finally:
+            use_primary.reset(token)
+        
+        if wrote and user_id is not None:
+            await cache.aset(PIN_KEY.format(user_id), True, settings.DATABASE_PIN_SECONDS)
+        return response
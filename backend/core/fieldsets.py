@@ -0,0 +1,237 @@
+"""
+Sparse fieldsets for GET responses.
+
+    ?fields=id,name,items.quantity   return only these fields
+    ?omit=description                return everything but these
+    ?expand=category,items.product   nest the related object instead of its id
+
+Dotted names reach into nested serializers (`items.product_name`) and
+expanded relations (`shop.name`). Serializers opt in with FieldsetMixin,
+which prunes the output; views opt in with FieldsetViewMixin, whose
+sparse() narrows the queryset to the columns the chosen fields read
+(only() plus select_related for the relations they cross) and whose
+prefetch() builds Prefetch objects only for nested lists that are asked
+for. Write requests ignore the parameters, since the same fields are
+the serializer's input.
+
+Fields that do not map onto a column (SerializerMethodField, annotations)
+declare what they read in Meta.field_sources, e.g. {'image_srcset':
+['image']}; if a chosen field declares nothing, the queryset is left whole.
+Meta.expandable_fields maps a relation to (serializer, default fields),
+the serializer given as a class or a dotted path, optionally followed by
+the fields an expansion may select at all; fields left out (per-user or
+per-row queries, say) are dropped from dotted selections like `shop.name`.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer, ListSerializer, SerializerMethodField
+
+from .pagination import KeysetPagination
+
+PARAMS = ('fields', 'omit', 'expand')
+
+
+def split_names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class Fieldset:
+    """The fields/omit/expand selection for one serializer level"""
+    
+    def __init__(self, include=None, omit=(), expand=()):
+        # include=None keeps every field
+        self.include = set(include) if include is not None else None
+        self.omit = set(omit)
+        self.expand = set(expand)
+        self.nested = {}
+    
+    @classmethod
+    def from_request(cls, request):
+        """Fieldset ของ request หรือ None ถ้าไม่ได้ระบุ (หรือเป็น request ที่เขียนข้อมูล)"""
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        if not any(params.get(param) for param in PARAMS):
+            return None
+        fieldset = cls()
+        for name in split_names(params.get('fields')):
+            fieldset.add('include', name)
+        for name in split_names(params.get('omit')):
+            fieldset.add('omit', name)
+        for name in split_names(params.get('expand')):
+            fieldset.add('expand', name)
+        return fieldset
+    
+    def add(self, kind, path):
+        head, _, rest = path.partition('.')
+        if kind == 'include':
+            # items.quantity also selects items itself
+            if self.include is None:
+                self.include = set()
+            self.include.add(head)
+        if rest:
+            self.child(head).add(kind, rest)
+        elif kind != 'include':
+            getattr(self, kind).add(head)
+    
+    def child(self, name):
+        if name not in self.nested:
+            self.nested[name] = Fieldset()
+        return self.nested[name]
+    
+    def wants(self, name):
+        return (self.include is None or name in self.include) and name not in self.omit
+    
+    def expands(self, name):
+        return name in self.expand
+    
+    def narrowed(self):
+        return self.include is not None or bool(self.omit)
+
+
+class FieldsetMixin:
+    """Serializer mixin: return only the fields chosen by ?fields=/?omit=/?expand="""
+    
+    def get_fieldset(self):
+        if hasattr(self, 'fieldset'):
+            # Set by the parent serializer for nested ones
+            return self.fieldset
+        parent = self.parent
+        if parent is None or (isinstance(parent, ListSerializer) and parent.parent is None):
+            return Fieldset.from_request(self.context.get('request'))
+        return None
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return fields
+        
+        for name, (serializer_class, default_fields, *allowed) in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in fields and fieldset.expands(name):
+                if isinstance(serializer_class, str):
+                    serializer_class = import_string(serializer_class)
+                nested = fieldset.child(name)
+                if not nested.narrowed():
+                    nested.include = set(default_fields)
+                elif allowed:
+                    allowed = set(allowed[0])
+                    nested.include = allowed if nested.include is None else nested.include & allowed
+                source = fields[name].source
+                fields[name] = serializer_class(read_only=True, **({'source': source} if source != name else {}))
+        
+        fields = {name: field for name, field in fields.items() if fieldset.wants(name)}
+        for name, field in fields.items():
+            serializer = getattr(field, 'child', field)
+            if isinstance(serializer, FieldsetMixin):
+                serializer.fieldset = fieldset.child(name)
+        return fields
+
+
+def columns(serializer, prefix=''):
+    """
+    Lookups for only() that cover the serializer's chosen fields, or None
+    when some field's columns are unknown.
+    """
+    model = serializer.Meta.model
+    sources = getattr(serializer.Meta, 'field_sources', {})
+    lookups = []
+    for name, field in serializer.fields.items():
+        if isinstance(field, ListSerializer):
+            # Nested lists come from prefetch(), not from this row
+            continue
+        if name in sources:
+            lookups.extend(prefix + source for source in sources[name])
+            continue
+        if isinstance(field, SerializerMethodField) or field.source == '*':
+            return None
+        
+        attrs = field.source.split('.')
+        if attrs[0].startswith('get_') and attrs[0].endswith('_display'):
+            attrs[0] = attrs[0][len('get_'):-len('_display')]
+        try:
+            model._meta.get_field(attrs[0])
+        except FieldDoesNotExist:
+            return None
+        
+        if isinstance(field, BaseSerializer):
+            # Expanded relation, read through select_related
+            nested = columns(field, f"{prefix}{attrs[0]}__")
+            if nested is None:
+                return None
+            lookups.extend(nested)
+        else:
+            lookups.append(prefix + '__'.join(attrs))
+    return lookups
+
+
+def prune_queryset(queryset, serializer, keep=()):
+    """ให้ queryset อ่านเฉพาะคอลัมน์ที่ serializer ส่งออก"""
+    lookups = columns(serializer)
+    if lookups is None:
+        return queryset
+    # Relations the chosen fields cross; the others are no longer joined.
+    # Each one's foreign key has to be loaded to follow it.
+    relations = set()
+    for lookup in lookups:
+        parts = lookup.split('__')[:-1]
+        relations.update('__'.join(parts[:depth]) for depth in range(1, len(parts) + 1))
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*lookups, *relations, *keep)
+
+
+class FieldsetViewMixin:
+    """View mixin: read only what the chosen fields need"""
+    
+    def get_fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = Fieldset.from_request(self.request)
+        return self._fieldset
+    
+    def wants(self, name):
+        """ฟิลด์นี้ถูกส่งออกหรือไม่ (ใช้ตัดสินว่าจะ annotate/prefetch หรือเปล่า)"""
+        fieldset = self.get_fieldset()
+        return fieldset is None or fieldset.wants(name)
+    
+    def fieldset_serializer(self, serializer_class, fieldset):
+        serializer = serializer_class(context=self.get_serializer_context())
+        serializer.fieldset = fieldset
+        return serializer
+    
+    def sparse(self, queryset, serializer_class=None, paginator=None):
+        """ตัดคอลัมน์ที่ไม่ได้ส่งออกออกจาก queryset"""
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+        serializer = self.fieldset_serializer(serializer_class or self.get_serializer_class(), fieldset)
+        keep = []
+        paginator = paginator or self.paginator
+        if isinstance(paginator, KeysetPagination):
+            # The cursor is built from the ordering column
+            field, _ = paginator.get_ordering(self.request, queryset)
+            try:
+                queryset.model._meta.get_field(field)
+                keep.append(field)
+            except FieldDoesNotExist:
+                pass
+        return prune_queryset(queryset, serializer, keep)
+    
+    def prefetch(self, model, lookup, queryset, serializer_class, name=None, to_attr=None):
+        """
+        Prefetch ของรายการย่อย `name` (ค่าเริ่มต้นคือ lookup) ของ model ที่อ่าน
+        เฉพาะคอลัมน์ที่ต้องใช้ หรือ None ถ้าไม่ได้ขอรายการนั้น
+        """
+        name = name or lookup
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            if not fieldset.wants(name):
+                return None
+            # The foreign key back to the parent matches each item to its row
+            parent_key = model._meta.get_field(lookup).field.attname
+            serializer = self.fieldset_serializer(serializer_class, fieldset.child(name))
+            queryset = prune_queryset(queryset, serializer, [parent_key])
+        return Prefetch(lookup, queryset=queryset, to_attr=to_attr)
@@ -0,0 +1,247 @@
+"""
+Time-ordered unique IDs (Snowflake layout).
+
+A 63-bit integer made of milliseconds since EPOCH (41 bits, ~69 years),
+the worker id (10 bits) and a per-millisecond sequence (12 bits), so
+each process can make 4096 IDs per millisecond without asking the
+database or any other process (apart from renewing its worker id every
+few minutes). IDs from one worker always increase, and
+IDs from all workers sort by creation time to the millisecond, so new
+rows land at the end of an index instead of all over it.
+
+Worker ids must differ between processes that run at the same time.
+Each process leases one from the WorkerLease table the first time it
+makes an ID, renews the lease while it keeps making them and gives the id
+up by letting the lease lapse; another process takes over a lapsed id
+only after MAX_CLOCK_DRIFT_MS more, so the IDs of the old and the new
+holder never share a millisecond. A fixed id can be set instead:
+
+    ID_WORKER_ID    0-1023, unique per process (skips leasing)
+
+Order numbers are the ID in Crockford base32: 13 characters, digits and
+capitals without I/L/O/U, fixed width so they sort like the integers.
+Numbers issued before this scheme (ORD + 8 random hex digits) stay as
+they are: customers have them, and being shorter they can never equal a
+new one, so the unique index needs no backfill.
+"""
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+EPOCH_MS = int(EPOCH.timestamp() * 1000)
+
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# How far the clock may step back before next_id() refuses to wait it out
+MAX_CLOCK_DRIFT_MS = 5000
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ID_LENGTH = 13
+ORDER_PREFIX = 'ORD'
+
+
+class ClockMovedBackwards(Exception):
+    """The system clock went back further than MAX_CLOCK_DRIFT_MS"""
+
+
+class WorkerIdsExhausted(Exception):
+    """Every worker id is leased by a live process"""
+
+
+def configured_worker_id():
+    """ID_WORKER_ID as an int, or None to lease one"""
+    configured = getattr(settings, 'ID_WORKER_ID', None)
+    if configured in (None, ''):
+        return None
+    worker_id = int(configured)
+    if not 0 <= worker_id <= MAX_WORKER_ID:
+        raise ValueError(f'ID_WORKER_ID must be between 0 and {MAX_WORKER_ID}')
+    return worker_id
+
+
+def ms_to_datetime(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+class DatabaseLeases:
+    """Worker ids leased from WorkerLease rows"""
+    attempts = 5
+    
+    def lease_ms(self):
+        return settings.ID_WORKER_LEASE_SECONDS * 1000
+    
+    def acquire(self, owner, now):
+        """Lease a free or lapsed worker id for `owner`; (worker id, expiry in ms)"""
+        from .models import WorkerLease
+        
+        expires = now + self.lease_ms()
+        # The margin covers the clocks of other hosts
+        lapsed = ms_to_datetime(now - MAX_CLOCK_DRIFT_MS)
+        for _ in range(self.attempts):
+            stale = list(WorkerLease.objects.filter(expires_at__lt=lapsed).values_list('worker_id', 'owner')[:8])
+            random.shuffle(stale)
+            for worker_id, old_owner in stale:
+                # Compare-and-set: only one process wins a lapsed id
+                taken = WorkerLease.objects.filter(worker_id=worker_id, owner=old_owner, expires_at__lt=lapsed)
+                if taken.update(owner=owner, expires_at=ms_to_datetime(expires)):
+                    return worker_id, expires
+            
+            used = set(WorkerLease.objects.values_list('worker_id', flat=True))
+            free = [worker_id for worker_id in range(MAX_WORKER_ID + 1) if worker_id not in used]
+            if not free:
+                if stale:
+                    continue
+                break
+            worker_id = random.choice(free)
+            WorkerLease.objects.bulk_create([
+                WorkerLease(worker_id=worker_id, owner=owner, expires_at=ms_to_datetime(expires))
+            ], ignore_conflicts=True)
+            if WorkerLease.objects.filter(worker_id=worker_id, owner=owner).exists():
+                return worker_id, expires
+        raise WorkerIdsExhausted(f'No free worker id among {MAX_WORKER_ID + 1}')
+    
+    def renew(self, worker_id, owner, now):
+        """New expiry in ms, or None if the lease was lost"""
+        from .models import WorkerLease
+        
+        expires = now + self.lease_ms()
+        if WorkerLease.objects.filter(worker_id=worker_id, owner=owner).update(expires_at=ms_to_datetime(expires)):
+            return expires
+        return None
+
+
+def now_ms():
+    return time.time_ns() // 1_000_000
+
+
+class IdGenerator:
+    """Snowflake generator for one process; thread-safe"""
+    
+    def __init__(self, worker_id=None, clock=now_ms, leases=None):
+        self.clock = clock
+        self.leases = leases or DatabaseLeases()
+        self.lock = threading.Lock()
+        self.configured_worker_id = worker_id
+        self.reset()
+    
+    def reset(self):
+        # Also called in forked children, which must not share the parent's
+        # worker id or continue its sequence
+        self.worker_id = None
+        self.owner = None
+        self.lease_expires = None
+        self.last_ms = -1
+        self.sequence = 0
+    
+    def next_id(self):
+        with self.lock:
+            ms = self.clock()
+            self.ensure_worker_id(ms)
+            
+            if ms < self.last_ms:
+                if self.last_ms - ms > MAX_CLOCK_DRIFT_MS:
+                    raise ClockMovedBackwards(f'Clock moved back {self.last_ms - ms} ms')
+                # Small step back (NTP slew): wait until the clock catches up
+                ms = self.wait_until(self.last_ms)
+            
+            if ms == self.last_ms:
+                self.sequence = (self.sequence + 1) & MAX_SEQUENCE
+                if self.sequence == 0:
+                    # 4096 IDs this millisecond already; take the next one
+                    ms = self.wait_until(self.last_ms + 1)
+            else:
+                self.sequence = 0
+            self.last_ms = ms
+            
+            return ((ms - EPOCH_MS) << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self.sequence
+    
+    def ensure_worker_id(self, ms):
+        """Hold a worker id that stays leased well past `ms`"""
+        if self.worker_id is None:
+            fixed = self.configured_worker_id
+            if fixed is None:
+                fixed = configured_worker_id()
+            if fixed is not None:
+                self.worker_id = fixed
+            else:
+                self.lease(ms)
+        elif self.lease_expires is not None and ms >= self.lease_expires - self.leases.lease_ms() // 2:
+            # Renew once half of the lease has passed
+            expires = self.leases.renew(self.worker_id, self.owner, ms)
+            if expires is None:
+                # Lost, e.g. the process was suspended past its expiry
+                self.lease(ms)
+            else:
+                self.lease_expires = expires
+    
+    def lease(self, ms):
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.worker_id, self.lease_expires = self.leases.acquire(self.owner, ms)
+    
+    def wait_until(self, target_ms):
+        ms = self.clock()
+        while ms < target_ms:
+            time.sleep((target_ms - ms) / 1000)
+            ms = self.clock()
+        return ms
+
+
+generator = IdGenerator()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=generator.reset)
+
+
+def next_id():
+    """ID ใหม่ที่ไม่ซ้ำและเรียงตามเวลา (จำนวนเต็ม 63 บิต)"""
+    return generator.next_id()
+
+
+def drop_worker_id():
+    """ลืม worker id ของ process นี้ (เช่น เมื่อพบเลขซ้ำ) ID ถัดไปจะเช่า worker id ใหม่"""
+    with generator.lock:
+        generator.reset()
+
+
+def encode(value):
+    chars = []
+    for _ in range(ID_LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def decode(text):
+    value = 0
+    for char in text.upper():
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+
+def parse_id(value):
+    """แยก ID เป็น (เวลาที่สร้าง, worker id, sequence)"""
+    ms = (value >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS
+    created = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    return created, (value >> SEQUENCE_BITS) & MAX_WORKER_ID, value & MAX_SEQUENCE
+
+
+def order_number():
+    """เลขที่คำสั่งซื้อใหม่ เช่น ORD0J5ZK3M8Q2A7X (เรียงตามเวลาที่สั่ง)"""
+    return ORDER_PREFIX + encode(next_id())
+
+
+def parse_order_number(number):
+    """parse_id() ของเลขที่คำสั่งซื้อแบบใหม่ หรือ None ถ้าเป็นเลขรูปแบบเดิม"""
+    body = number[len(ORDER_PREFIX):] if number.startswith(ORDER_PREFIX) else ''
+    if len(body) != ID_LENGTH or any(char not in ALPHABET for char in body.upper()):
+        return None
+    return parse_id(decode(body))
@@ -0,0 +1,209 @@
+import ipaddress
+import os
+import socket
+from io import BytesIO
+from urllib.parse import urlsplit
+from urllib.request import HTTPRedirectHandler, build_opener
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_init, post_save
+from PIL import Image, ImageOps
+
+from .jobs import enqueue_many, job
+
+FORMATS = {
+    'webp': ('WEBP', '.webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', '.jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# (model, field names) registered through track_image_fields
+TRACKED_FIELDS = []
+
+
+def variant_widths():
+    return getattr(settings, 'IMAGE_VARIANT_WIDTHS', (200, 400, 800))
+
+
+def variants_field(field):
+    """Model field listing the widths generated for image field `field`"""
+    return f'{field}_variants'
+
+
+def variant_name(name, width, fmt):
+    """ชื่อไฟล์ย่อยแบบกำหนดได้: products/a.png -> products/a__w200.webp"""
+    root, _ = os.path.splitext(name)
+    return f'{root}__w{width}{FORMATS[fmt][1]}'
+
+
+def generate_variants(storage, name, force=False):
+    """สร้างรูปย่อยทุกขนาด/ทุกฟอร์แมตของไฟล์ต้นฉบับ คืนรายการความกว้างที่มีไฟล์ครบ"""
+    with storage.open(name) as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+    if original.mode in ('P', 'LA', 'PA'):
+        original = original.convert('RGBA')
+    
+    for width in variant_widths():
+        # Never upscale; small originals are re-encoded at their own size
+        image = original.copy()
+        image.thumbnail((width, width * 4), Image.LANCZOS)
+        for fmt, (pil_format, _, options) in FORMATS.items():
+            target = variant_name(name, width, fmt)
+            if storage.exists(target):
+                if not force:
+                    continue
+                storage.delete(target)
+            buffer = BytesIO()
+            _convert(image, fmt).save(buffer, pil_format, **options)
+            storage.save(target, ContentFile(buffer.getvalue()))
+    return list(variant_widths())
+
+
+def _convert(image, fmt):
+    if image.mode == 'RGBA':
+        if fmt == 'webp':
+            return image
+        # JPEG has no alpha; flatten onto white instead of black
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def record_variants(model, field, name, widths):
+    """บันทึกความกว้างของรูปย่อยที่สร้างแล้ว ในแถวที่ยังใช้ไฟล์ `name` อยู่"""
+    # save() rather than update(), so the model's receivers expire cached responses
+    for instance in model.objects.filter(**{field: name}):
+        setattr(instance, variants_field(field), widths)
+        instance.save(update_fields=[variants_field(field)])
+
+
+@job('core.image_variants', max_attempts=3, concurrency=2)
+def generate_variants_job(model, field, name):
+    model = apps.get_model(model)
+    widths = generate_variants(model._meta.get_field(field).storage, name)
+    record_variants(model, field, name, widths)
+
+
+def schedule_variants(*fieldfiles):
+    """สร้างรูปย่อยของไฟล์เหล่านี้เบื้องหลัง (ผ่านคิวงาน core.jobs)"""
+    enqueue_many('core.image_variants', [
+        {'model': fieldfile.field.model._meta.label, 'field': fieldfile.field.name, 'name': fieldfile.name}
+        for fieldfile in fieldfiles
+    ])
+
+
+def check_image(content):
+    """ValueError unless `content` (bytes) is an image Pillow can read"""
+    try:
+        Image.open(BytesIO(content)).verify()
+    except Exception:
+        raise ValueError('ไฟล์ไม่ใช่รูปภาพ')
+
+
+def check_public_url(url):
+    # Sellers supply these URLs; never fetch from inside our own network
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f'URL ไม่ถูกต้อง: {url}')
+    for info in socket.getaddrinfo(parts.hostname, parts.port or None):
+        if not ipaddress.ip_address(info[4][0]).is_global:
+            raise ValueError(f'URL ไม่ได้รับอนุญาต: {url}')
+    return parts
+
+
+class PublicRedirectHandler(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_public_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_opener = build_opener(PublicRedirectHandler)
+
+
+def download_image(url, max_bytes=None):
+    """ดาวน์โหลดรูปจาก URL สาธารณะ (http/https) คืน ContentFile"""
+    max_bytes = max_bytes or settings.IMAGE_DOWNLOAD_MAX_BYTES
+    parts = check_public_url(url)
+    
+    with _opener.open(url, timeout=10) as response:
+        content = response.read(max_bytes + 1)
+    if len(content) > max_bytes:
+        raise ValueError(f'รูปภาพใหญ่เกินไป: {url}')
+    check_image(content)
+    return ContentFile(content, name=os.path.basename(parts.path) or 'image')
+
+
+@job('core.remote_image', max_attempts=3, concurrency=4, retry_delay=60)
+def attach_remote_image(model, pk, field, url):
+    model = apps.get_model(model)
+    content = download_image(url)
+    file_field = model._meta.get_field(field)
+    name = file_field.storage.save(file_field.generate_filename(None, content.name), content)
+    model.objects.filter(pk=pk).update(**{field: name, variants_field(field): []})
+    record_variants(model, field, name, generate_variants(file_field.storage, name))
+
+
+def schedule_remote_images(model, field, urls):
+    """ดาวน์โหลดรูปจาก URL มาใส่ฟิลด์ `field` เบื้องหลัง; urls คือ [(pk, url), ...]"""
+    enqueue_many('core.remote_image', [
+        {'model': model._meta.label, 'pk': pk, 'field': field, 'url': url}
+        for pk, url in urls
+    ])
+
+
+def variant_srcset(fieldfile, widths, request=None):
+    """
+    คืนค่า {'webp': 'url 200w, ...', 'jpeg': ...} จากรูปย่อยขนาด `widths`
+    ที่สร้างไว้แล้ว หรือ None ถ้าไม่มีรูปหรือยังไม่มีรูปย่อย (ใช้รูปต้นฉบับแทน)
+    """
+    if not fieldfile or not widths:
+        return None
+    srcset = {}
+    for fmt in FORMATS:
+        entries = []
+        for width in widths:
+            url = fieldfile.storage.url(variant_name(fieldfile.name, width, fmt))
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            entries.append(f'{url} {width}w')
+        srcset[fmt] = ', '.join(entries)
+    return srcset
+
+
+def track_image_fields(model, *fields):
+    """
+    สร้างรูปย่อยอัตโนมัติเมื่อฟิลด์รูปของ model นี้ถูกอัปโหลดใหม่ (model
+    ต้องมีฟิลด์ <field>_variants ไว้เก็บความกว้างของรูปย่อยที่สร้างแล้ว)
+    """
+    for field in fields:
+        # Fails at import rather than on the first upload
+        model._meta.get_field(variants_field(field))
+    TRACKED_FIELDS.append((model, fields))
+    
+    def remember(sender, instance, **kwargs):
+        instance._image_names = {field: _field_name(instance, field) for field in fields}
+    
+    def schedule(sender, instance, created, **kwargs):
+        for field in fields:
+            name = _field_name(instance, field)
+            if name == instance._image_names.get(field):
+                continue
+            instance._image_names[field] = name
+            if not created:
+                # Those were the old file's; the new one has none until the job runs
+                sender.objects.filter(pk=instance.pk).update(**{variants_field(field): []})
+                setattr(instance, variants_field(field), [])
+            if name:
+                schedule_variants(getattr(instance, field))
+    
+    post_init.connect(remember, sender=model, weak=False)
+    post_save.connect(schedule, sender=model, weak=False)
+
+
+def _field_name(instance, field):
+    # Read from __dict__ so deferred fields are not fetched
+    value = instance.__dict__.get(field)
+    return getattr(value, 'name', value) or None
@@ -0,0 +1,239 @@
+"""
+Database-backed background jobs.
+
+Work that does not have to finish before the response (stat recounts,
+post-checkout bookkeeping, image processing) is registered with @job and
+queued with enqueue(). The row is written in the caller's transaction,
+so the job is as durable as the data it refers to and needs no broker.
+
+`manage.py run_jobs` claims queued rows with a conditional UPDATE, runs
+each job in a transaction together with marking it done, and retries
+failures with exponential backoff. Any number of workers may run; a job
+type's `concurrency` caps how many of its jobs run at once across all of
+them. Jobs listed in settings.JOB_SCHEDULE are queued every N seconds.
+"""
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# name -> JobType, filled by @job as apps import their jobs modules
+JOBS = {}
+
+# Candidates looked at per claim
+CLAIM_BATCH = 20
+
+
+class JobType:
+    def __init__(self, name, func, max_attempts, concurrency, timeout, retry_delay):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+    
+    def slots(self):
+        # NULL slots never collide, so unlimited types always claim
+        return [None] if self.concurrency is None else range(self.concurrency)
+    
+    def backoff(self, attempts):
+        """Seconds before retry number `attempts`: doubling, capped, with jitter"""
+        delay = min(self.retry_delay * 2 ** (attempts - 1), settings.JOB_MAX_RETRY_DELAY)
+        return delay * random.uniform(1, 1.25)
+
+
+class JobLost(Exception):
+    """The job was taken over by another worker while this one ran it"""
+
+
+def job(name, max_attempts=5, concurrency=None, timeout=None, retry_delay=10):
+    """
+    Register a function as the job type `name`. It is called with the
+    keyword arguments given to enqueue(), which must be JSON-serializable.
+    """
+    def decorator(func):
+        JOBS[name] = JobType(name, func, max_attempts, concurrency,
+                             timeout or settings.JOB_TIMEOUT, retry_delay)
+        return func
+    return decorator
+
+
+def enqueue(name, key=None, delay=0, **kwargs):
+    """
+    เพิ่มงาน `name` เข้าคิว (ใน transaction ของผู้เรียก) คืน Job
+    
+    With `key`, enqueueing again while a job with that key still exists
+    returns the existing job instead, so a retried request does not
+    repeat its side effects.
+    """
+    if name not in JOBS:
+        raise KeyError(f'Unknown job {name}')
+    job = Job(name=name, kwargs=kwargs, idempotency_key=key,
+              run_at=timezone.now() + timedelta(seconds=delay))
+    if key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=key)
+
+
+def enqueue_many(name, kwargs_list):
+    """เพิ่มงานชนิดเดียวกันหลายงานด้วย INSERT เดียว"""
+    if name not in JOBS:
+        raise KeyError(f'Unknown job {name}')
+    return Job.objects.bulk_create([Job(name=name, kwargs=kwargs) for kwargs in kwargs_list])
+
+
+class Worker:
+    """Claims and runs queued jobs; see the run_jobs command"""
+    
+    def __init__(self, worker_id=None, names=None, periodic=True):
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.names = names
+        self.periodic = periodic
+        self.stopping = False
+        self.last_maintenance = 0
+        # Schedule slot last queued per periodic job, to skip known work
+        self.scheduled = {}
+    
+    def run(self, once=False, sleep=1.0):
+        """ทำงานในคิวไปเรื่อย ๆ (once=True: หยุดเมื่อคิวว่าง) คืนจำนวนงานที่ทำ"""
+        done = 0
+        while not self.stopping:
+            close_old_connections()
+            if self.run_one():
+                done += 1
+            elif once:
+                break
+            else:
+                time.sleep(sleep)
+        close_old_connections()
+        return done
+    
+    def run_one(self):
+        now = time.monotonic()
+        if now - self.last_maintenance >= settings.JOB_MAINTENANCE_INTERVAL:
+            self.last_maintenance = now
+            self.requeue_stale()
+        if self.periodic:
+            self.schedule_periodic()
+        
+        job = self.claim()
+        if job is None:
+            return False
+        self.execute(job)
+        return True
+    
+    def schedule_periodic(self):
+        now = time.time()
+        for name, interval in settings.JOB_SCHEDULE.items():
+            if self.names and name not in self.names:
+                continue
+            slot = int(now // interval)
+            if self.scheduled.get(name) != slot:
+                # One job per interval however many workers race for it
+                enqueue(name, key=f'periodic:{name}:{slot}')
+                self.scheduled[name] = slot
+    
+    def requeue_stale(self):
+        """คืนงานที่ worker ค้างหรือตายไประหว่างทำ กลับเข้าคิว"""
+        now = timezone.now()
+        for name, job_type in JOBS.items():
+            stale = Job.objects.filter(name=name, status=Job.RUNNING,
+                                       locked_at__lt=now - timedelta(seconds=job_type.timeout))
+            stale.filter(attempts__gte=job_type.max_attempts).update(
+                status=Job.FAILED, slot=None, finished_at=now, last_error='Timed out',
+            )
+            if stale.update(status=Job.QUEUED, slot=None, run_at=now, last_error='Timed out'):
+                logger.warning('Re-queued timed out %s jobs', name)
+    
+    def claim(self):
+        # Skip types already at their concurrency limit
+        full = [
+            row['name']
+            for row in Job.objects.filter(status=Job.RUNNING).values('name').annotate(running=Count('id'))
+            if row['name'] in JOBS and JOBS[row['name']].concurrency is not None
+            and row['running'] >= JOBS[row['name']].concurrency
+        ]
+        candidates = Job.objects.filter(status=Job.QUEUED, run_at__lte=timezone.now()).exclude(name__in=full)
+        if self.names:
+            candidates = candidates.filter(name__in=self.names)
+        
+        for job_id, name in candidates.order_by('run_at', 'id').values_list('id', 'name')[:CLAIM_BATCH]:
+            job_type = JOBS.get(name)
+            if job_type is None:
+                Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+                    status=Job.FAILED, finished_at=timezone.now(), last_error=f'Unknown job {name}',
+                )
+                continue
+            for slot in job_type.slots():
+                try:
+                    with transaction.atomic():
+                        claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+                            status=Job.RUNNING, slot=slot, locked_by=self.worker_id,
+                            locked_at=timezone.now(), attempts=F('attempts') + 1,
+                        )
+                except IntegrityError:
+                    # Slot held by another running job of this type
+                    continue
+                if claimed:
+                    return Job.objects.get(pk=job_id)
+                # Another worker got it first
+                break
+        return None
+    
+    def execute(self, job):
+        job_type = JOBS[job.name]
+        mine = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=self.worker_id)
+        try:
+            # The job's writes commit together with its "done" mark, or not at all
+            with transaction.atomic():
+                job_type.func(**job.kwargs)
+                if not mine.update(status=Job.DONE, slot=None, finished_at=timezone.now(), last_error=''):
+                    raise JobLost(job.pk)
+        except JobLost:
+            logger.warning('Job %s was re-queued while it ran; discarded this run', job)
+        except Exception:
+            error = traceback.format_exc()
+            if job.attempts >= job_type.max_attempts:
+                logger.exception('Job %s failed after %s attempts', job, job.attempts)
+                mine.update(status=Job.FAILED, slot=None, finished_at=timezone.now(), last_error=error)
+            else:
+                logger.warning('Job %s failed (attempt %s), retrying', job, job.attempts, exc_info=True)
+                mine.update(status=Job.QUEUED, slot=None, last_error=error,
+                            run_at=timezone.now() + timedelta(seconds=job_type.backoff(job.attempts)))
+
+
+def run_pending(names=None):
+    """ทำงานที่ถึงเวลาแล้วทั้งหมดจนคิวว่าง โดยไม่ตั้งงานตามรอบเวลา (ใช้ในเทสต์)"""
+    return Worker(names=names, periodic=False).run(once=True)
+
+
+@job('core.compact_counters', concurrency=1)
+def compact_counters_job():
+    from .counters import compact
+    compact()
+
+
+@job('core.prune_jobs', concurrency=1)
+def prune_jobs(days=None):
+    """ลบงานที่เสร็จแล้วเก่ากว่า JOB_RETENTION_DAYS (งานที่ล้มเหลวเก็บไว้ตรวจสอบ)"""
+    cutoff = timezone.now() - timedelta(days=days or settings.JOB_RETENTION_DAYS)
+    Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()
@@ -0,0 +1,151 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+
+from products.models import Product
+
+
+class SimulatedLatency:
+    """หน่วงทุก SQL เพื่อจำลองฐานข้อมูลที่อยู่ห่างออกไปบนเครือข่าย"""
+    
+    def __init__(self, seconds):
+        self.seconds = seconds
+    
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'เทียบจำนวน request ที่ทำพร้อมกันได้ใน process เดียว ระหว่าง ASGI (async view) กับ WSGI (thread pool)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128])
+        parser.add_argument('--wsgi-threads', type=int, default=8, help='จำนวน worker thread ของ WSGI')
+        parser.add_argument('--db-latency', type=float, default=5.0, help='หน่วงแต่ละ SQL (ms)')
+    
+    def handle(self, *args, **options):
+        product = Product.objects.first()
+        paths = [('/api/products/{}/', '/api/async/products/{}/')] if product else []
+        paths.append(('/api/categories/', '/api/async/categories/'))
+        host = (settings.ALLOWED_HOSTS or ['localhost'])[0].lstrip('.') or 'localhost'
+        latency = SimulatedLatency(options['db_latency'] / 1000)
+        
+        # Install the delay on every thread's connection, including the ones
+        # created by the ASGI handler's per-request executors
+        original_ensure = connections['default'].__class__.ensure_connection
+        
+        def ensure_connection(connection):
+            original_ensure(connection)
+            if latency not in connection.execute_wrappers:
+                connection.execute_wrappers.append(latency)
+        connections['default'].__class__.ensure_connection = ensure_connection
+        
+        # Compare request handling, not the response cache in front of the sync views
+        no_cache = override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+        no_cache.enable()
+        try:
+            for sync_path, async_path in paths:
+                sync_path = sync_path.format(product.pk) if product else sync_path
+                async_path = async_path.format(product.pk) if product else async_path
+                self.stdout.write(f'\n{sync_path}  vs  {async_path}  (SQL +{options["db_latency"]}ms)')
+                for concurrency in options['concurrency']:
+                    wsgi = self.run_wsgi(sync_path, host, concurrency, options)
+                    asgi = asyncio.run(self.run_asgi(async_path, host, concurrency, options))
+                    self.stdout.write(
+                        f'  concurrency {concurrency:>4}:  WSGI {wsgi["rps"]:8.1f} req/s '
+                        f'(in-flight {wsgi["in_flight"]:>3}, p95 {wsgi["p95_ms"]:7.1f}ms)   '
+                        f'ASGI {asgi["rps"]:8.1f} req/s '
+                        f'(in-flight {asgi["in_flight"]:>3}, p95 {asgi["p95_ms"]:7.1f}ms)'
+                    )
+        finally:
+            connections['default'].__class__.ensure_connection = original_ensure
+            no_cache.disable()
+    
+    def summarize(self, started, latencies, in_flight):
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'rps': len(latencies) / elapsed,
+            'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0,
+            'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0,
+            'in_flight': in_flight,
+        }
+    
+    def run_wsgi(self, path, host, concurrency, options):
+        local = threading.local()
+        lock = threading.Lock()
+        state = {'current': 0, 'peak': 0}
+        
+        # A WSGI worker can only have as many requests in flight as threads;
+        # the rest of the clients wait, and that wait counts as latency
+        server_slots = threading.Semaphore(options['wsgi_threads'])
+        
+        def call(_):
+            client = getattr(local, 'client', None) or Client(HTTP_HOST=host)
+            local.client = client
+            started = time.perf_counter()
+            with server_slots:
+                with lock:
+                    state['current'] += 1
+                    state['peak'] = max(state['peak'], state['current'])
+                client.get(path)
+                with lock:
+                    state['current'] -= 1
+            return time.perf_counter() - started
+        
+        # One thread per concurrent client
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(call, range(options['requests'])))
+        return self.summarize(started, latencies, state['peak'])
+    
+    async def run_asgi(self, path, host, concurrency, options):
+        application = get_asgi_application()
+        semaphore = asyncio.Semaphore(concurrency)
+        state = {'current': 0, 'peak': 0}
+        latencies = []
+        
+        async def call():
+            async with semaphore:
+                scope = {
+                    'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                    'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                    'query_string': b'', 'headers': [(b'host', host.encode())],
+                    'client': ('127.0.0.1', 0), 'server': (host, 80),
+                }
+                requested = False
+                finished = asyncio.Event()
+                
+                async def receive():
+                    nonlocal requested
+                    if not requested:
+                        requested = True
+                        return {'type': 'http.request', 'body': b'', 'more_body': False}
+                    # The handler listens for a disconnect once the body is read
+                    await finished.wait()
+                    return {'type': 'http.disconnect'}
+                
+                async def send(message):
+                    if message['type'] == 'http.response.body' and not message.get('more_body'):
+                        finished.set()
+                
+                state['current'] += 1
+                state['peak'] = max(state['peak'], state['current'])
+                started = time.perf_counter()
+                await application(scope, receive, send)
+                latencies.append(time.perf_counter() - started)
+                state['current'] -= 1
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(call() for _ in range(options['requests'])))
+        return self.summarize(started, latencies, state['peak'])
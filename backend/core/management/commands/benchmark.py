@@ -0,0 +1,177 @@
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from orders.urls import router as orders_router
+from products.urls import router as products_router
+from shops.models import Shop
+from shops.urls import router as shops_router
+
+ROUTERS = [products_router, orders_router, shops_router]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'วัดความเร็ว endpoint ของ router ทุกตัวภายใน process (p50/p95/p99, จำนวน query, หน่วยความจำ)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--user', help='อีเมลผู้ใช้สำหรับ endpoint ที่ต้องล็อกอิน (ค่าเริ่มต้น: เจ้าของร้านที่มีคำสั่งซื้อมากที่สุด)')
+        parser.add_argument('--filter', default='', help='วัดเฉพาะ URL ที่มีข้อความนี้')
+        parser.add_argument('--warm-cache', action='store_true', help='ไม่ล้าง cache ก่อนแต่ละ request')
+        parser.add_argument('--output', help='ไฟล์ JSON สำหรับบันทึกผล')
+        parser.add_argument('--compare', help='ไฟล์ JSON ผลครั้งก่อนเพื่อเปรียบเทียบ')
+    
+    def handle(self, *args, **options):
+        shop = self.pick_shop(options['user'])
+        client = Client(HTTP_HOST=(settings.ALLOWED_HOSTS or ['localhost'])[0].lstrip('.') or 'localhost')
+        token = str(RefreshToken.for_user(shop.owner).access_token)
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        
+        results = []
+        for url in self.endpoint_urls(shop):
+            if options['filter'] not in url:
+                continue
+            row = self.measure(client, url, auth, options)
+            if not 200 <= row['status'] < 300:
+                # An error page's timing says nothing about the endpoint
+                self.stdout.write(self.style.WARNING(f"{url:<55} {row['status']:>3}  ข้าม (ไม่ได้ตอบสำเร็จ)"))
+                continue
+            results.append(row)
+            self.stdout.write(
+                f"{row['url']:<55} {row['status']:>3}  p50 {row['p50_ms']:8.2f}ms  p95 {row['p95_ms']:8.2f}ms  "
+                f"p99 {row['p99_ms']:8.2f}ms  queries {row['queries']:>4}  peak {row['peak_kb']:>8.0f}KB"
+            )
+        
+        report = {
+            'commit': self.git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'iterations': options['iterations'],
+            'warm_cache': options['warm_cache'],
+            'results': results,
+        }
+        output = options['output'] or f"bench-{report['commit'][:8] or 'local'}-{int(time.time())}.json"
+        with open(output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'บันทึกผลที่ {output}'))
+        
+        if options['compare']:
+            self.compare(options['compare'], results)
+    
+    def pick_shop(self, email):
+        shops = Shop.objects.select_related('owner')
+        if email:
+            shop = shops.filter(owner__email=email).first()
+        else:
+            shop = shops.annotate(lines=Count('order_items')).order_by('-lines').first()
+        if shop is None:
+            raise CommandError('ไม่พบร้านค้า ให้รัน seed_data ก่อน')
+        return shop
+    
+    def endpoint_urls(self, shop):
+        """list, detail และ GET action ของทุก viewset ที่ลงทะเบียนใน router"""
+        product = shop.products.order_by('-sold').first()
+        order = shop.owner.orders.first()
+        review = product and product.reviews.first()
+        samples = {'products': product and product.pk, 'categories': product and product.category_id,
+                   'orders': order and order.pk, 'shops': shop.slug, 'reviews': review and review.pk}
+        # Lists that need a filter
+        list_params = {'reviews': f'?product={product.pk}' if product else None}
+        
+        for router in ROUTERS:
+            for prefix, viewset, basename in router.registry:
+                base = f'/api/{prefix}/'
+                if prefix not in list_params:
+                    yield base
+                elif list_params[prefix]:
+                    yield base + list_params[prefix]
+                for extra in viewset.get_extra_actions():
+                    if 'get' in extra.mapping and not extra.detail:
+                        yield f'{base}{extra.url_path}/'
+                
+                lookup = samples.get(prefix)
+                if lookup is None:
+                    continue
+                yield f'{base}{lookup}/'
+                for extra in viewset.get_extra_actions():
+                    if 'get' in extra.mapping and extra.detail:
+                        yield f'{base}{lookup}/{extra.url_path}/'
+    
+    def request(self, client, url, auth, warm_cache):
+        """(response, body) โดยอ่าน response แบบ streaming จนจบ ให้เวลาที่วัดรวมการสร้างเนื้อหาด้วย"""
+        if not warm_cache:
+            cache.clear()
+        response = client.get(url, **auth)
+        if response.streaming:
+            return response, b''.join(response.streaming_content)
+        return response, response.content
+    
+    def measure(self, client, url, auth, options):
+        for _ in range(options['warmup']):
+            self.request(client, url, auth, options['warm_cache'])
+        
+        timings = []
+        queries = []
+        for _ in range(options['iterations']):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response, body = self.request(client, url, auth, options['warm_cache'])
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured.captured_queries))
+        
+        # Separate pass: tracemalloc slows requests down too much to time them
+        tracemalloc.start()
+        self.request(client, url, auth, options['warm_cache'])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        return {
+            'url': url,
+            'status': response.status_code,
+            'bytes': len(body),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': max(queries),
+            'peak_kb': round(peak / 1024, 1),
+        }
+    
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as fh:
+            previous = {row['url']: row for row in json.load(fh)['results']}
+        self.stdout.write(f'\nเทียบกับ {path}')
+        for row in results:
+            old = previous.get(row['url'])
+            if old is None:
+                continue
+            change = (row['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0
+            self.stdout.write(
+                f"{row['url']:<55} p95 {old['p95_ms']:8.2f} -> {row['p95_ms']:8.2f}ms ({change:+6.1f}%)  "
+                f"queries {old['queries']:>4} -> {row['queries']:>4}"
+            )
+    
+    def git_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                  cwd=settings.BASE_DIR, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ''
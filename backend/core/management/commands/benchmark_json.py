@@ -0,0 +1,92 @@
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.middleware import COMPRESSORS
+from core.renderers import FastJSONParser, FastJSONRenderer, orjson
+from products.models import Category, Product
+from products.serializers import ProductSerializer
+from shops.models import Shop
+
+NAMES = ['เสื้อยืดคอกลม ผ้าคอตตอน 100%', 'กระเป๋าสะพายข้าง หนัง PU', 'หูฟังบลูทูธ ไร้สาย',
+         'รองเท้าผ้าใบ Sneaker', 'นาฬิกาข้อมือ Smart Watch', 'ครีมกันแดด SPF50 PA+++']
+
+
+class Command(BaseCommand):
+    help = 'เทียบเวลา encode/decode และขนาดที่บีบอัดแล้วของหน้ารายการสินค้า ระหว่าง JSON ของ DRF กับ orjson'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--db', action='store_true', help='ใช้สินค้าจากฐานข้อมูลแทนข้อมูลสังเคราะห์')
+    
+    def handle(self, *args, **options):
+        products = self.db_products(options['products']) if options['db'] else self.synthetic(options['products'])
+        data = {
+            'next': 'http://localhost:8000/api/products/?cursor=eyJ2IjoiMjAyNi0wMS0wMSJ9',
+            'previous': None,
+            'results': ProductSerializer(products, many=True).data,
+        }
+        iterations = options['iterations']
+        self.stdout.write(f"{len(data['results'])} สินค้าต่อหน้า, {iterations} รอบ"
+                          + ('' if orjson else ' (ไม่ได้ติดตั้ง orjson: Fast* ทำงานแบบเดียวกับ DRF)'))
+        
+        drf = JSONRenderer().render(data)
+        fast = FastJSONRenderer().render(data)
+        self.stdout.write(f"ผลลัพธ์เหมือนกันทุกไบต์: {'ใช่' if drf == fast else 'ไม่'}")
+        
+        rows = [
+            ('encode DRF JSONRenderer', self.median(lambda: JSONRenderer().render(data), iterations), len(drf)),
+            ('encode FastJSONRenderer', self.median(lambda: FastJSONRenderer().render(data), iterations), len(fast)),
+            ('decode DRF JSONParser', self.median(lambda: JSONParser().parse(BytesIO(drf)), iterations), len(drf)),
+            ('decode FastJSONParser', self.median(lambda: FastJSONParser().parse(BytesIO(fast)), iterations), len(fast)),
+        ]
+        for encoding, compressor_class in COMPRESSORS.items():
+            def compress():
+                compressor = compressor_class()
+                return compressor.compress(fast) + compressor.finish()
+            rows.append((f'compress {encoding}', self.median(compress, iterations), len(compress())))
+        
+        for label, ms, size in rows:
+            self.stdout.write(f'{label:<26} {ms:9.2f}ms  {size / 1024:9.1f}KB')
+    
+    def median(self, func, iterations):
+        func()
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+    
+    def db_products(self, count):
+        return list(Product.objects.select_related('category', 'shop').order_by('-created_at')[:count])
+    
+    def synthetic(self, count):
+        """สินค้าในหน่วยความจำ (ไม่แตะฐานข้อมูล) ที่มีข้อความไทย ราคา และวันที่แบบข้อมูลจริง"""
+        categories = [Category(id=i, name=f'หมวดหมู่ {i}') for i in range(1, 11)]
+        shops = [Shop(id=i, name=f'ร้านค้าตัวอย่าง {i}', slug=f'shop-{i}') for i in range(1, 51)]
+        now = timezone.now()
+        products = []
+        for i in range(1, count + 1):
+            price = Decimal(99 + i % 900) + Decimal('0.50')
+            ratings = {f'rating_{star}': i % (star * 2 + 1) for star in range(1, 6)}
+            review_count = sum(ratings.values())
+            rating_sum = sum(star * ratings[f'rating_{star}'] for star in range(1, 6))
+            name = f'{NAMES[i % len(NAMES)]} รุ่น {i}'
+            products.append(Product(
+                id=i, name=name, description=f'{name} สินค้าคุณภาพดี ส่งไว มีรับประกัน ล็อต {i * 37 % 1000}',
+                price=price, original_price=price * 2, discount_percentage=50, stock=i % 200, sold=i * 7 % 5000,
+                rating=round(rating_sum / review_count, 2) if review_count else 0,
+                review_count=review_count, rating_sum=rating_sum, **ratings,
+                image=f'products/product-{i}.jpg', category=categories[i % 10], shop=shops[i % 50],
+                created_at=now - timedelta(minutes=i),
+            ))
+        return products
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import compact
+
+
+class Command(BaseCommand):
+    help = 'รวมยอดจาก counter shard กลับเข้าคอลัมน์หลัก (ควรตั้งให้รันทุกนาที)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        folded = compact(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'รวม counter shard แล้ว {folded} แถว'))
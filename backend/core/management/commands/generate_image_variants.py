@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.images import TRACKED_FIELDS, generate_variants, record_variants
+
+
+class Command(BaseCommand):
+    help = 'สร้างรูปย่อย (WebP/JPEG) ให้รูปที่อัปโหลดไว้แล้ว'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='สร้างใหม่แม้มีไฟล์อยู่แล้ว')
+    
+    def handle(self, *args, **options):
+        total = 0
+        for model, fields in TRACKED_FIELDS:
+            for field in fields:
+                storage = model._meta.get_field(field).storage
+                names = (model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                         .values_list(field, flat=True).order_by().distinct())
+                for name in names.iterator(chunk_size=500):
+                    try:
+                        widths = generate_variants(storage, name, force=options['force'])
+                        record_variants(model, field, name, widths)
+                        total += 1
+                    except Exception as exc:
+                        self.stderr.write(f'{model.__name__}.{field} {name}: {exc}')
+        
+        self.stdout.write(self.style.SUCCESS(f'สร้างรูปย่อยให้ {total} รูป'))
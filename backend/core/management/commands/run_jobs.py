@@ -0,0 +1,27 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = 'รันงานเบื้องหลังจากคิวในฐานข้อมูล (เปิดหลาย process ได้พร้อมกัน)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='หยุดเมื่อคิวว่าง')
+        parser.add_argument('--sleep', type=float, default=1.0, help='วินาทีที่รอเมื่อไม่มีงาน')
+        parser.add_argument('--only', action='append', metavar='NAME', help='รันเฉพาะงานชนิดนี้ (ระบุซ้ำได้)')
+        parser.add_argument('--worker-id', help='ชื่อ worker (ค่าเริ่มต้น: host:pid)')
+    
+    def handle(self, *args, **options):
+        worker = Worker(worker_id=options['worker_id'], names=options['only'])
+        
+        # Finish the current job, then exit
+        def stop(signum, frame):
+            worker.stopping = True
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        
+        done = worker.run(once=options['once'], sleep=options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'ทำงานเสร็จ {done} งาน'))
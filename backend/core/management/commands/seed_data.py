@@ -0,0 +1,217 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from core.cache import bump_version
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from products.search import index_products
+from shops.models import Shop, ShopFollower
+
+CATEGORY_NAMES = [
+    ('อิเล็กทรอนิกส์', '📱'), ('แฟชั่นผู้หญิง', '👗'), ('แฟชั่นผู้ชาย', '👔'), ('ความงาม', '💄'),
+    ('บ้านและสวน', '🏡'), ('อาหารและเครื่องดื่ม', '🍜'), ('กีฬา', '⚽'), ('ของเล่น', '🧸'),
+    ('สัตว์เลี้ยง', '🐶'), ('หนังสือ', '📚'), ('ยานยนต์', '🚗'), ('สุขภาพ', '💊'),
+]
+PRODUCT_WORDS = [
+    'เสื้อยืด', 'กางเกง', 'รองเท้า', 'กระเป๋า', 'โทรศัพท์มือถือ', 'หูฟัง', 'นาฬิกา', 'ครีมกันแดด',
+    'ลิปสติก', 'หม้อทอด', 'พัดลม', 'ตุ๊กตา', 'ลูกบอล', 'อาหารแมว', 'หนังสือนิยาย', 'ผ้าห่ม',
+    'wireless', 'pro', 'mini', 'cotton', 'smart', 'premium', 'usb-c', 'bluetooth',
+]
+ORDER_STATUSES = ['pending', 'confirmed', 'processing', 'shipping', 'delivered', 'cancelled']
+ORDER_STATUS_WEIGHTS = [5, 5, 5, 5, 70, 10]
+
+
+def zipf_weights(count, skew):
+    """น้ำหนักสะสมแบบ Zipf: แถวแรก ๆ ถูกเลือกบ่อยกว่ามาก (ใช้กับ random.choices)"""
+    return list(accumulate(1 / (rank ** skew) for rank in range(1, count + 1)))
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """ปิด auto_now_add ชั่วคราวเพื่อกำหนด created_at ย้อนหลังได้"""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'สร้างข้อมูลจำลองปริมาณมาก (ผู้ใช้ ร้าน สินค้า ผู้ติดตาม คำสั่งซื้อ) ด้วย bulk insert'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--shops', type=int, default=50)
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--followers', type=int, default=5000)
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--max-items', type=int, default=5, help='จำนวนรายการสูงสุดต่อคำสั่งซื้อ')
+        parser.add_argument('--skew', type=float, default=1.1, help='ค่า s ของการกระจายแบบ Zipf')
+        parser.add_argument('--days', type=int, default=365, help='กระจาย created_at ย้อนหลังกี่วัน')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--skip-search-index', action='store_true')
+    
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.tag = format(int(time.time()), 'x')
+        self.now = timezone.now()
+        
+        with manual_timestamps(User, Shop, Product, Order):
+            users = self.timed('users', self.create_users)
+            shops = self.timed('shops', self.create_shops, users)
+            categories = self.timed('categories', self.create_categories)
+            products = self.timed('products', self.create_products, shops, categories)
+            self.timed('followers', self.create_followers, users, shops)
+            self.timed('orders', self.create_orders, users, products)
+        
+        self.timed('shop stats', call_command, 'rebuild_shop_stats', verbosity=0)
+        # bulk_create sends no signals, so expire cached catalog responses here
+        bump_version('products', 'categories', 'shops')
+    
+    def timed(self, label, func, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.stdout.write(f'{label}: {time.perf_counter() - started:.1f}s')
+        return result
+    
+    def past(self):
+        return self.now - timedelta(seconds=self.random.uniform(0, self.options['days'] * 86400))
+    
+    def batches(self, objects):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def create_users(self):
+        password = make_password('password123')
+        users = (
+            User(username=f'seed_{self.tag}_{i}', email=f'seed_{self.tag}_{i}@example.com',
+                 password=password, first_name='ผู้ใช้', last_name=str(i), date_joined=self.past(),
+                 created_at=self.past())
+            for i in range(self.options['users'])
+        )
+        ids = []
+        for batch in self.batches(users):
+            ids.extend(user.pk for user in User.objects.bulk_create(batch))
+        return ids
+    
+    def create_shops(self, users):
+        owners = users[:self.options['shops']]
+        shops = Shop.objects.bulk_create([
+            Shop(owner_id=owner_id, name=f'ร้านค้า {self.tag} {i}', slug=f'seed-{self.tag}-{i}',
+                 description='ร้านค้าจำลอง', phone='0800000000', email=f'shop{i}@example.com',
+                 address='123 ถนนสุขุมวิท', city='กรุงเทพมหานคร', postal_code='10110',
+                 is_verified=i % 3 == 0, created_at=self.past())
+            for i, owner_id in enumerate(owners)
+        ], batch_size=self.batch_size)
+        User.objects.filter(pk__in=owners).update(is_seller=True)
+        return [shop.pk for shop in shops]
+    
+    def create_categories(self):
+        existing = {category.name: category.pk for category in Category.objects.all()}
+        missing = [Category(name=name, icon=icon) for name, icon in CATEGORY_NAMES if name not in existing]
+        Category.objects.bulk_create(missing)
+        return list(Category.objects.values_list('pk', flat=True))
+    
+    def create_products(self, shops, categories):
+        rng = self.random
+        shop_weights = zipf_weights(len(shops), self.options['skew'])
+        category_weights = zipf_weights(len(categories), 0.8)
+        
+        def generate():
+            for i in range(self.options['products']):
+                words = rng.sample(PRODUCT_WORDS, 3)
+                price = Decimal(str(round(rng.lognormvariate(5.5, 1.0), 2))).max(Decimal('1.00'))
+                discount = rng.choice([0, 0, 0, 10, 20, 30, 50])
+                yield Product(
+                    name=' '.join(words) + f' รุ่น {i}',
+                    description=f'{words[0]} คุณภาพดี ' * rng.randint(1, 8),
+                    price=price,
+                    original_price=(price * 100 / (100 - discount)).quantize(Decimal('0.01')) if discount else None,
+                    discount_percentage=discount,
+                    stock=rng.randint(0, 500),
+                    sold=int(rng.paretovariate(1.2)) - 1,
+                    rating=Decimal(str(round(rng.triangular(2.5, 5.0, 4.6), 2))),
+                    category_id=rng.choices(categories, cum_weights=category_weights)[0],
+                    shop_id=rng.choices(shops, cum_weights=shop_weights)[0],
+                    created_at=self.past(),
+                )
+        
+        products = []
+        for batch in self.batches(generate()):
+            with transaction.atomic():
+                created = Product.objects.bulk_create(batch)
+                if not self.options['skip_search_index']:
+                    index_products(created)
+            products.extend((product.pk, product.price, product.shop_id, product.name) for product in created)
+        
+        for shop_id in shops:
+            Shop.objects.filter(pk=shop_id).update(
+                total_products=Product.objects.filter(shop_id=shop_id).count()
+            )
+        return products
+    
+    def create_followers(self, users, shops):
+        shop_weights = zipf_weights(len(shops), self.options['skew'])
+        followers = (
+            ShopFollower(user_id=self.random.choice(users),
+                         shop_id=self.random.choices(shops, cum_weights=shop_weights)[0])
+            for _ in range(self.options['followers'])
+        )
+        for batch in self.batches(followers):
+            ShopFollower.objects.bulk_create(batch, ignore_conflicts=True)
+    
+    def create_orders(self, users, products):
+        rng = self.random
+        product_weights = zipf_weights(len(products), self.options['skew'])
+        
+        def generate():
+            for i in range(self.options['orders']):
+                lines = [
+                    (rng.choices(products, cum_weights=product_weights)[0], rng.randint(1, 3))
+                    for _ in range(rng.randint(1, self.options['max_items']))
+                ]
+                subtotal = sum(product[1] * quantity for product, quantity in lines)
+                shipping_fee = 0 if subtotal >= 200 else 30
+                order = Order(
+                    user_id=rng.choice(users), order_number=f'SEED{self.tag}{i:08d}'.upper(),
+                    full_name='ผู้ซื้อ ทดสอบ', phone='0800000000', address='99 ถนนพหลโยธิน',
+                    city='กรุงเทพมหานคร', district='จตุจักร', postal_code='10900',
+                    subtotal=subtotal, shipping_fee=shipping_fee, total=subtotal + shipping_fee,
+                    status=rng.choices(ORDER_STATUSES, weights=ORDER_STATUS_WEIGHTS)[0],
+                    payment_method=rng.choice(['cod', 'bank', 'credit']), created_at=self.past(),
+                )
+                yield order, lines
+        
+        for batch in self.batches(generate()):
+            with transaction.atomic():
+                orders = Order.objects.bulk_create([order for order, _ in batch])
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, product_id=product[0], shop_id=product[2],
+                              product_name=product[3], product_price=product[1],
+                              quantity=quantity, subtotal=product[1] * quantity)
+                    for order, (_, lines) in zip(orders, batch)
+                    for product, quantity in lines
+                ], batch_size=self.batch_size)
@@ -0,0 +1,89 @@
+import threading
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """ฮิสโตแกรมแบบ Prometheus แยกตาม label (ปลอดภัยเมื่อใช้หลาย thread)"""
+    
+    def __init__(self, name, help_text, labels, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+    
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self.series.items()}
+        for label_values, (counts, total, count) in sorted(snapshot.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+class Counter:
+    
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+    
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.series[label_values] = self.series.get(label_values, 0) + amount
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self.lock:
+            snapshot = dict(self.series)
+        for label_values, value in sorted(snapshot.items()):
+            lines.append(f'{self.name}{{{_labels(self.labels, label_values)}}} {value}')
+        return lines
+
+
+def _labels(names, values):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+REQUESTS = Counter('http_requests_total', 'Requests handled.', ('route', 'method', 'status'))
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Time spent in the view.', ('route', 'method'))
+DB_DURATION = Histogram('db_duration_seconds', 'Total SQL time per request.', ('route',))
+DB_QUERIES = Histogram('db_queries_per_request', 'SQL queries per request.', ('route',), COUNT_BUCKETS)
+DB_QUERY_DURATION = Histogram('db_query_duration_seconds', 'Duration of single SQL queries (sampled requests).',
+                              ('route',))
+SERIALIZE_DURATION = Histogram('serializer_duration_seconds', 'Time spent in serializer.data per request.',
+                               ('route',))
+
+METRICS = [REQUESTS, REQUEST_DURATION, DB_DURATION, DB_QUERIES, DB_QUERY_DURATION, SERIALIZE_DURATION]
+
+
+def render():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,272 @@
+import random
+import time
+import zlib
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from . import metrics
+
+# Timings of the request being handled in this thread/task (see RequestTimings)
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    
+    def __init__(self, sampled):
+        self.sampled = sampled
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.serialize_depth = 0
+        self.query_durations = []
+        self.elapsed = 0.0
+    
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook: runs around every SQL statement
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if self.sampled:
+                self.query_durations.append(elapsed)
+
+
+def timed_serializer_data(data_property):
+    """ห่อ BaseSerializer.data เพื่อจับเวลาการ serialize (นับเฉพาะชั้นนอกสุด)"""
+    fget = data_property.fget
+    
+    def data(serializer):
+        timings = current_timings.get()
+        if timings is None or timings.serialize_depth:
+            return fget(serializer)
+        timings.serialize_depth += 1
+        started = time.perf_counter()
+        try:
+            return fget(serializer)
+        finally:
+            timings.serialize_time += time.perf_counter() - started
+            timings.serialize_depth -= 1
+    
+    return property(data)
+
+
+class PerformanceMiddleware:
+    """
+    Per-request SQL count/time, serializer time and view time.
+    
+    Totals are sent back as a Server-Timing header and recorded in the
+    per-route histograms served by /metrics. Individual query durations are
+    only kept for a METRICS_QUERY_SAMPLE_RATE fraction of requests.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'METRICS_QUERY_SAMPLE_RATE', 0.01)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with self.timed() as timings, self.wrap_connections(timings):
+            response = self.get_response(request)
+        return self.record(request, response, timings)
+    
+    async def __acall__(self, request):
+        with self.timed() as timings:
+            # Connections are per thread and the async ORM queries from the
+            # request's thread-sensitive worker thread, so wrap that thread's
+            stack = await sync_to_async(self.wrap_connections)(timings)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        return self.record(request, response, timings)
+    
+    @contextmanager
+    def timed(self):
+        timings = RequestTimings(sampled=random.random() < self.sample_rate)
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            yield timings
+        finally:
+            current_timings.reset(token)
+            timings.elapsed = time.perf_counter() - started
+    
+    def wrap_connections(self, timings):
+        """ExitStack that counts SQL on this thread's connections until it is closed"""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timings))
+        return stack
+    
+    def record(self, request, response, timings):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else 'unmatched'
+        metrics.REQUESTS.inc(route, request.method, response.status_code)
+        metrics.REQUEST_DURATION.observe(timings.elapsed, route, request.method)
+        metrics.DB_DURATION.observe(timings.db_time, route)
+        metrics.DB_QUERIES.observe(timings.queries, route)
+        metrics.SERIALIZE_DURATION.observe(timings.serialize_time, route)
+        for duration in timings.query_durations:
+            metrics.DB_QUERY_DURATION.observe(duration, route)
+        
+        response['Server-Timing'] = (
+            f'db;dur={timings.db_time * 1000:.2f};desc="{timings.queries} queries", '
+            f'serialize;dur={timings.serialize_time * 1000:.2f}, '
+            f'total;dur={timings.elapsed * 1000:.2f}'
+        )
+        return response
+
+
+class GzipCompressor:
+    
+    def __init__(self):
+        # wbits=31: a gzip header and trailer around the deflate stream
+        self.stream = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    
+    def compress(self, data):
+        return self.stream.compress(data)
+    
+    def finish(self):
+        return self.stream.flush()
+
+
+class BrotliCompressor:
+    
+    def __init__(self):
+        self.stream = brotli.Compressor(mode=brotli.MODE_TEXT, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    
+    def compress(self, data):
+        return self.stream.process(data)
+    
+    def finish(self):
+        return self.stream.finish()
+
+
+# Preferred first when the client weighs them equally
+COMPRESSORS = {'br': BrotliCompressor, 'gzip': GzipCompressor} if brotli else {'gzip': GzipCompressor}
+
+
+def negotiate_encoding(accept_encoding, available=COMPRESSORS):
+    """เลือก encoding จาก Accept-Encoding ตามค่า q (None ถ้าไม่รับแบบที่มี)"""
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name.strip():
+            weights[name.strip().lower()] = q
+    
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress_chunks(chunks, compressor):
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_chunks(chunks, compressor):
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli for API responses, picked from the client's Accept-Encoding.
+    
+    Only the types in COMPRESSION_CONTENT_TYPES are compressed: JSON, CSV
+    and other text. HTML is left alone, since it can carry a CSRF token
+    next to reflected input (BREACH), and images are compressed already.
+    Bodies under COMPRESSION_MIN_SIZE are sent as they are. Streaming
+    responses such as order exports are compressed chunk by chunk as they
+    are sent.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+    
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+    
+    def compress(self, request, response):
+        if response.status_code < 200 or response.status_code in (204, 304):
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in settings.COMPRESSION_CONTENT_TYPES:
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        
+        compressor = COMPRESSORS[encoding]()
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_chunks(response.streaming_content, compressor)
+            else:
+                response.streaming_content = compress_chunks(response.streaming_content, compressor)
+            # The compressed length is not known up front
+            del response.headers['Content-Length']
+        else:
+            content = compressor.compress(response.content) + compressor.finish()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        
+        # The bytes differ from the identity encoding's, so a strong ETag becomes weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
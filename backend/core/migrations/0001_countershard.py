@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('field', models.CharField(max_length=50)),
+                ('index', models.PositiveSmallIntegerField()),
+                ('delta', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('model', 'object_id', 'field', 'index')},
+            },
+        ),
+    ]
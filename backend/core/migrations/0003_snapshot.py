@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Snapshot',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('etag', models.CharField(max_length=64)),
+                ('content', models.BinaryField()),
+                ('built_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,98 @@
+from django.db import models
+from django.utils import timezone
+
+
+class CounterShard(models.Model):
+    """
+    Pending change to a hot integer column, e.g. Product.sold.
+    
+    Writers add to one of COUNTER_SHARDS rows at random instead of
+    updating the canonical row; core.counters.compact folds the deltas
+    back into the column. The current value is the column plus the sum
+    of its shards.
+    """
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    field = models.CharField(max_length=50)
+    index = models.PositiveSmallIntegerField()
+    delta = models.BigIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['model', 'object_id', 'field', 'index']
+    
+    def __str__(self):
+        return f"{self.model}#{self.object_id}.{self.field}[{self.index}]: {self.delta:+d}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by `manage.py run_jobs` (see core.jobs).
+    
+    Rows are inserted in the caller's transaction, so a job exists only if
+    the work that asked for it committed. A running job holds one of its
+    type's concurrency slots; the partial unique index on (name, slot)
+    makes that limit hold across any number of workers.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    slot = models.PositiveSmallIntegerField(null=True, blank=True)
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'slot'], condition=models.Q(status='running'),
+                                    name='job_running_slot'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name}#{self.pk} ({self.status})"
+
+
+class Snapshot(models.Model):
+    """
+    A precomputed JSON document (e.g. the home feed), rendered once by a job
+    and served as is. See core.snapshots.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    etag = models.CharField(max_length=64)
+    content = models.BinaryField()
+    built_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.name} ({self.built_at:%Y-%m-%d %H:%M:%S})"
+
+
+class WorkerLease(models.Model):
+    """
+    A worker id for time-ordered IDs (see core.ids), held by one live
+    process until expires_at. The holder renews it while it runs; once
+    it has lapsed another process may take the id over.
+    """
+    worker_id = models.PositiveSmallIntegerField(primary_key=True)
+    owner = models.CharField(max_length=100)
+    expires_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.worker_id}: {self.owner} until {self.expires_at:%Y-%m-%d %H:%M:%S}"
@@ -0,0 +1,183 @@
+import datetime
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    แบ่งหน้าแบบ cursor โดยใช้ค่า (field, pk) ของแถวสุดท้ายเป็นตำแหน่ง
+    
+    Each page is `WHERE (field, pk) < (value, last_pk) ORDER BY field, pk
+    LIMIT n`, so page 1000 costs the same as page 1 as long as an index on
+    (field, id) exists. The pk tiebreaker keeps the order stable when many
+    rows share a value (e.g. sold=0).
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_param = api_settings.ORDERING_PARAM
+    invalid_cursor_message = 'Invalid cursor'
+    
+    # Default ordering and the fields ?ordering= may choose from
+    ordering = '-created_at'
+    ordering_fields = []
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request)
+        return self.set_page(list(queryset))
+    
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """แบบ async สำหรับ view ที่ใช้ async ORM"""
+        queryset = self.page_queryset(queryset, request)
+        return self.set_page([obj async for obj in queryset])
+    
+    def page_queryset(self, queryset, request):
+        """queryset ของหน้านี้ (ยังไม่ query) รวมแถวเกินหนึ่งแถวไว้ตรวจว่ามีหน้าถัดไป"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, descending = self.get_ordering(request, queryset)
+        
+        self.cursor = self.decode_cursor(request, queryset)
+        self.reverse = bool(self.cursor and self.cursor['r'])
+        
+        # Walking backwards flips the order; results are flipped back below
+        desc = descending != self.reverse
+        prefix = '-' if desc else ''
+        queryset = queryset.order_by(prefix + self.field, prefix + 'pk')
+        
+        if self.cursor is not None:
+            op = 'lt' if desc else 'gt'
+            bound = op + 'e'
+            value, pk = self.cursor['v'], self.cursor['k']
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{bound}': value}),
+                Q(**{f'{self.field}__{op}': value}) | Q(**{f'pk__{op}': pk}),
+            )
+        
+        return queryset[:self.page_size + 1]
+    
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+        
+        if self.reverse:
+            self.has_next, self.has_previous = self.cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        self.page = results
+        return results
+    
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+    
+    def get_ordering(self, request, queryset):
+        """คืนค่า (ชื่อฟิลด์, เรียงจากมากไปน้อยหรือไม่)"""
+        param = request.query_params.get(self.ordering_param, '')
+        first = param.split(',')[0].strip()
+        if first.lstrip('-') in self.ordering_fields:
+            return first.lstrip('-'), first.startswith('-')
+        
+        # Search results are ranked by relevance unless asked otherwise
+        if 'search_rank' in queryset.query.annotations:
+            return 'search_rank', True
+        
+        return self.ordering.lstrip('-'), self.ordering.startswith('-')
+    
+    def encode_cursor(self, item, reverse):
+        position = {'v': getattr(item, self.field), 'k': item.pk, 'r': int(reverse)}
+        encoded = urlsafe_b64encode(json.dumps(position, default=self.encode_value).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+    
+    @staticmethod
+    def encode_value(value):
+        # Full microsecond precision; DjangoJSONEncoder would truncate it
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+    
+    def decode_cursor(self, request, queryset):
+        """ตำแหน่งจาก ?cursor= ที่แปลงเป็นชนิดของฟิลด์แล้ว หรือ None; cursor ที่ใช้ไม่ได้คือ 404"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+            if not isinstance(cursor, dict) or not {'v', 'k', 'r'} <= cursor.keys() or cursor['r'] not in (0, 1):
+                raise ValueError
+            # Forged or stale cursors must fail here, not inside the query
+            return {
+                'v': self.cursor_value(self.ordering_field(queryset), cursor['v']),
+                'k': self.cursor_value(queryset.model._meta.pk, cursor['k']),
+                'r': cursor['r'],
+            }
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+    
+    def ordering_field(self, queryset):
+        if self.field in queryset.query.annotations:
+            return queryset.query.annotations[self.field].output_field
+        return queryset.model._meta.get_field(self.field)
+    
+    @staticmethod
+    def cursor_value(field, value):
+        if value is None or isinstance(value, (list, dict, bool)):
+            raise ValueError
+        value = field.to_python(value)
+        if value is None:
+            raise ValueError
+        # Beyond what the database's integers hold
+        if isinstance(value, int) and not -2 ** 63 <= value < 2 ** 63:
+            raise ValueError
+        return value
+    
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+    
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+    
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,69 @@
+"""
+Precomputed JSON documents.
+
+publish() renders a document once, with the API's JSON renderer, and
+stores the bytes and their ETag in a Snapshot row and under one cache
+key. Both writes replace the whole value, so a reader sees either the
+previous document or the new one, never a mix of the two. read() is one
+cache get; on a miss (a new process with its own local-memory cache, an
+eviction) it loads the row and puts it back in the cache.
+
+snapshot_response() serves a snapshot as it is stored: no queries, no
+serializers, no JSON encoding per request.
+"""
+import hashlib
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+
+from .models import Snapshot
+from .renderers import FastJSONRenderer
+
+SNAPSHOT_KEY = 'snapshot:{}'
+
+
+class SiteRequest:
+    """Stands in for a request when serializing outside one: absolute URLs on SITE_URL"""
+    
+    def build_absolute_uri(self, location=''):
+        return urljoin(settings.SITE_URL, location)
+
+
+def publish(name, data, timeout=None):
+    """เก็บ data เป็น snapshot ชื่อ name (แทนที่ของเดิมทั้งก้อน) คืน (etag, content)"""
+    content = FastJSONRenderer().render(data)
+    etag = hashlib.md5(content).hexdigest()
+    Snapshot.objects.update_or_create(name=name, defaults={
+        'etag': etag, 'content': content, 'built_at': timezone.now(),
+    })
+    transaction.on_commit(lambda: cache.set(SNAPSHOT_KEY.format(name), (etag, content), timeout))
+    return etag, content
+
+
+def read(name, timeout=None):
+    """(etag, content) ของ snapshot หรือ None ถ้ายังไม่เคยสร้าง"""
+    cached = cache.get(SNAPSHOT_KEY.format(name))
+    if cached is not None:
+        return cached
+    row = Snapshot.objects.filter(name=name).values_list('etag', 'content').first()
+    if row is None:
+        return None
+    cached = (row[0], bytes(row[1]))
+    cache.set(SNAPSHOT_KEY.format(name), cached, timeout)
+    return cached
+
+
+def snapshot_response(request, snapshot):
+    etag, content = snapshot
+    etag = f'"{etag}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
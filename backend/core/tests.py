@@ -0,0 +1,814 @@
+import gzip
+import json
+import multiprocessing
+import re
+import tempfile
+import threading
+import uuid
+from unittest import mock
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from products.models import Category, Product
+from products.reviews import record_review_change
+from products.views import ProductViewSet
+from accounts.models import User
+from shops.models import Shop
+from shops.views import ShopViewSet
+from .counters import compact, current, increment
+from . import ids, metrics
+from .db_router import PrimaryPinningMiddleware, PrimaryReplicaRouter, use_primary
+from .images import variant_name
+from .jobs import Worker, enqueue, job, run_pending
+from .middleware import COMPRESSORS, CompressionMiddleware, PerformanceMiddleware, brotli, negotiate_encoding
+from .models import CounterShard, Job, WorkerLease
+from .renderers import FastJSONParser, FastJSONRenderer
+
+# Calls made by the test job types below
+calls = []
+
+
+@job('tests.record', concurrency=1)
+def record_job(value):
+    calls.append(value)
+
+
+@job('tests.flaky', max_attempts=3)
+def flaky_job(shop_id):
+    # The write is rolled back along with the failed attempt
+    Shop.objects.filter(pk=shop_id).update(total_products=99)
+    raise RuntimeError('boom')
+
+DATABASES_WITH_REPLICA = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+    'replica_0': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+}
+
+
+@override_settings(DATABASES=DATABASES_WITH_REPLICA)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """Routing decisions only; no queries hit the replica alias"""
+    
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        # Earlier writes in this thread would otherwise pin us to the primary
+        token = use_primary.set(False)
+        self.addCleanup(use_primary.reset, token)
+    
+    def auth_header(self, user_id):
+        token = AccessToken()
+        token['user_id'] = user_id
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+    
+    def test_catalog_reads_use_replica(self):
+        self.assertEqual(self.router.db_for_read(Product), 'replica_0')
+        # Accounts stay on the primary so logins see fresh passwords
+        self.assertEqual(self.router.db_for_read(User), 'default')
+    
+    def test_reads_after_write_use_primary(self):
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+    
+    def test_user_is_pinned_after_write(self):
+        seen = []
+        
+        def view(request):
+            if request.method == 'POST':
+                self.router.db_for_write(Product)
+            seen.append(self.router.db_for_read(Product))
+            return HttpResponse()
+        
+        middleware = PrimaryPinningMiddleware(view)
+        middleware(self.factory.get('/api/products/', **self.auth_header(1)))
+        middleware(self.factory.post('/api/orders/', **self.auth_header(1)))
+        middleware(self.factory.get('/api/products/', **self.auth_header(1)))
+        middleware(self.factory.get('/api/products/', **self.auth_header(2)))
+        
+        self.assertEqual(seen, ['replica_0', 'default', 'default', 'replica_0'])
+        # Pinning is per request; nothing leaks into the caller's context
+        self.assertFalse(use_primary.get())
+    
+    async def test_user_is_pinned_after_async_write(self):
+        seen = []
+        
+        async def view(request):
+            if request.method == 'POST':
+                # As the async ORM does: the router runs in a worker thread
+                await sync_to_async(self.router.db_for_write)(Product)
+            seen.append(self.router.db_for_read(Product))
+            return HttpResponse()
+        
+        middleware = PrimaryPinningMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        await middleware(self.factory.post('/api/orders/', **self.auth_header(1)))
+        await middleware(self.factory.get('/api/products/', **self.auth_header(1)))
+        await middleware(self.factory.get('/api/products/', **self.auth_header(2)))
+        
+        self.assertEqual(seen, ['default', 'default', 'replica_0'])
+        self.assertFalse(use_primary.get())
+
+
+class CounterShardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shop = Shop.objects.create(owner=User.objects.create_user(
+            username='seller', email='seller@example.com', password='pass1234'
+        ), name='Shop', slug='shop')
+    
+    def test_increments_are_folded_into_the_column(self):
+        for _ in range(20):
+            increment(Shop, self.shop.pk, 'total_sold', 3)
+        increment(Shop, self.shop.pk, 'total_sold', -10)
+        
+        self.shop.refresh_from_db()
+        self.assertEqual(self.shop.total_sold, 0)
+        self.assertEqual(current(self.shop, 'total_sold'), 50)
+        # Reads through the API include the shards
+        self.assertEqual(self.client.get(f'/api/shops/{self.shop.slug}/').data['total_sold'], 50)
+        
+        compact()
+        self.shop.refresh_from_db()
+        self.assertEqual(self.shop.total_sold, 50)
+        self.assertEqual(current(self.shop, 'total_sold'), 50)
+        self.assertFalse(CounterShard.objects.exclude(delta=0).exists())
+    
+    
+    def moved_after_load(self, viewset):
+        """Patch viewset.get_object: after each load, compact and add a review, as a concurrent request would"""
+        original = viewset.get_object
+        loads = []
+        
+        def get_object(view):
+            loaded = original(view)
+            compact()
+            record_review_change(self.product.pk, new_rating=4)
+            loads.append(loaded)
+            return loaded
+        return mock.patch.object(viewset, 'get_object', get_object), loads
+    
+    def test_edits_keep_pending_counters(self):
+        self.product = Product.objects.create(name='Product', description='desc', price=100, stock=10,
+                                              category=Category.objects.create(name='Category'), shop=self.shop)
+        client = APIClient()
+        client.force_authenticate(self.shop.owner)
+        increment(Product, self.product.pk, 'sold', 5)
+        increment(Shop, self.shop.pk, 'total_sold', 5)
+        
+        patcher, loads = self.moved_after_load(ProductViewSet)
+        with patcher:
+            response = client.patch(f'/api/products/{self.product.pk}/', {'name': 'Renamed'}, format='json')
+            self.assertEqual(response.status_code, 200)
+            response = client.post(f'/api/products/{self.product.pk}/toggle_stock/')
+            self.assertEqual(response.status_code, 200)
+        
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.name, self.product.stock, self.product.sold), ('Renamed', 0, 5))
+        self.assertEqual((self.product.review_count, self.product.rating_4), (len(loads), len(loads)))
+        
+        patcher, loads = self.moved_after_load(ShopViewSet)
+        with patcher:
+            response = client.patch(f'/api/shops/{self.shop.slug}/', {'description': 'New'}, format='json')
+            self.assertEqual(response.status_code, 200)
+        self.shop.refresh_from_db()
+        self.assertEqual((self.shop.description, self.shop.total_sold), ('New', 5))
+        self.assertEqual(self.shop.review_count, Product.objects.get().review_count)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+    
+    def test_enqueued_jobs_run_once(self):
+        first = enqueue('tests.record', value=1)
+        enqueue('tests.record', value=2)
+        
+        self.assertEqual(run_pending(), 2)
+        self.assertEqual(calls, [1, 2])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), (Job.DONE, 1))
+        self.assertEqual(run_pending(), 0)
+    
+    def test_idempotency_key(self):
+        first = enqueue('tests.record', key='order:1', value=1)
+        with transaction.atomic():
+            second = enqueue('tests.record', key='order:1', value=1)
+        self.assertEqual(first.pk, second.pk)
+        run_pending()
+        # Still deduplicated after the job ran
+        enqueue('tests.record', key='order:1', value=1)
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(calls, [1])
+    
+    def test_failures_are_retried_with_backoff_then_failed(self):
+        shop = Shop.objects.create(owner=User.objects.create_user(
+            username='seller', email='seller@example.com', password='pass1234'
+        ), name='Shop', slug='shop')
+        job = enqueue('tests.flaky', shop_id=shop.pk)
+        
+        delays = []
+        for attempt in range(1, 4):
+            before = timezone.now()
+            with self.assertLogs('core.jobs', 'WARNING'):
+                self.assertEqual(run_pending(), 1)
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn('boom', job.last_error)
+            if attempt < 3:
+                self.assertEqual(job.status, Job.QUEUED)
+                delays.append((job.run_at - before).total_seconds())
+                # Not due yet
+                self.assertEqual(run_pending(), 0)
+                Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertGreater(delays[1], delays[0] * 1.5)
+        shop.refresh_from_db()
+        self.assertEqual(shop.total_products, 0)
+    
+    def test_concurrency_limit_spans_workers(self):
+        enqueue('tests.record', value=1)
+        enqueue('tests.record', value=2)
+        first, second = Worker('first', periodic=False), Worker('second', periodic=False)
+        
+        job = first.claim()
+        self.assertEqual(job.slot, 0)
+        # The only slot is taken, so the other worker gets nothing
+        self.assertIsNone(second.claim())
+        # Even when it does not know the type is full, the slot index refuses it
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Job.objects.filter(status=Job.QUEUED).update(status=Job.RUNNING, slot=0)
+        
+        first.execute(job)
+        self.assertIsNotNone(second.claim())
+    
+    def test_stale_jobs_are_requeued(self):
+        job = enqueue('tests.record', value=1)
+        claimed = Worker('dead', periodic=False).claim()
+        Job.objects.filter(pk=claimed.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.DONE, 2, Worker().worker_id))
+        # The dead worker finishing late has its run rolled back, not marked twice
+        with self.assertLogs('core.jobs', 'WARNING'):
+            Worker('dead', periodic=False).execute(claimed)
+        self.assertEqual(calls, [1, 1])
+    
+    @override_settings(JOB_SCHEDULE={'tests.record': 3600})
+    def test_periodic_jobs_are_queued_once_per_interval(self):
+        # Queued only; nothing runs here
+        Worker('first').schedule_periodic()
+        Worker('second').schedule_periodic()
+        self.assertEqual(Job.objects.filter(name='tests.record').count(), 1)
+
+
+
+def generate_ids(count, results):
+    # Runs in a forked process
+    results.put([ids.next_id() for _ in range(count)])
+
+
+class CountingLeases:
+    """Hands out worker ids 0, 1, 2, ... across forked processes (no database)"""
+    
+    def __init__(self):
+        self.next = multiprocessing.get_context('fork').Value('i', 0)
+    
+    def lease_ms(self):
+        return 60_000
+    
+    def acquire(self, owner, now):
+        with self.next.get_lock():
+            self.next.value += 1
+            return self.next.value - 1, now + self.lease_ms()
+    
+    def renew(self, worker_id, owner, now):
+        return now + self.lease_ms()
+
+
+class FakeClock:
+    def __init__(self, *readings):
+        self.readings = list(readings)
+    
+    def __call__(self):
+        return self.readings.pop(0) if len(self.readings) > 1 else self.readings[0]
+
+
+class IdGeneratorTests(SimpleTestCase):
+    start = ids.EPOCH_MS + 1000
+    
+    def test_layout_and_order_numbers(self):
+        generator = ids.IdGenerator(worker_id=5, clock=FakeClock(self.start, self.start, self.start + 1))
+        values = [generator.next_id() for _ in range(3)]
+        self.assertEqual([ids.parse_id(value)[1:] for value in values], [(5, 0), (5, 1), (5, 0)])
+        self.assertEqual(ids.parse_id(values[0])[0], ids.EPOCH + timedelta(seconds=1))
+        
+        numbers = ['ORD' + ids.encode(value) for value in values]
+        self.assertEqual(sorted(numbers), numbers)
+        self.assertEqual({len(number) for number in numbers}, {16})
+        self.assertEqual(ids.parse_order_number(numbers[1])[1:], (5, 1))
+        # Numbers from before the change are left alone
+        self.assertIsNone(ids.parse_order_number('ORD1A2B3C4D'))
+    
+    def test_sequence_overflow_moves_to_the_next_millisecond(self):
+        clock = FakeClock(*[self.start] * (ids.MAX_SEQUENCE + 2), self.start + 1)
+        generator = ids.IdGenerator(worker_id=1, clock=clock)
+        values = [generator.next_id() for _ in range(ids.MAX_SEQUENCE + 2)]
+        self.assertEqual(len(set(values)), len(values))
+        self.assertEqual(values, sorted(values))
+        self.assertEqual(ids.parse_id(values[-1])[0], ids.EPOCH + timedelta(seconds=1, milliseconds=1))
+    
+    def test_clock_moving_backwards(self):
+        generator = ids.IdGenerator(worker_id=1, clock=FakeClock(self.start + 10, self.start + 8, self.start + 10))
+        first = generator.next_id()
+        # Waits out a small step back instead of reusing a timestamp
+        self.assertGreater(generator.next_id(), first)
+        
+        generator.clock = FakeClock(self.start + 10 - ids.MAX_CLOCK_DRIFT_MS - 1)
+        with self.assertRaises(ids.ClockMovedBackwards):
+            generator.next_id()
+    
+    @override_settings(ID_WORKER_ID='1024')
+    def test_worker_id_out_of_range(self):
+        with self.assertRaises(ValueError):
+            ids.IdGenerator().next_id()
+    
+    def test_unique_across_threads(self):
+        generator = ids.IdGenerator(worker_id=1)
+        results = [[] for _ in range(4)]
+        threads = [
+            threading.Thread(target=lambda out: out.extend(generator.next_id() for _ in range(5000)), args=(out,))
+            for out in results
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        values = [value for out in results for value in out]
+        self.assertEqual(len(set(values)), 20000)
+    
+    @override_settings(ID_WORKER_ID=None)
+    def test_unique_across_processes(self):
+        patcher = mock.patch.object(ids.generator, 'leases', CountingLeases())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(ids.drop_worker_id)
+        ids.drop_worker_id()
+        # The parent has a worker id and sequence already; children must not reuse them
+        parent = [ids.next_id() for _ in range(100)]
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [context.Process(target=generate_ids, args=(20000, results)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        batches = [results.get(timeout=60) for _ in processes]
+        for process in processes:
+            process.join()
+        
+        values = parent + [value for batch in batches for value in batch]
+        self.assertEqual(len(set(values)), len(values))
+        for batch in batches:
+            self.assertEqual(batch, sorted(batch))
+        self.assertEqual(len({ids.parse_id(batch[0])[1] for batch in batches + [parent]}), 5)
+
+
+@override_settings(ID_WORKER_ID=None, ID_WORKER_LEASE_SECONDS=60)
+class WorkerLeaseTests(TestCase):
+    start = ids.EPOCH_MS + 1000
+    
+    def generator(self, *readings):
+        return ids.IdGenerator(clock=FakeClock(*(readings or [self.start])))
+    
+    def worker_id(self, generator):
+        return ids.parse_id(generator.next_id())[1]
+    
+    def test_live_processes_get_different_ids(self):
+        generators = [self.generator() for _ in range(20)]
+        worker_ids = [self.worker_id(generator) for generator in generators]
+        self.assertEqual(len(set(worker_ids)), 20)
+        self.assertEqual(WorkerLease.objects.count(), 20)
+        # Leased once, not per ID
+        with self.assertNumQueries(0):
+            generators[0].next_id()
+    
+    def test_renewed_after_half_the_lease(self):
+        generator = self.generator(self.start, self.start + 29_000, self.start + 31_000)
+        worker_id = self.worker_id(generator)
+        with self.assertNumQueries(0):
+            generator.next_id()
+        self.assertEqual(self.worker_id(generator), worker_id)
+        self.assertEqual(WorkerLease.objects.get().expires_at, ids.ms_to_datetime(self.start + 91_000))
+    
+    def test_lost_lease_is_replaced(self):
+        generator = self.generator(self.start, self.start + 31_000)
+        worker_id = self.worker_id(generator)
+        # Suspended past its expiry and taken over meanwhile
+        WorkerLease.objects.filter(worker_id=worker_id).update(owner='other')
+        self.assertNotEqual(self.worker_id(generator), worker_id)
+        self.assertEqual(WorkerLease.objects.filter(owner='other').count(), 1)
+    
+    def test_lapsed_ids_are_taken_over_after_the_drift_margin(self):
+        expired = ids.ms_to_datetime(self.start - 1)
+        live = ids.ms_to_datetime(self.start + 60_000)
+        WorkerLease.objects.bulk_create([
+            WorkerLease(worker_id=worker_id, owner=f'old{worker_id}', expires_at=live if worker_id else expired)
+            for worker_id in range(ids.MAX_WORKER_ID + 1)
+        ])
+        # Lapsed 1 ms ago: its old holder may still be minting on a slower clock
+        with self.assertRaises(ids.WorkerIdsExhausted):
+            self.generator().next_id()
+        
+        generator = self.generator(self.start + ids.MAX_CLOCK_DRIFT_MS + 1)
+        self.assertEqual(self.worker_id(generator), 0)
+        self.assertEqual(WorkerLease.objects.get(worker_id=0).owner, generator.owner)
+    
+    @override_settings(ID_WORKER_ID='7')
+    def test_fixed_id_skips_leasing(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.worker_id(self.generator()), 7)
+
+
+class FastJSONTests(SimpleTestCase):
+    data = {
+        'name': 'เสื้อยืดคอกลม "สีดำ"',
+        'price': Decimal('199.50'),
+        'created_at': datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+        'date': datetime(2026, 1, 2).date(),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'rating_histogram': {1: 0, 5: 3},
+        'label': gettext_lazy('Active'),
+        'tags': ('a', 'b'),
+        'nested': [{'ok': True, 'none': None, 'ratio': 0.1}],
+        'separator': 'a\u2028b',
+    }
+    
+    def test_same_bytes_as_drf(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+    
+    def test_indent_uses_drf(self):
+        media_type = 'application/json; indent=2'
+        self.assertEqual(FastJSONRenderer().render(self.data, media_type),
+                         JSONRenderer().render(self.data, media_type))
+    
+    def test_parser(self):
+        parse = lambda body: FastJSONParser().parse(BytesIO(body))
+        self.assertEqual(parse('{"name": "ร้านค้า", "items": [1, 2.5]}'.encode()),
+                         {'name': 'ร้านค้า', 'items': [1, 2.5]})
+        for body in (b'{"price": NaN}', b'{"name": '):
+            with self.assertRaises(ParseError):
+                parse(body)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = ('{"name": "เสื้อยืด", "price": "199.00"},' * 200).encode()
+    
+    def respond(self, response, accept_encoding='gzip, deflate, br'):
+        request = RequestFactory().get('/api/products/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+    
+    def json_response(self, body=None, content_type='application/json'):
+        response = HttpResponse(self.body if body is None else body, content_type=content_type)
+        response['ETag'] = '"abc-json"'
+        return response
+    
+    def test_gzip(self):
+        response = self.respond(self.json_response(), 'gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc-json"')
+    
+    def test_left_alone(self):
+        cases = [
+            (self.json_response(b'{"ok": true}'), 'gzip'),  # below COMPRESSION_MIN_SIZE
+            (self.json_response(), 'gzip;q=0, identity'),
+            (self.json_response(content_type='image/png'), 'gzip'),
+            (self.json_response(content_type='text/html'), 'gzip'),
+        ]
+        for response, accept_encoding in cases:
+            response = self.respond(response, accept_encoding)
+            self.assertFalse(response.has_header('Content-Encoding'))
+    
+    def test_negotiation(self):
+        available = {'br': None, 'gzip': None}
+        self.assertEqual(negotiate_encoding('gzip, deflate, br', available), 'br')
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip', available), 'gzip')
+        self.assertEqual(negotiate_encoding('*', available), 'br')
+        self.assertEqual(negotiate_encoding('*;q=0.2, br;q=0', available), 'gzip')
+        self.assertIsNone(negotiate_encoding('identity', available))
+        self.assertIsNone(negotiate_encoding('', available))
+    
+    def test_streaming(self):
+        rows = [f'{i},สินค้า {i},100.00\n'.encode() for i in range(500)]
+        response = self.respond(StreamingHttpResponse(iter(rows), content_type='text/csv'), 'gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b''.join(rows))
+    
+    def test_brotli(self):
+        if brotli is None:
+            self.skipTest('brotli is not installed')
+        self.assertIn('br', COMPRESSORS)
+        response = self.respond(self.json_response())
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.body)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    url = '/api/products/'
+    timing_re = re.compile(
+        r'db;dur=(\d+\.\d\d);desc="(\d+) queries", serialize;dur=(\d+\.\d\d), total;dur=(\d+\.\d\d)'
+    )
+    
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Category')
+        Product.objects.bulk_create([
+            Product(name=f'Item {i}', description='desc', price=100, category=category) for i in range(3)
+        ])
+    
+    def setUp(self):
+        cache.clear()
+        self.route = resolve(self.url).route
+    
+    def count(self, metric, *labels):
+        series = metric.series.get(labels)
+        if series is None:
+            return 0
+        return series if isinstance(metric, metrics.Counter) else series[2]
+    
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(self.url)
+        match = self.timing_re.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        db, count, serialize, total = match.groups()
+        self.assertEqual(int(count), len(queries))
+        self.assertGreater(int(count), 0)
+        self.assertGreater(float(serialize), 0)
+        self.assertLessEqual(float(db) + float(serialize), float(total))
+    
+    def test_request_metrics(self):
+        before = {
+            'requests': self.count(metrics.REQUESTS, self.route, 'GET', 200),
+            'durations': self.count(metrics.REQUEST_DURATION, self.route, 'GET'),
+            'queries': self.count(metrics.DB_QUERIES, self.route),
+            'serialize': self.count(metrics.SERIALIZE_DURATION, self.route),
+            'sampled': self.count(metrics.DB_QUERY_DURATION, self.route),
+        }
+        with override_settings(METRICS_QUERY_SAMPLE_RATE=0):
+            APIClient().get(self.url)
+        with override_settings(METRICS_QUERY_SAMPLE_RATE=1), CaptureQueriesContext(connection) as queries:
+            APIClient().get(self.url)
+        
+        self.assertEqual(self.count(metrics.REQUESTS, self.route, 'GET', 200), before['requests'] + 2)
+        self.assertEqual(self.count(metrics.REQUEST_DURATION, self.route, 'GET'), before['durations'] + 2)
+        self.assertEqual(self.count(metrics.DB_QUERIES, self.route), before['queries'] + 2)
+        self.assertEqual(self.count(metrics.SERIALIZE_DURATION, self.route), before['serialize'] + 2)
+        # Single query durations only for the sampled request, one per query
+        self.assertEqual(self.count(metrics.DB_QUERY_DURATION, self.route), before['sampled'] + len(queries))
+    
+    def test_queries_outside_the_request_are_not_counted(self):
+        def view(request):
+            Category.objects.count()
+            list(Product.objects.all())
+            return HttpResponse()
+        
+        response = PerformanceMiddleware(view)(RequestFactory().get('/nowhere'))
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+        Category.objects.count()
+        response = PerformanceMiddleware(lambda request: HttpResponse())(RequestFactory().get('/nowhere'))
+        self.assertIn('desc="0 queries"', response['Server-Timing'])
+        self.assertGreater(self.count(metrics.REQUESTS, 'unmatched', 'GET', 200), 0)
+
+
+class AsyncMiddlewareTests(TestCase):
+    """The middleware runs in the async handler's event loop, without a thread per request"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Category')
+        Product.objects.bulk_create([
+            Product(name=f'สินค้า {i}', description='รายละเอียด' * 10, price=100, category=category)
+            for i in range(20)
+        ])
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_adapts_to_the_handler(self):
+        async def async_view(request):
+            return HttpResponse()
+        
+        for middleware in (PerformanceMiddleware, CompressionMiddleware, PrimaryPinningMiddleware):
+            self.assertTrue(iscoroutinefunction(middleware(async_view)), middleware)
+            self.assertFalse(iscoroutinefunction(middleware(lambda request: HttpResponse())), middleware)
+    
+    async def test_queries_of_async_views_are_counted(self):
+        async def view(request):
+            await Category.objects.acount()
+            return HttpResponse([product async for product in Product.objects.all()][0].name)
+        
+        response = await PerformanceMiddleware(view)(RequestFactory().get('/nowhere'))
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+    
+    async def test_async_endpoint(self):
+        response = await self.async_client.get('/api/async/products/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 20)
+        match = PerformanceMiddlewareTests.timing_re.fullmatch(response['Server-Timing'])
+        self.assertGreater(int(match.group(2)), 0)
+        self.assertGreater(float(match.group(3)), 0)
+
+
+class MetricsTests(SimpleTestCase):
+    
+    def test_text_format(self):
+        histogram = metrics.Histogram('test_seconds', 'Test.', ('route',), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, 'api/"x"/')
+        counter = metrics.Counter('test_total', 'Test.', ('route', 'status'))
+        counter.inc('a', 200)
+        counter.inc('a', 200, amount=2)
+        
+        self.assertEqual(histogram.render(), [
+            '# HELP test_seconds Test.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{route="api/\\"x\\"/",le="0.1"} 2',
+            'test_seconds_bucket{route="api/\\"x\\"/",le="1"} 3',
+            'test_seconds_bucket{route="api/\\"x\\"/",le="+Inf"} 4',
+            'test_seconds_sum{route="api/\\"x\\"/"} 3.65',
+            'test_seconds_count{route="api/\\"x\\"/"} 4',
+        ])
+        self.assertEqual(counter.render(), [
+            '# HELP test_total Test.', '# TYPE test_total counter', 'test_total{route="a",status="200"} 3',
+        ])
+    
+    @override_settings(METRICS_TOKEN='secret')
+    def test_endpoint(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        for metric in metrics.METRICS:
+            self.assertIn(f'# TYPE {metric.name} ', body)
+    
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='secret').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+    
+    @override_settings(METRICS_TOKEN='')
+    def test_no_token_disables_the_endpoint(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 404)
+
+
+class ImageVariantTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category')
+    
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, IMAGE_VARIANT_WIDTHS=(200, 400))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+    
+    def upload(self, name, size=(600, 300), content=None):
+        if content is None:
+            image = BytesIO()
+            Image.new('RGBA', size, (255, 0, 0, 128)).save(image, 'PNG')
+            content = image.getvalue()
+        return SimpleUploadedFile(name, content, content_type='image/png')
+    
+    def srcset(self, product):
+        response = APIClient().get(f'/api/products/{product.pk}/')
+        return response.data['image'], response.data['image_srcset']
+    
+    def run_jobs(self):
+        # Commit callbacks expire the cached product responses
+        with self.captureOnCommitCallbacks(execute=True):
+            run_pending()
+    
+    def open_variant(self, product, width, fmt):
+        with product.image.storage.open(variant_name(product.image.name, width, fmt)) as fh:
+            image = Image.open(fh)
+            image.load()
+        return image
+    
+    def test_variants_are_advertised_once_made(self):
+        product = Product.objects.create(name='Item', description='desc', price=10, category=self.category,
+                                         image=self.upload('red.png'))
+        # Until the job runs there is only the original
+        image, srcset = self.srcset(product)
+        self.assertTrue(image.endswith(product.image.url))
+        self.assertIsNone(srcset)
+        
+        self.run_jobs()
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants, [200, 400])
+        self.assertEqual(self.open_variant(product, 200, 'webp').size, (200, 100))
+        jpeg = self.open_variant(product, 400, 'jpeg')
+        self.assertEqual((jpeg.format, jpeg.mode, jpeg.size), ('JPEG', 'RGB', (400, 200)))
+        
+        _, srcset = self.srcset(product)
+        root = f'http://testserver{product.image.storage.url(variant_name(product.image.name, 200, "webp"))}'
+        self.assertEqual(srcset['webp'], f'{root} 200w, {root.replace("__w200", "__w400")} 400w')
+        self.assertEqual(srcset['jpeg'].count('.jpg '), 2)
+    
+    def test_small_originals_are_not_upscaled(self):
+        product = Product.objects.create(name='Item', description='desc', price=10, category=self.category,
+                                         image=self.upload('small.png', size=(120, 80)))
+        self.run_jobs()
+        self.assertEqual(self.open_variant(product, 400, 'webp').size, (120, 80))
+    
+    def test_replaced_image_falls_back_to_the_original(self):
+        product = Product.objects.create(name='Item', description='desc', price=10, category=self.category,
+                                         image=self.upload('red.png'))
+        self.run_jobs()
+        product = Product.objects.get(pk=product.pk)
+        product.image = self.upload('blue.png')
+        product.save()
+        
+        # The listed widths belonged to the old file
+        self.assertEqual(Product.objects.get(pk=product.pk).image_variants, [])
+        self.assertIsNone(self.srcset(product)[1])
+        self.run_jobs()
+        self.assertEqual(Product.objects.get(pk=product.pk).image_variants, [200, 400])
+        self.assertIn('blue', self.srcset(product)[1]['webp'])
+    
+    def test_failed_generation_keeps_the_original(self):
+        product = Product.objects.create(name='Item', description='desc', price=10, category=self.category,
+                                         image=self.upload('broken.png', content=b'not an image'))
+        for _ in range(3):
+            with self.assertLogs('core.jobs', 'WARNING'):
+                self.run_jobs()
+            Job.objects.filter(status=Job.QUEUED).update(run_at=timezone.now())
+        self.assertEqual(Job.objects.get(name='core.image_variants').status, Job.FAILED)
+        image, srcset = self.srcset(product)
+        self.assertTrue(image.endswith(product.image.url))
+        self.assertIsNone(srcset)
+    
+    def test_command_records_existing_variants(self):
+        seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        shop = Shop.objects.create(owner=seller, name='Shop', slug='shop', logo=self.upload('logo.png'))
+        product = Product.objects.create(name='Item', description='desc', price=10, category=self.category,
+                                         image=self.upload('red.png'))
+        # Uploaded before variants were tracked
+        Job.objects.all().delete()
+        
+        call_command('generate_image_variants', stdout=StringIO())
+        self.assertEqual(Product.objects.get(pk=product.pk).image_variants, [200, 400])
+        shop = Shop.objects.get(pk=shop.pk)
+        self.assertEqual((shop.logo_variants, shop.banner_variants), ([200, 400], []))
+        response = APIClient().get('/api/shops/shop/')
+        self.assertIn('logo__w400.webp 400w', response.data['logo_srcset']['webp'])
+        self.assertIsNone(response.data['banner_srcset'])
+
+
+class CompressedAPITests(TestCase):
+    
+    def test_product_list(self):
+        category = Category.objects.create(name='หมวดหมู่')
+        Product.objects.bulk_create([
+            Product(name=f'สินค้า {i}', description='รายละเอียด' * 10, price=100, category=category)
+            for i in range(20)
+        ])
+        client = APIClient()
+        response = client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), JSONRenderer().render(response.data))
+        
+        plain = client.get('/api/products/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(plain.json()['results'][0]['name'], 'สินค้า 19')
@@ -0,0 +1,16 @@
+from hmac import compare_digest
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from . import metrics
+
+
+def metrics_view(request):
+    """ค่าสถิติของ process นี้ในรูปแบบ Prometheus text (ปิดไว้จนกว่าจะตั้ง METRICS_TOKEN)"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        raise Http404()
+    if not compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
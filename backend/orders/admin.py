@@ -1,4 +1,5 @@
 from django.contrib import admin
+from .exports import export_response, order_items_for
 from .models import Order, OrderItem
 
 class OrderItemInline(admin.TabularInline):
@@ -14,6 +15,7 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ['order_number', 'full_name', 'phone']
     readonly_fields = ['order_number', 'created_at', 'updated_at']
     inlines = [OrderItemInline]
+    actions = ['export_csv', 'export_jsonl']
     
     fieldsets = (
         ('ข้อมูลคำสั่งซื้อ', {
@@ -30,6 +32,14 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+    
+    @admin.action(description='ส่งออกรายการที่เลือกเป็น CSV')
+    def export_csv(self, request, queryset):
+        return export_response(order_items_for(queryset), 'csv')
+    
+    @admin.action(description='ส่งออกรายการที่เลือกเป็น JSONL')
+    def export_jsonl(self, request, queryset):
+        return export_response(order_items_for(queryset), 'jsonl')
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
@@ -0,0 +1,21 @@
+from core.jobs import job
+from .models import Order
+from .reservations import release_expired
+from .signals import order_placed
+
+
+@job('orders.order_placed')
+def send_order_placed(order_id, status):
+    """ส่งสัญญาณ order_placed (ยอดร้าน, cache สินค้า) หลังชำระเงินเสร็จ"""
+    order = Order.objects.filter(pk=order_id).first()
+    if order is None:
+        return
+    # Count the order as it was placed; later status changes are counted by
+    # their own receivers, and the two sets of deltas add up in any order
+    order.status = status
+    order_placed.send(sender=Order, order=order)
+
+
+@job('orders.release_expired_reservations', concurrency=1)
+def release_expired_reservations():
+    release_expired()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = 'คืนสต็อกของการจองที่หมดเวลาแล้ว (ควรตั้งให้รันทุกไม่กี่นาที)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='จำนวนการจองสูงสุดต่อรอบ')
+    
+    def handle(self, *args, **options):
+        released = release_expired(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'คืนสต็อกจากการจองที่หมดเวลา {released} รายการ'))
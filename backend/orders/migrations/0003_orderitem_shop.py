@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_shop(apps, schema_editor):
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    Product = apps.get_model('products', 'Product')
+    # One UPDATE with a correlated subquery instead of a row-by-row loop
+    OrderItem.objects.filter(shop__isnull=True).update(
+        shop_id=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('shop_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_keyset_indexes'),
+        ('products', '0004_keyset_indexes'),
+        ('shops', '0002_shopdailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='shop',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='shops.shop'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['shop', 'order'], name='orderitem_shop_order_idx'),
+        ),
+        migrations.RunPython(backfill_shop, migrations.RunPython.noop),
+    ]
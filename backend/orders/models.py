@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from products.models import Product
@@ -54,6 +56,9 @@ class Order(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"Order {self.order_number}"
@@ -61,6 +66,9 @@ class Order(models.Model):
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Shop that sold the product at purchase time (copied from product.shop)
+    shop = models.ForeignKey('shops.Shop', on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='order_items', db_index=False)
     
     product_name = models.CharField(max_length=200)
     product_price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -72,9 +80,53 @@ class OrderItem(models.Model):
     quantity = models.IntegerField(default=1)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['shop', 'order'], name='orderitem_shop_order_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.product_name} x{self.quantity}"
     
     def save(self, *args, **kwargs):
         self.subtotal = self.product_price * self.quantity
-        super().save(*args, **kwargs)
\ No newline at end of file
+        if self.shop_id is None:
+            self.shop_id = self.product.shop_id
+        super().save(*args, **kwargs)
+
+class StockShard(models.Model):
+    """
+    One slice of a product's unreserved stock.
+    
+    Reservations take from a random shard with a conditional UPDATE, so
+    concurrent buyers of a hot product lock different rows instead of
+    queueing on the product row. Invariant per product:
+    sum(shard.available) + reserved quantity == product.stock
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_shards')
+    index = models.PositiveSmallIntegerField()
+    available = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['product', 'index']
+    
+    def __str__(self):
+        return f"{self.product_id}#{self.index}: {self.available}"
+
+class Reservation(models.Model):
+    """สต็อกที่ถูกจองไว้ให้ตะกร้าของผู้ใช้ชั่วคราว จนกว่าจะสั่งซื้อหรือหมดเวลา"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reservations')
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Reservation {self.id}"
+
+class ReservationItem(models.Model):
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='items')
+    shard = models.ForeignKey(StockShard, on_delete=models.CASCADE, related_name='reservation_items')
+    quantity = models.PositiveIntegerField()
+    
+    def __str__(self):
+        return f"{self.shard} x{self.quantity}"
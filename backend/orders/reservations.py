@@ -0,0 +1,204 @@
+"""
+Time-limited stock reservations.
+
+A product's unreserved stock is split across StockShard rows. Reserving
+takes the quantity from a random shard with a conditional UPDATE, so
+buyers of the same product contend on different rows. Reservations are
+claimed by deleting them: whoever deletes the row (checkout, an explicit
+release or the expiry sweep) owns its stock, so it is never counted twice.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from core.counters import increment, pending
+from products.models import Product
+from .models import Reservation, ReservationItem, StockShard
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id):
+        super().__init__(product_id)
+        self.product_id = product_id
+
+
+class ReservationExpired(Exception):
+    pass
+
+
+def split(total, count):
+    share, extra = divmod(total, count)
+    return [share + (1 if index < extra else 0) for index in range(count)]
+
+
+def ensure_shards(product_id):
+    """id ของ shard ทั้งหมดของสินค้า (สร้างจาก product.stock ถ้ายังไม่มี)"""
+    shard_ids = list(StockShard.objects.filter(product_id=product_id).values_list('id', flat=True))
+    if shard_ids:
+        return shard_ids
+    
+    stock = Product.objects.filter(pk=product_id).values_list('stock', flat=True).first()
+    if stock is None:
+        raise InsufficientStock(product_id)
+    stock += pending(Product, 'stock', [product_id]).get(product_id, 0)
+    # No shards means no reservations yet, so all stock is unreserved;
+    # racing creators insert identical rows and the loser's are ignored
+    StockShard.objects.bulk_create([
+        StockShard(product_id=product_id, index=index, available=available)
+        for index, available in enumerate(split(max(stock, 0), settings.STOCK_SHARDS))
+    ], ignore_conflicts=True)
+    return list(StockShard.objects.filter(product_id=product_id).values_list('id', flat=True))
+
+
+def resync_shards(product):
+    """กระจายสต็อกที่ยังไม่ถูกจองลง shard ใหม่ หลังผู้ขายแก้ product.stock"""
+    with transaction.atomic():
+        shards = list(StockShard.objects.select_for_update().filter(product=product).order_by('index'))
+        if not shards:
+            # Created from the new stock on first use
+            return
+        reserved = ReservationItem.objects.filter(shard__product=product).aggregate(
+            total=Sum('quantity')
+        )['total'] or 0
+        for shard, available in zip(shards, split(max(product.stock - reserved, 0), len(shards))):
+            shard.available = available
+        StockShard.objects.bulk_update(shards, ['available'])
+
+
+def take(product_id, quantity):
+    """
+    Take `quantity` units from the product's shards and return
+    [(shard_id, quantity)]. Must run inside a transaction: on
+    InsufficientStock the caller rolls back the partial takes.
+    """
+    shard_ids = ensure_shards(product_id)
+    taken = []
+    remaining = quantity
+    
+    for attempt in range(2):
+        # Usually one random shard can cover the whole quantity
+        random.shuffle(shard_ids)
+        for shard_id in shard_ids:
+            if StockShard.objects.filter(id=shard_id, available__gte=remaining).update(
+                    available=F('available') - remaining):
+                taken.append((shard_id, remaining))
+                return taken
+        
+        # Otherwise gather what is left across shards
+        for shard_id, available in StockShard.objects.filter(
+                product_id=product_id, available__gt=0).values_list('id', 'available'):
+            amount = min(available, remaining)
+            if StockShard.objects.filter(id=shard_id, available__gte=amount).update(
+                    available=F('available') - amount):
+                taken.append((shard_id, amount))
+                remaining -= amount
+                if not remaining:
+                    return taken
+        
+        # Expired holds on this product may be sitting on the stock we need
+        if attempt == 0 and not release_expired(product_id=product_id):
+            break
+    
+    raise InsufficientStock(product_id)
+
+
+def give_back(shard_quantities):
+    for shard_id, quantity in shard_quantities:
+        StockShard.objects.filter(id=shard_id).update(available=F('available') + quantity)
+
+
+def reserve(user, quantities):
+    """จองสินค้า {product_id: quantity} ให้ผู้ใช้ คืน Reservation"""
+    with transaction.atomic():
+        reservation = Reservation.objects.create(
+            user=user,
+            expires_at=timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_SECONDS),
+        )
+        items = []
+        # Fixed order so two carts never wait on each other's shards in a cycle
+        for product_id in sorted(quantities):
+            for shard_id, quantity in take(product_id, quantities[product_id]):
+                items.append(ReservationItem(reservation=reservation, shard_id=shard_id, quantity=quantity))
+        ReservationItem.objects.bulk_create(items)
+    return reservation
+
+
+def claim(reservations):
+    """
+    Delete the given reservation (a one-row queryset) and return its
+    [(product_id, shard_id, quantity)], or None if someone else claimed it
+    first.
+    """
+    with transaction.atomic():
+        items = list(ReservationItem.objects.filter(reservation__in=reservations).values_list(
+            'shard__product_id', 'shard_id', 'quantity'
+        ))
+        _, deleted = reservations.delete()
+        if not deleted.get(Reservation._meta.label):
+            return None
+    return items
+
+
+def release(reservation_id, user=None):
+    """คืนสต็อกของการจองกลับเข้า shard"""
+    reservations = Reservation.objects.filter(pk=reservation_id)
+    if user is not None:
+        reservations = reservations.filter(user=user)
+    with transaction.atomic():
+        items = claim(reservations)
+        if items is None:
+            return False
+        give_back((shard_id, quantity) for _, shard_id, quantity in items)
+    return True
+
+
+def release_expired(product_id=None, limit=500):
+    """คืนสต็อกของการจองที่หมดเวลาแล้ว คืนจำนวนการจองที่คืนได้"""
+    expired = Reservation.objects.filter(expires_at__lte=timezone.now())
+    if product_id is not None:
+        expired = expired.filter(items__shard__product_id=product_id).distinct()
+    return sum(release(reservation_id) for reservation_id in expired.values_list('id', flat=True)[:limit])
+
+
+def confirm(user, quantities, reservation_id=None):
+    """
+    Turn stock into a sale inside the caller's transaction: claim the
+    user's reservation (if any), take whatever the cart needs beyond it,
+    give back what it no longer needs, then move the units from
+    product.stock to product.sold (through core.counters).
+    """
+    reserved = {}
+    if reservation_id is not None:
+        items = claim(Reservation.objects.filter(
+            pk=reservation_id, user=user, expires_at__gt=timezone.now()
+        ))
+        if items is None:
+            raise ReservationExpired()
+        for product_id, shard_id, quantity in items:
+            reserved.setdefault(product_id, []).append((shard_id, quantity))
+    
+    for product_id in sorted(set(quantities) | set(reserved)):
+        held = sum(quantity for _, quantity in reserved.get(product_id, []))
+        wanted = quantities.get(product_id, 0)
+        if wanted > held:
+            take(product_id, wanted - held)
+        elif wanted < held:
+            # Return the surplus to one of the shards it came from
+            give_back([(reserved[product_id][0][0], held - wanted)])
+        # Counter shards, so buyers of one product do not queue on its row
+        increment(Product, product_id, 'stock', -wanted)
+        increment(Product, product_id, 'sold', wanted)
+
+
+def restock(quantities):
+    """คืนสินค้าที่ขายไปแล้ว (เช่น ยกเลิกคำสั่งซื้อ) เข้า product.stock และ shard"""
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        # Shards are created from the current stock, before it grows
+        give_back([(random.choice(ensure_shards(product_id)), quantity)])
+        increment(Product, product_id, 'stock', quantity)
+        increment(Product, product_id, 'sold', -quantity)
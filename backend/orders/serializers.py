@@ -1,15 +1,24 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
 from rest_framework import serializers
-from .models import Order, OrderItem
+from .models import Order, OrderItem, Reservation
+from .reservations import InsufficientStock, ReservationExpired, confirm, reserve
+from core.fieldsets import FieldsetMixin
+from core.ids import drop_worker_id, order_number
+from core.jobs import enqueue
 from products.serializers import ProductSerializer
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(FieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ['id', 'product', 'product_name', 'product_price', 
                   'product_image', 'variant', 'quantity', 'subtotal']
         read_only_fields = ['subtotal']
+        expandable_fields = {
+            'product': (ProductSerializer, ['id', 'name', 'price', 'stock', 'image', 'image_srcset']),
+        }
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(FieldsetMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     payment_method_display = serializers.CharField(source='get_payment_method_display', read_only=True)
@@ -25,6 +34,67 @@ class OrderSerializer(serializers.ModelSerializer):
                   'items', 'created_at', 'updated_at']
         read_only_fields = ['order_number', 'created_at', 'updated_at']
 
+class ShopOrderSerializer(OrderSerializer):
+    """คำสั่งซื้อในมุมมองของร้าน: แสดงเฉพาะรายการสินค้าและยอดของร้านนั้น"""
+    items = OrderItemSerializer(source='shop_items', many=True, read_only=True)
+    shop_subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    
+    class Meta(OrderSerializer.Meta):
+        # The whole order's amounts include other shops' lines
+        fields = [field for field in OrderSerializer.Meta.fields
+                  if field not in ('subtotal', 'shipping_fee', 'discount', 'total')] + ['shop_subtotal']
+        field_sources = {'shop_subtotal': []}
+
+def validate_cart_items(value):
+    if not value or len(value) == 0:
+        raise serializers.ValidationError("ต้องมีสินค้าอย่างน้อย 1 รายการ")
+    
+    for item in value:
+        try:
+            item['product_id'] = int(item['product_id'])
+            item['quantity'] = int(item.get('quantity', 1))
+        except (KeyError, TypeError, ValueError):
+            raise serializers.ValidationError("ข้อมูลสินค้าไม่ถูกต้อง")
+        if item['quantity'] <= 0:
+            raise serializers.ValidationError("จำนวนสินค้าต้องมากกว่า 0")
+    return value
+
+def cart_quantities(items):
+    quantities = {}
+    for item in items:
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+    return quantities
+
+def out_of_stock_error(product_id, products=None):
+    product = (products or {}).get(product_id)
+    name = product.name if product else product_id
+    return serializers.ValidationError({'items': f"สินค้า {name} มีไม่เพียงพอ"})
+
+class ReservationSerializer(serializers.ModelSerializer):
+    items = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Reservation
+        fields = ['id', 'expires_at', 'items', 'created_at']
+    
+    def get_items(self, obj):
+        rows = obj.items.values('shard__product_id').annotate(quantity=Sum('quantity')).order_by('shard__product_id')
+        return [{'product_id': row['shard__product_id'], 'quantity': row['quantity']} for row in rows]
+
+class CreateReservationSerializer(serializers.Serializer):
+    items = serializers.ListField(
+        child=serializers.DictField()
+    )
+    
+    def validate_items(self, value):
+        return validate_cart_items(value)
+    
+    def create(self, validated_data):
+        try:
+            return reserve(self.context['request'].user, cart_quantities(validated_data['items']))
+        except InsufficientStock as exc:
+            raise out_of_stock_error(exc.product_id)
+
 class CreateOrderSerializer(serializers.Serializer):
     # Shipping Info
     full_name = serializers.CharField(max_length=200)
@@ -42,61 +112,99 @@ class CreateOrderSerializer(serializers.Serializer):
         child=serializers.DictField()
     )
     
+    # Stock held for this cart (optional; see ReservationViewSet)
+    reservation_id = serializers.UUIDField(required=False)
+    
     def validate_items(self, value):
-        if not value or len(value) == 0:
-            raise serializers.ValidationError("ต้องมีสินค้าอย่างน้อย 1 รายการ")
-        return value
+        return validate_cart_items(value)
     
     def create(self, validated_data):
         from products.models import Product
-        import uuid
         
         user = self.context['request'].user
         items_data = validated_data.pop('items')
         
-        # Calculate totals
+        # Fetch every product in the cart with a single query
+        product_ids = {item_data['product_id'] for item_data in items_data}
+        products = Product.objects.in_bulk(product_ids)
+        missing = product_ids - set(products)
+        if missing:
+            raise serializers.ValidationError({
+                'items': f"ไม่พบสินค้า: {', '.join(str(pid) for pid in sorted(missing))}"
+            })
+        
+        # Calculate totals and quantity per product
         subtotal = 0
         for item_data in items_data:
-            product = Product.objects.get(id=item_data['product_id'])
-            item_subtotal = product.price * item_data['quantity']
-            subtotal += item_subtotal
+            product = products[item_data['product_id']]
+            subtotal += product.price * item_data['quantity']
+        quantities = cart_quantities(items_data)
         
         shipping_fee = 0 if subtotal >= 200 else 30
         discount = 0
         total = subtotal + shipping_fee - discount
         
-        # Generate order number
-        order_number = f"ORD{uuid.uuid4().hex[:8].upper()}"
-        
-        # Create order
-        order = Order.objects.create(
-            user=user,
-            order_number=order_number,
-            full_name=validated_data['full_name'],
-            phone=validated_data['phone'],
-            address=validated_data['address'],
-            city=validated_data['city'],
-            district=validated_data['district'],
-            postal_code=validated_data['postal_code'],
-            subtotal=subtotal,
-            shipping_fee=shipping_fee,
-            discount=discount,
-            total=total,
-            payment_method=validated_data['payment_method'],
-            payment_status='pending' if validated_data['payment_method'] != 'cod' else 'pending'
-        )
-        
-        # Create order items
-        for item_data in items_data:
-            product = Product.objects.get(id=item_data['product_id'])
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                product_name=product.name,
-                product_price=product.price,
-                product_image=product.image.url if product.image else '',
-                variant=item_data.get('variant'),
-                quantity=item_data['quantity']
-            )
-        
-        return order
\ No newline at end of file
+        for attempt in range(2):
+            # Minted before the transaction: leasing a worker id commits on its own
+            number = order_number()
+            try:
+                with transaction.atomic():
+                    # Claim the cart's reservation (or take stock from the shards
+                    # directly) and move it to sold; never below zero under concurrency
+                    try:
+                        confirm(user, quantities, validated_data.get('reservation_id'))
+                    except InsufficientStock as exc:
+                        raise out_of_stock_error(exc.product_id, products)
+                    except ReservationExpired:
+                        raise serializers.ValidationError({
+                            'reservation_id': 'การจองสินค้าหมดเวลาแล้ว กรุณาลองใหม่'
+                        })
+                    
+                    # Create order
+                    order = Order.objects.create(
+                        user=user,
+                        order_number=number,
+                        full_name=validated_data['full_name'],
+                        phone=validated_data['phone'],
+                        address=validated_data['address'],
+                        city=validated_data['city'],
+                        district=validated_data['district'],
+                        postal_code=validated_data['postal_code'],
+                        subtotal=subtotal,
+                        shipping_fee=shipping_fee,
+                        discount=discount,
+                        total=total,
+                        payment_method=validated_data['payment_method'],
+                        payment_status='pending' if validated_data['payment_method'] != 'cod' else 'pending'
+                    )
+                    
+                    # Create order items in one INSERT (bulk_create skips save(), so
+                    # subtotal is set here)
+                    order_items = []
+                    for item_data in items_data:
+                        product = products[item_data['product_id']]
+                        order_items.append(OrderItem(
+                            order=order,
+                            product=product,
+                            shop_id=product.shop_id,
+                            product_name=product.name,
+                            product_price=product.price,
+                            product_image=product.image.url if product.image else '',
+                            variant=item_data.get('variant'),
+                            quantity=item_data['quantity'],
+                            subtotal=product.price * item_data['quantity']
+                        ))
+                    OrderItem.objects.bulk_create(order_items)
+                    
+                    # Shop stats and cache invalidation run in the background, once
+                    # per order
+                    enqueue('orders.order_placed', key=f'order-placed:{order.pk}',
+                            order_id=order.pk, status=order.status)
+                
+                return order
+            except IntegrityError:
+                if attempt or not Order.objects.filter(order_number=number).exists():
+                    raise
+                # Another live process made the same number, so the two share
+                # a worker id; take a new one and try once more
+                drop_worker_id()
\ No newline at end of file
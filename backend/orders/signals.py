@@ -0,0 +1,27 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import Signal, receiver
+
+from core.counters import discard
+from products.models import Product
+from .reservations import resync_shards
+
+# Sent once an order and all of its items have been written.
+# Receivers get ``order``.
+order_placed = Signal()
+
+
+@receiver(post_init, sender=Product)
+def remember_stock(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred stock is not fetched
+    instance._loaded_stock = instance.__dict__.get('stock')
+
+
+@receiver(post_save, sender=Product)
+def resync_stock_shards(sender, instance, created, **kwargs):
+    # Checkout moves stock with UPDATE and never gets here; this is a
+    # seller editing the stock level
+    if not created and instance.stock != instance._loaded_stock:
+        # The new level replaces any sales not yet compacted into the column
+        discard(Product, instance.pk, 'stock')
+        resync_shards(instance)
+    instance._loaded_stock = instance.stock
@@ -1,3 +1,481 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from core import ids
+from core.counters import compact, current
+from core.ids import parse_order_number
+from core.jobs import run_pending
+from core.models import Job
+from products.models import Product, Category
+from shops.models import Shop, ShopDailyStats
+from .models import Order, OrderItem, Reservation, StockShard
+from .reservations import InsufficientStock, confirm, release_expired, reserve
+
+
+class OrderQueryCountTests(TestCase):
+    """จำนวน query ของ endpoint ต้องคงที่ ไม่ขึ้นกับจำนวนแถว"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+        category = Category.objects.create(name='Category')
+        cls.product = Product.objects.create(name='Product', description='desc', price=100,
+                                             stock=1000, category=category)
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def create_orders(self, count, items_per_order=3):
+        for i in range(count):
+            order = Order.objects.create(
+                user=self.user, order_number=f'ORDTEST{i}', full_name='Buyer', phone='0800000000',
+                address='addr', city='BKK', district='Pathumwan', postal_code='10330',
+                subtotal=300, total=300, payment_method='cod'
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=self.product, product_name=self.product.name,
+                          product_price=100, quantity=1, subtotal=100)
+                for _ in range(items_per_order)
+            ])
+    
+    def assertConstantQueries(self, num, url):
+        for count in (2, 10):
+            Order.objects.all().delete()
+            self.create_orders(count)
+            with self.assertNumQueries(num):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+    
+    def test_order_list(self):
+        self.assertConstantQueries(2, '/api/orders/')
+    
+    def test_my_orders(self):
+        self.assertConstantQueries(2, '/api/orders/my_orders/')
+    
+    def test_sparse_fields(self):
+        # No items asked for, so no prefetch
+        self.assertConstantQueries(1, '/api/orders/?fields=id,order_number,total,status_display')
+        response = self.client.get('/api/orders/?fields=id,order_number,total,status_display')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'order_number', 'total', 'status_display'})
+        
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/orders/?fields=id,items.product_name,items.quantity')
+        self.assertEqual(response.data['results'][0]['items'][0], {'product_name': 'Product', 'quantity': 1})
+    
+    def test_expand_item_product(self):
+        self.create_orders(2)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/orders/?fields=id,items.product.name&expand=items.product')
+        self.assertEqual(response.data['results'][0]['items'][0], {'product': {'name': 'Product'}})
+    
+    def test_order_detail(self):
+        self.create_orders(1, items_per_order=5)
+        order = Order.objects.get()
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/orders/{order.id}/')
+        self.assertEqual(response.status_code, 200)
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+        self.product = Product.objects.create(name='Product', description='desc', price=100, stock=5,
+                                              category=Category.objects.create(name='Category'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.order_data = {
+            'full_name': 'Buyer', 'phone': '0800000000', 'address': 'addr', 'city': 'BKK',
+            'district': 'Pathumwan', 'postal_code': '10330', 'payment_method': 'cod',
+        }
+    
+    def available(self):
+        return StockShard.objects.filter(product=self.product).aggregate(total=Sum('available'))['total']
+    
+    def test_reservation_holds_stock_until_checkout(self):
+        response = self.client.post('/api/reservations/', {
+            'items': [{'product_id': self.product.id, 'quantity': 4}]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.available(), 1)
+        
+        # Someone else cannot take the held units
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass1234')
+        with self.assertRaises(InsufficientStock):
+            reserve(other, {self.product.id: 2})
+        
+        response = self.client.post('/api/orders/', {
+            **self.order_data, 'reservation_id': response.data['id'],
+            'items': [{'product_id': self.product.id, 'quantity': 4}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((current(self.product, 'stock'), current(self.product, 'sold')), (1, 4))
+        self.assertFalse(Reservation.objects.exists())
+    
+    def test_expired_reservation_returns_stock(self):
+        reservation = reserve(self.user, {self.product.id: 5})
+        Reservation.objects.filter(pk=reservation.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        
+        response = self.client.post('/api/orders/', {
+            **self.order_data, 'reservation_id': str(reservation.pk),
+            'items': [{'product_id': self.product.id, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        
+        self.assertEqual(release_expired(), 1)
+        self.assertEqual(self.available(), 5)
+    
+    def test_duplicate_order_number_is_retried(self):
+        Order.objects.create(user=self.user, order_number='ORDTAKEN', full_name='Buyer', phone='0800000000',
+                             address='addr', city='BKK', district='Pathumwan', postal_code='10330',
+                             subtotal=100, total=100, payment_method='cod')
+        with mock.patch('orders.serializers.order_number', side_effect=['ORDTAKEN', 'ORDFRESH']), \
+                mock.patch('orders.serializers.drop_worker_id') as drop_worker_id:
+            response = self.client.post('/api/orders/', {
+                **self.order_data, 'items': [{'product_id': self.product.id, 'quantity': 1}],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['order_number'], 'ORDFRESH')
+        drop_worker_id.assert_called_once()
+        # The first attempt was rolled back whole
+        self.assertEqual(current(self.product, 'sold'), 1)
+    
+    def test_seller_stock_edit_keeps_reservations(self):
+        reserve(self.user, {self.product.id: 2})
+        self.product.stock = 10
+        self.product.save()
+        self.assertEqual(self.available(), 8)
+        
+        # All of the unreserved stock can still be sold
+        with transaction.atomic():
+            confirm(self.user, {self.product.id: 8})
+        self.assertEqual(self.available(), 0)
+
+
+@override_settings(ID_WORKER_ID='1')
+class CheckoutTests(TestCase):
+    """สร้างคำสั่งซื้อด้วย query คงที่ บวกจำนวนคงที่ต่อสินค้าที่ตัดสต็อก"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+        seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        shop = Shop.objects.create(owner=seller, name='Shop', slug='shop')
+        category = Category.objects.create(name='Category')
+        cls.products = [
+            Product.objects.create(name=f'Product {i}', description='desc', price=price, stock=10,
+                                   category=category, shop=shop if i % 2 else None)
+            for i, price in enumerate(['19.50', '40.00', '100.25', '5.00', '75.00'])
+        ]
+    
+    def setUp(self):
+        cache.clear()
+        # A fixed worker id, so no lease queries land in the counts
+        ids.drop_worker_id()
+        self.addCleanup(ids.drop_worker_id)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def checkout(self, items):
+        return self.client.post('/api/orders/', {
+            'full_name': 'Buyer', 'phone': '0800000000', 'address': 'addr', 'city': 'BKK',
+            'district': 'Pathumwan', 'postal_code': '10330', 'payment_method': 'cod',
+            'items': [{'product_id': product.id, 'quantity': quantity} for product, quantity in items],
+        }, format='json')
+    
+    @override_settings(STOCK_SHARDS=1, COUNTER_SHARDS=1)
+    def test_query_count_grows_only_with_stock_moves(self):
+        # Everything around confirm() is batched; confirm() moves stock
+        # product by product (see orders.reservations), a fixed number of
+        # queries each once the product's shard rows exist
+        self.checkout([(product, 1) for product in self.products])
+        sizes = (1, 2, len(self.products))
+        counts = []
+        for size in sizes:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.checkout([(product, 1) for product in self.products[:size]])
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.data['items']), size)
+            counts.append(len(queries))
+        # 9 for the order, plus per product the shard lookup, the shard
+        # UPDATE and the stock/sold counter UPDATEs
+        self.assertEqual(counts, [9 + 4 * size for size in sizes])
+    
+    def test_totals(self):
+        response = self.checkout([(self.products[0], 2), (self.products[2], 1), (self.products[0], 1)])
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.data['id'])
+        # 19.50 * 3 + 100.25 = 158.75, under 200 so shipping is charged
+        self.assertEqual((order.subtotal, order.shipping_fee, order.discount, order.total),
+                         (Decimal('158.75'), 30, 0, Decimal('188.75')))
+        self.assertEqual(
+            list(order.items.order_by('id').values_list('product_id', 'shop_id', 'product_price', 'quantity', 'subtotal')),
+            [(self.products[0].id, None, Decimal('19.50'), 2, Decimal('39.00')),
+             (self.products[2].id, None, Decimal('100.25'), 1, Decimal('100.25')),
+             (self.products[0].id, None, Decimal('19.50'), 1, Decimal('19.50'))],
+        )
+        # Repeated lines of one product take its stock together
+        self.assertEqual((current(self.products[0], 'stock'), current(self.products[0], 'sold')), (7, 3))
+        
+        response = self.checkout([(self.products[1], 3), (self.products[3], 1)])
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual((order.subtotal, order.shipping_fee, order.total), (Decimal('125.00'), 30, Decimal('155.00')))
+        self.assertEqual(set(order.items.values_list('shop_id', flat=True)), {self.products[1].shop_id})
+        
+        response = self.checkout([(self.products[2], 2)])
+        order = Order.objects.get(pk=response.data['id'])
+        # Free shipping from 200
+        self.assertEqual((order.subtotal, order.shipping_fee, order.total), (Decimal('200.50'), 0, Decimal('200.50')))
+    
+    def test_unknown_products_create_nothing(self):
+        response = self.client.post('/api/orders/', {
+            'full_name': 'Buyer', 'phone': '0800000000', 'address': 'addr', 'city': 'BKK',
+            'district': 'Pathumwan', 'postal_code': '10330', 'payment_method': 'cod',
+            'items': [{'product_id': self.products[0].id, 'quantity': 1}, {'product_id': 999999, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('999999', response.data['items'])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(current(self.products[0], 'stock'), 10)
+
+
+class CheckoutJobTests(TestCase):
+    """งานหลังชำระเงินทำผ่านคิว ไม่ใช่ใน request"""
+    
+    def setUp(self):
+        cache.clear()
+        seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        self.shop = Shop.objects.create(owner=seller, name='Shop', slug='shop')
+        self.product = Product.objects.create(name='Product', description='desc', price=100, stock=5,
+                                              category=Category.objects.create(name='Category'), shop=self.shop)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='pass1234'
+        ))
+    
+    def place_order(self):
+        response = self.client.post('/api/orders/', {
+            'full_name': 'Buyer', 'phone': '0800000000', 'address': 'addr', 'city': 'BKK',
+            'district': 'Pathumwan', 'postal_code': '10330', 'payment_method': 'cod',
+            'items': [{'product_id': self.product.id, 'quantity': 2}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNotNone(parse_order_number(response.data['order_number']))
+        return response.data['id']
+    
+    def stats(self):
+        row = ShopDailyStats.objects.filter(shop=self.shop).values('total_orders', 'pending_orders').first()
+        return row, current(Shop.objects.get(pk=self.shop.pk), 'total_sold')
+    
+    def test_shop_stats_are_updated_by_the_worker(self):
+        order_id = self.place_order()
+        self.assertEqual(self.stats(), (None, 0))
+        self.assertTrue(Job.objects.filter(name='orders.order_placed', idempotency_key=f'order-placed:{order_id}').exists())
+        
+        run_pending()
+        self.assertEqual(self.stats(), ({'total_orders': 1, 'pending_orders': 1}, 2))
+    
+    def test_cancel_before_the_job_runs(self):
+        order_id = self.place_order()
+        self.client.post(f'/api/orders/{order_id}/cancel/')
+        run_pending()
+        # Placed as pending, then moved to cancelled: nothing left pending or sold
+        self.assertEqual(self.stats(), ({'total_orders': 1, 'pending_orders': 0}, 0))
+
+
+class OrderItemShopTests(TestCase):
+    """OrderItem.shop เป็นร้านของสินค้า ณ ตอนซื้อ"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+        seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        cls.shop = Shop.objects.create(owner=seller, name='Shop', slug='shop')
+        category = Category.objects.create(name='Category')
+        cls.products = [
+            Product.objects.create(name=f'Product {i}', description='desc', price=100, stock=10,
+                                   category=category, shop=shop)
+            for i, shop in enumerate([cls.shop, None])
+        ]
+        cls.order = Order.objects.create(
+            user=buyer, order_number='ORDSHOP', full_name='Buyer', phone='0800000000',
+            address='addr', city='BKK', district='Pathumwan', postal_code='10330',
+            subtotal=200, total=200, payment_method='cod'
+        )
+    
+    def create_items(self):
+        return [
+            OrderItem.objects.create(order=self.order, product=product, product_name=product.name,
+                                     product_price=100, quantity=1)
+            for product in self.products
+        ]
+    
+    def test_save_defaults_to_the_products_shop(self):
+        self.assertEqual([item.shop_id for item in self.create_items()], [self.shop.id, None])
+    
+    def test_migration_backfills_the_shop(self):
+        backfill_shop = import_module('orders.migrations.0003_orderitem_shop').backfill_shop
+        
+        self.create_items()
+        OrderItem.objects.update(shop=None)
+        backfill_shop(apps, None)
+        self.assertEqual(
+            list(OrderItem.objects.order_by('product_id').values_list('shop_id', flat=True)),
+            [self.shop.id, None]
+        )
+
+
+class StockReservationConcurrencyTests(TransactionTestCase):
+    """ผู้ซื้อพร้อมกันหลายคนต้องไม่ทำให้ขายเกินสต็อก"""
+    
+    stock = 25
+    buyers = 40
+    
+    def test_concurrent_checkouts_never_oversell(self):
+        product = Product.objects.create(name='Flash sale', description='desc', price=100, stock=self.stock,
+                                         category=Category.objects.create(name='Category'))
+        users = User.objects.bulk_create([
+            User(username=f'buyer{i}', email=f'buyer{i}@example.com') for i in range(self.buyers)
+        ])
+        barrier = threading.Barrier(self.buyers)
+        outcomes = []
+        
+        def buy(user):
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        with transaction.atomic():
+                            reservation = reserve(user, {product.id: 1})
+                            confirm(user, {product.id: 1}, reservation.pk)
+                        outcomes.append('sold')
+                        return
+                    except InsufficientStock:
+                        outcomes.append('sold out')
+                        return
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting
+                        continue
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=buy, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        compact()
+        product.refresh_from_db()
+        self.assertEqual(outcomes.count('sold'), self.stock)
+        self.assertEqual((product.stock, product.sold), (0, self.stock))
+        self.assertEqual(StockShard.objects.filter(product=product).aggregate(total=Sum('available'))['total'], 0)
+
+
+class OrderExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from shops.models import Shop
+        
+        cls.buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+        cls.seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        cls.admin = User.objects.create_user(username='admin', email='admin@example.com', password='pass1234',
+                                             is_staff=True, is_superuser=True)
+        cls.shop = Shop.objects.create(owner=cls.seller, name='ร้านทดสอบ', slug='shop')
+        category = Category.objects.create(name='Category')
+        product = Product.objects.create(name='สินค้า', description='desc', price=100, stock=10,
+                                         category=category, shop=cls.shop)
+        for i, status in enumerate(['pending', 'delivered', 'cancelled']):
+            order = Order.objects.create(
+                user=cls.buyer, order_number=f'ORDEXPORT{i}', full_name='Buyer', phone='0800000000',
+                address='addr', city='BKK', district='Pathumwan', postal_code='10330',
+                subtotal=200, total=200, payment_method='cod', status=status
+            )
+            OrderItem.objects.create(order=order, product=product, shop=cls.shop, product_name=product.name,
+                                     product_price=100, quantity=2)
+        Order.objects.filter(order_number='ORDEXPORT0').update(created_at=timezone.now() - timedelta(days=10))
+    
+    def setUp(self):
+        self.client = APIClient()
+    
+    def download(self, url, user, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get(url, params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8-sig')
+    
+    def test_seller_csv_export_with_filters(self):
+        today = timezone.localdate().isoformat()
+        response, body = self.download('/api/shops/shop/export_orders/', self.seller,
+                                       date_from=today, status='pending,delivered')
+        
+        self.assertIn('attachment; filename="orders-shop-', response['Content-Disposition'])
+        lines = body.splitlines()
+        self.assertTrue(lines[0].startswith('order_number,created_at,status'))
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], ['ORDEXPORT1'])
+        self.assertIn('ร้านทดสอบ', lines[1])
+    
+    def test_benchmark_reads_the_whole_stream(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'bench.json')
+            call_command('benchmark', user=self.seller.email, filter='export', iterations=1, warmup=0,
+                         output=output, stdout=io.StringIO())
+            with open(output, encoding='utf-8') as fh:
+                results = {row['url']: row for row in json.load(fh)['results']}
+        
+        self.assertEqual(set(results), {'/api/orders/export/', '/api/shops/shop/export_orders/'})
+        row = results['/api/shops/shop/export_orders/']
+        self.assertEqual(row['status'], 200)
+        # Header plus one line per item
+        self.assertGreater(row['bytes'], 100)
+    
+    def test_invalid_dates_are_rejected(self):
+        self.client.force_authenticate(self.admin)
+        for value in ('2024-02-30', '2024-13-01', 'yesterday'):
+            response = self.client.get('/api/orders/export/', {'date_to': value})
+            self.assertEqual(response.status_code, 400, value)
+            self.assertIn('date_to', response.data)
+    
+    def test_seller_cannot_export_other_shops(self):
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.get('/api/shops/shop/export_orders/').status_code, 403)
+    
+    def test_jsonl_export_scoped_to_user(self):
+        _, body = self.download('/api/orders/export/', self.admin, file_format='jsonl')
+        self.assertEqual(len(body.splitlines()), 3)
+        _, body = self.download('/api/orders/export/', self.seller, file_format='jsonl')
+        self.assertEqual(body, '')
+        
+        _, body = self.download('/api/orders/export/', self.buyer, file_format='jsonl', status='cancelled')
+        row = json.loads(body)
+        self.assertEqual((row['order_number'], row['quantity'], row['item_subtotal']), ('ORDEXPORT2', 2, '200.00'))
+    
+    def test_admin_action_streams_selected_orders(self):
+        self.client.force_login(self.admin)
+        selected = Order.objects.filter(order_number__in=['ORDEXPORT0', 'ORDEXPORT2'])
+        response = self.client.post('/admin/orders/order/', {
+            'action': 'export_csv', '_selected_action': [order.pk for order in selected],
+        })
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertEqual(len(body.splitlines()), 3)
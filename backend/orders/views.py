@@ -1,17 +1,31 @@
-from rest_framework import viewsets, status
+from django.db import transaction
+from django.db.models import Sum
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Order, OrderItem
-from .serializers import OrderSerializer, CreateOrderSerializer
+from core.cache import bump_version
+from core.fieldsets import FieldsetViewMixin
+from core.pagination import KeysetPagination
+from .exports import export_response, filter_order_items
+from .models import Order, OrderItem, Reservation
+from .reservations import release, restock
+from .serializers import (
+    OrderSerializer, OrderItemSerializer, CreateOrderSerializer, ReservationSerializer, CreateReservationSerializer
+)
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(FieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         # แสดงเฉพาะ orders ของ user ที่ login
-        return Order.objects.filter(user=self.request.user)
+        queryset = Order.objects.filter(user=self.request.user)
+        items = self.prefetch(Order, 'items', OrderItem.objects.all(), OrderItemSerializer)
+        if items is not None:
+            queryset = queryset.prefetch_related(items)
+        return self.sparse(queryset)
     
     def create(self, request, *args, **kwargs):
         serializer = CreateOrderSerializer(data=request.data, context={'request': request})
@@ -27,17 +41,35 @@ class OrderViewSet(viewsets.ModelViewSet):
         """ยกเลิกคำสั่งซื้อ"""
         order = self.get_object()
         
-        if order.status in ['delivered', 'cancelled']:
-            return Response(
-                {'error': 'ไม่สามารถยกเลิกคำสั่งซื้อนี้ได้'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        order.status = 'cancelled'
-        order.save()
+        with transaction.atomic():
+            # Lock the order so a double submit cannot return the stock twice
+            order = Order.objects.select_for_update().get(pk=order.pk)
+            
+            if order.status in ['delivered', 'cancelled']:
+                return Response(
+                    {'error': 'ไม่สามารถยกเลิกคำสั่งซื้อนี้ได้'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            order.status = 'cancelled'
+            order.save()
+            
+            # Return the sold stock
+            quantities = order.items.values('product_id').annotate(total=Sum('quantity'))
+            restock({row['product_id']: row['total'] for row in quantities})
+            bump_version('products')
         
         return Response({'message': 'ยกเลิกคำสั่งซื้อสำเร็จ'})
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """ดาวน์โหลดประวัติคำสั่งซื้อเป็น CSV/JSONL (ผู้ดูแลระบบได้ทุกคำสั่งซื้อ)"""
+        items = OrderItem.objects.all()
+        if not request.user.is_staff:
+            items = items.filter(order__user=request.user)
+        items = filter_order_items(items, request.query_params)
+        return export_response(items, request.query_params.get('file_format', 'csv'))
+    
     @action(detail=False, methods=['get'])
     def my_orders(self, request):
         """ดูคำสั่งซื้อทั้งหมดของฉัน"""
@@ -49,4 +81,23 @@ class OrderViewSet(viewsets.ModelViewSet):
             return self.get_paginated_response(serializer.data)
         
         serializer = self.get_serializer(orders, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+class ReservationViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                         mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """จองสต็อกให้ตะกร้าชั่วคราวระหว่างกรอกข้อมูลชำระเงิน"""
+    serializer_class = ReservationSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return Reservation.objects.filter(user=self.request.user)
+    
+    def create(self, request, *args, **kwargs):
+        serializer = CreateReservationSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        reservation = serializer.save()
+        return Response(ReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
+    
+    def perform_destroy(self, instance):
+        """ยกเลิกการจองและคืนสต็อก"""
+        release(instance.pk, user=self.request.user)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, Category
+from .models import Product, Category, Review
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -7,5 +7,11 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'price', 'stock', 'sold', 'rating', 'category']
-    list_filter = ['category']
\ No newline at end of file
+    list_display = ['name', 'price', 'stock', 'sold', 'rating', 'review_count', 'category']
+    list_filter = ['category']
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    list_display = ['product', 'user', 'rating', 'created_at']
+    list_filter = ['rating']
+    raw_id_fields = ['product', 'user']
@@ -0,0 +1,44 @@
+from django.http import Http404
+
+from core.async_api import async_api_view, json_response
+from core.counters import with_pending
+from .models import Product, Category
+from .pagination import ProductPagination
+from .search import search_products
+from .serializers import ProductSerializer, CategorySerializer
+from .views import filter_products
+
+
+@async_api_view
+async def product_list(request):
+    """รายการสินค้า (async) รองรับตัวกรอง ค้นหา เรียงลำดับ และ cursor เหมือน /api/products/"""
+    params = request.query_params
+    queryset = with_pending(Product.objects.select_related('category', 'shop'), 'stock', 'sold')
+    queryset = filter_products(queryset, params)
+    
+    if params.get('shop'):
+        queryset = queryset.filter(shop_id=int(params['shop']))
+    if params.get('search', '').strip():
+        queryset = search_products(queryset, params['search'].strip())
+    
+    paginator = ProductPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+    serializer = ProductSerializer(page, many=True, context={'request': request})
+    return json_response(paginator.get_paginated_response(serializer.data).data)
+
+
+@async_api_view
+async def product_detail(request, pk):
+    """รายละเอียดสินค้า (async)"""
+    try:
+        product = await with_pending(Product.objects.select_related('category', 'shop'), 'stock', 'sold').aget(pk=pk)
+    except Product.DoesNotExist:
+        raise Http404('No Product matches the given query.')
+    return json_response(ProductSerializer(product, context={'request': request}).data)
+
+
+@async_api_view
+async def category_list(request):
+    """หมวดหมู่ทั้งหมด (async)"""
+    categories = [category async for category in Category.objects.all()]
+    return json_response(CategorySerializer(categories, many=True).data)
@@ -0,0 +1,133 @@
+"""
+Facet counts for the product list.
+
+Each facet is one grouped query (GROUP BY category, shop, floor(rating),
+price bucket) over the list's filters, except that a facet ignores its
+own filter: picking a category still shows how many matches the other
+categories have. The result is cached per normalized filter set and
+expires with the products/categories/shops response versions.
+"""
+import hashlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Min
+from django.db.models.functions import Floor
+
+from core.cache import get_versions
+from .models import Product
+from .search import search_products
+
+# Query parameters that narrow the list; everything else (cursor,
+# page_size, ordering) leaves the facets unchanged
+FILTER_PARAMS = ('search', 'category', 'shop', 'min_price', 'max_price', 'min_rating')
+PRICE_PARAMS = ('min_price', 'max_price')
+FACETS_KEY = 'product-facets:{}'
+SHOP_LIMIT = 20
+PRICE_BUCKETS = 10
+
+
+def filter_params(params):
+    return {param: params[param] for param in FILTER_PARAMS if params.get(param)}
+
+
+def facet_queryset(params, *ignore):
+    """สินค้าที่ผ่านตัวกรองทั้งหมด ยกเว้นตัวกรองใน ignore"""
+    from .views import filter_products
+    
+    params = {param: value for param, value in params.items() if param not in ignore}
+    queryset = filter_products(Product.objects.all(), params)
+    if params.get('shop'):
+        queryset = queryset.filter(shop_id=params['shop'])
+    if params.get('search'):
+        queryset = search_products(queryset, params['search'].strip())
+    # No ORDER BY in a GROUP BY query
+    return queryset.order_by()
+
+
+def category_facet(params):
+    rows = (facet_queryset(params, 'category')
+            .values('category_id', 'category__name')
+            .annotate(count=Count('id'))
+            .order_by('-count', 'category_id'))
+    return [{'id': row['category_id'], 'name': row['category__name'], 'count': row['count']} for row in rows]
+
+
+def shop_facet(params):
+    rows = (facet_queryset(params, 'shop')
+            .filter(shop__isnull=False)
+            .values('shop_id', 'shop__name', 'shop__slug')
+            .annotate(count=Count('id'))
+            .order_by('-count', 'shop_id')[:SHOP_LIMIT])
+    return [{'id': row['shop_id'], 'name': row['shop__name'], 'slug': row['shop__slug'], 'count': row['count']}
+            for row in rows]
+
+
+def rating_facet(params):
+    """จำนวนสินค้าที่ได้ตั้งแต่ N ดาวขึ้นไป (ตรงกับ ?min_rating=N)"""
+    rows = (facet_queryset(params, 'min_rating')
+            .values(stars=Floor('rating'))
+            .annotate(count=Count('id')))
+    counts = {int(row['stars']): row['count'] for row in rows}
+    return [
+        {'min_rating': stars, 'count': sum(count for bucket, count in counts.items() if bucket >= stars)}
+        for stars in range(5, 0, -1)
+    ]
+
+
+def bucket_width(low, high, buckets):
+    """ความกว้างช่องราคาแบบตัวเลขกลม ๆ (1, 2, 5 × 10^n)"""
+    rough = (high - low) / buckets
+    if rough <= 0:
+        return Decimal('1')
+    # Power of ten at the leading digit, but never below one satang
+    scale = max(Decimal(1).scaleb(rough.adjusted()), Decimal('0.01'))
+    for step in (1, 2, 5):
+        if rough <= step * scale:
+            return step * scale
+    return 10 * scale
+
+
+def price_histogram(params, buckets=PRICE_BUCKETS):
+    queryset = facet_queryset(params, *PRICE_PARAMS)
+    bounds = queryset.aggregate(low=Min('price'), high=Max('price'))
+    if bounds['low'] is None:
+        return {'min': None, 'max': None, 'buckets': []}
+    
+    width = bucket_width(bounds['low'], bounds['high'], buckets).quantize(Decimal('0.01'))
+    rows = (queryset
+            .values(bucket=Floor(F('price') / width))
+            .annotate(count=Count('id'))
+            .order_by('bucket'))
+    return {
+        'min': bounds['low'],
+        'max': bounds['high'],
+        'buckets': [
+            {'from': int(row['bucket']) * width, 'to': (int(row['bucket']) + 1) * width, 'count': row['count']}
+            for row in rows
+        ],
+    }
+
+
+def product_facets(params):
+    """นับ facet ของรายการสินค้าตาม query params (cache ตามชุดตัวกรอง)"""
+    params = filter_params(params)
+    versions = get_versions(['products', 'categories', 'shops'])
+    key = hashlib.md5(repr((sorted(params.items()), versions)).encode()).hexdigest()
+    facets = cache.get(FACETS_KEY.format(key))
+    if facets is not None:
+        return facets
+    
+    categories = category_facet(params)
+    selected = params.get('category')
+    facets = {
+        # The category facet ignores only ?category=, so its counts add up to the total
+        'total': sum(row['count'] for row in categories if not selected or str(row['id']) == selected),
+        'category': categories,
+        'shop': shop_facet(params),
+        'rating': rating_facet(params),
+        'price': price_histogram(params),
+    }
+    cache.set(FACETS_KEY.format(key), facets, settings.RESPONSE_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,82 @@
+"""
+The home page feed, served from a snapshot (see core.snapshots).
+
+build_home_feed() runs the home page's queries once per HOME_FEED_INTERVAL
+in the products.build_home_feed job instead of once per visitor:
+
+    categories      every category, for the category grid
+    best_sellers    most sold first
+    new_arrivals    newest first
+    by_category     the best sellers of each category, ranked in one query
+
+Products carry only the fields a product card renders. Sales are read
+with their pending counter shards, so the sold figures match the product
+list at the time of the build.
+
+Each process keeps the snapshot in its own cache for at most one
+interval, so a visitor sees a feed at most two intervals old.
+"""
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from core import snapshots
+from core.counters import with_pending
+from core.fieldsets import Fieldset, prune_queryset
+from .models import Category, Product
+from .serializers import CategorySerializer, ProductSerializer
+
+SNAPSHOT_NAME = 'home'
+
+CARD_FIELDS = ['id', 'name', 'price', 'original_price', 'discount_percentage', 'rating',
+               'sold', 'stock', 'image', 'image_srcset', 'category']
+
+
+def card_serializer(instances=None):
+    serializer = ProductSerializer(instances, many=True, context={'request': snapshots.SiteRequest()})
+    serializer.child.fieldset = Fieldset(include=CARD_FIELDS)
+    return serializer
+
+
+def card_queryset():
+    queryset = with_pending(Product.objects.all(), 'stock', 'sold')
+    # Rank by sales including the shards not yet compacted into the column
+    queryset = queryset.annotate(total_sold=F('sold') + F('sold_pending'))
+    return prune_queryset(queryset, card_serializer().child)
+
+
+def top_per_category(size):
+    """สินค้าขายดี `size` ชิ้นแรกของทุกหมวดหมู่ (query เดียว) เป็น {category_id: [product, ...]}"""
+    ranked = card_queryset().filter(category__isnull=False).annotate(rank=Window(
+        RowNumber(), partition_by=[F('category_id')], order_by=[F('total_sold').desc(), F('id').desc()],
+    ))
+    grouped = {}
+    for product in ranked.filter(rank__lte=size).order_by('category_id', 'rank'):
+        grouped.setdefault(product.category_id, []).append(product)
+    return grouped
+
+
+def build_home_feed():
+    """ข้อมูลทั้งหมดของหน้าแรก (dict ที่พร้อมเก็บเป็น snapshot)"""
+    size = settings.HOME_FEED_SIZE
+    categories = list(Category.objects.order_by('id'))
+    grouped = top_per_category(settings.HOME_FEED_CATEGORY_SIZE)
+    return {
+        'categories': CategorySerializer(categories, many=True).data,
+        'best_sellers': card_serializer(card_queryset().order_by('-total_sold', '-id')[:size]).data,
+        'new_arrivals': card_serializer(card_queryset().order_by('-created_at', '-id')[:size]).data,
+        'by_category': [
+            {'id': category.id, 'name': category.name, 'icon': category.icon,
+             'products': card_serializer(grouped[category.id]).data}
+            for category in categories if category.id in grouped
+        ],
+    }
+
+
+def publish_home_feed():
+    """สร้างข้อมูลหน้าแรกใหม่และสลับแทน snapshot เดิม"""
+    return snapshots.publish(SNAPSHOT_NAME, build_home_feed(), timeout=settings.HOME_FEED_INTERVAL)
+
+
+def read_home_feed():
+    return snapshots.read(SNAPSHOT_NAME, timeout=settings.HOME_FEED_INTERVAL)
@@ -0,0 +1,8 @@
+from core.jobs import job
+from .home import publish_home_feed
+
+
+@job('products.build_home_feed', concurrency=1)
+def build_home_feed():
+    """สร้าง snapshot ของหน้าแรกใหม่ (ทุก HOME_FEED_INTERVAL วินาที)"""
+    publish_home_feed()
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from products.models import Product, Review
+from products.reviews import AGGREGATE_FIELDS, STARS, average
+from shops.models import Shop
+
+
+class Command(BaseCommand):
+    help = 'คำนวณยอดรีวิว (จำนวน ผลรวม ฮิสโตแกรม คะแนนเฉลี่ย) ของสินค้าและร้านค้าใหม่จากรีวิวทั้งหมด'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            products = self.rebuild(Product, 'product', options['batch_size'])
+            shops = self.rebuild(Shop, 'product__shop', options['batch_size'])
+        
+        self.stdout.write(self.style.SUCCESS(f'สร้างยอดรีวิวใหม่ {products} สินค้า {shops} ร้าน'))
+    
+    def rebuild(self, model, group_by, batch_size):
+        """Zero every row, then write the grouped totals back in batches"""
+        model.objects.update(**{field: 0 for field in AGGREGATE_FIELDS})
+        
+        rows = (Review.objects
+                .filter(**{f'{group_by}__isnull': False})
+                .values(group_by)
+                .annotate(review_count=Count('id'), rating_sum=Sum('rating'),
+                          **{f'rating_{star}': Count('id', filter=Q(rating=star)) for star in STARS})
+                .order_by())
+        
+        total = 0
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(model(pk=row[group_by], **{field: row[field] for field in AGGREGATE_FIELDS}))
+            if len(batch) >= batch_size:
+                model.objects.bulk_update(batch, AGGREGATE_FIELDS)
+                total += len(batch)
+                batch = []
+        model.objects.bulk_update(batch, AGGREGATE_FIELDS)
+        total += len(batch)
+        
+        # Same expression as the incremental updates, so both round alike
+        model.objects.update(rating=average('rating_sum', 'review_count'))
+        return total
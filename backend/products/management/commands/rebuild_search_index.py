@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.search import index_products
+
+
+class Command(BaseCommand):
+    help = 'สร้างดัชนีค้นหาสินค้าใหม่ทั้งหมด'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+    
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        products = Product.objects.only('id', 'name', 'description').order_by('id')
+        
+        batch = []
+        total = 0
+        for product in products.iterator(chunk_size=batch_size):
+            batch.append(product)
+            if len(batch) >= batch_size:
+                index_products(batch)
+                total += len(batch)
+                batch = []
+        index_products(batch)
+        total += len(batch)
+        
+        self.stdout.write(self.style.SUCCESS(f'สร้างดัชนีสินค้า {total} รายการ'))
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -20,10 +22,64 @@ class Product(models.Model):
     stock = models.IntegerField(default=0)
     sold = models.IntegerField(default=0)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    # Review aggregates, kept up to date by products.reviews (rating = rating_sum / review_count)
+    review_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
+    # Widths of the WebP/JPEG variants made from image so far (see core.images)
+    image_variants = models.JSONField(default=list, blank=True, editable=False)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     shop = models.ForeignKey('shops.Shop', on_delete=models.CASCADE, related_name='products', null=True, blank=True)  # เพิ่มบรรทัดนี้
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        # One index per keyset ordering: (ordering field, id)
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['sold', 'id'], name='product_sold_id_idx'),
+            models.Index(fields=['rating', 'id'], name='product_rating_id_idx'),
+            models.Index(fields=['shop', 'created_at', 'id'], name='product_shop_created_id_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='product_cat_created_id_idx'),
+        ]
+    
+    def __str__(self):
+        return self.name
+
+class ProductSearchTerm(models.Model):
+    """ดัชนีค้นหาแบบ inverted index: หนึ่งแถวต่อหนึ่งคำต่อหนึ่งสินค้า"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField(default=1)
+    
+    class Meta:
+        unique_together = ['term', 'product']
+    
+    def __str__(self):
+        return f"{self.term} → {self.product_id}"
+
+
+class Review(models.Model):
+    """รีวิวสินค้า หนึ่งรีวิวต่อผู้ใช้ต่อสินค้า"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reviews')
+    rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    comment = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['product', 'user']
+        indexes = [
+            # Keyset pages of one product's reviews
+            models.Index(fields=['product', 'created_at', 'id'], name='review_product_created_id_idx'),
+            models.Index(fields=['product', 'rating', 'id'], name='review_product_rating_id_idx'),
+        ]
+    
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.user_id} → {self.product_id} ({self.rating})"
@@ -0,0 +1,11 @@
+from core.pagination import KeysetPagination
+
+
+class ProductPagination(KeysetPagination):
+    ordering = '-created_at'
+    ordering_fields = ['price', 'sold', 'rating', 'created_at']
+
+
+class ReviewPagination(KeysetPagination):
+    ordering = '-created_at'
+    ordering_fields = ['created_at', 'rating']
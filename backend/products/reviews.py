@@ -0,0 +1,65 @@
+"""
+Review aggregates.
+
+Product and Shop keep review_count, rating_sum and a count per star
+(rating_1 … rating_5). Creating, editing or deleting a review adjusts
+those columns with one UPDATE per row, in which the new average is
+computed from the same F() expressions, so nothing ever re-reads the
+reviews. rebuild_ratings recomputes everything when the columns drift.
+"""
+from django.db.models import F, FloatField, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+from core.cache import bump_version
+from shops.models import Shop
+from .models import Product
+
+STARS = range(1, 6)
+AGGREGATE_FIELDS = ['review_count', 'rating_sum'] + [f'rating_{star}' for star in STARS]
+
+
+def review_deltas(old_rating=None, new_rating=None):
+    """ค่าที่ต้องบวก/ลบในคอลัมน์สรุปเมื่อรีวิวเปลี่ยนจาก old_rating เป็น new_rating (None = ไม่มีรีวิว)"""
+    deltas = {}
+    for rating, sign in ((old_rating, -1), (new_rating, 1)):
+        if rating is None:
+            continue
+        for field, value in (('review_count', 1), ('rating_sum', rating), (f'rating_{rating}', 1)):
+            deltas[field] = deltas.get(field, 0) + value * sign
+    return {field: value for field, value in deltas.items() if value}
+
+
+def average(rating_sum, review_count):
+    """Expression for the average rounded to the rating column's 2 places, 0 without reviews"""
+    return Coalesce(
+        Round(Cast(rating_sum, FloatField()) / NullIf(review_count, 0), 2),
+        Value(0.0),
+    )
+
+
+def updates(deltas):
+    values = {field: F(field) + value for field, value in deltas.items()}
+    # Right-hand sides see the row before the UPDATE, so apply the deltas here too
+    values['rating'] = average(
+        F('rating_sum') + deltas.get('rating_sum', 0),
+        F('review_count') + deltas.get('review_count', 0),
+    )
+    return values
+
+
+def record_review_change(product_id, old_rating=None, new_rating=None):
+    """ปรับยอดรีวิวของสินค้าและร้านของสินค้า (หนึ่ง UPDATE ต่อแถว)"""
+    deltas = review_deltas(old_rating, new_rating)
+    if not deltas:
+        return
+    values = updates(deltas)
+    Product.objects.filter(pk=product_id).update(**values)
+    Shop.objects.filter(
+        pk=Subquery(Product.objects.filter(pk=product_id).values('shop_id')[:1])
+    ).update(**values)
+    bump_version('products', 'shops')
+
+
+def histogram(obj):
+    """{1: n, …, 5: n} จากคอลัมน์ rating_1 … rating_5"""
+    return {star: getattr(obj, f'rating_{star}') for star in STARS}
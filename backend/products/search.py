@@ -0,0 +1,109 @@
+import re
+import unicodedata
+from collections import Counter
+
+from django.db.models import OuterRef, Q, Subquery, Sum
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from .models import ProductSearchTerm
+
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+MAX_TERM_LENGTH = 64
+
+# Thai has no spaces between words, so a Thai run is cut into character
+# clusters (leading vowel + base + combining marks) and indexed as cluster
+# bigrams. This needs no dictionary and matches any part of a Thai word.
+# Latin words and numbers are indexed whole. Query terms match by prefix.
+TOKEN_RE = re.compile(r'[\u0e01-\u0e5b]+|[^\W_\u0e01-\u0e5b]+')
+THAI_RUN_RE = re.compile(r'[\u0e01-\u0e5b]+')
+THAI_CLUSTER_RE = re.compile(
+    r'[\u0e40-\u0e44]?[^\u0e31\u0e34-\u0e3a\u0e47-\u0e4e][\u0e31\u0e34-\u0e3a\u0e47-\u0e4e]*'
+    r'|[\u0e31\u0e34-\u0e3a\u0e47-\u0e4e]+'
+)
+
+
+def normalize(text):
+    return unicodedata.normalize('NFC', text or '').lower()
+
+
+def thai_bigrams(run):
+    clusters = THAI_CLUSTER_RE.findall(run)
+    if len(clusters) < 2:
+        return clusters
+    return [clusters[i] + clusters[i + 1] for i in range(len(clusters) - 1)]
+
+
+def tokenize(text):
+    """แยกข้อความเป็นคำสำหรับดัชนี (คืนค่าเป็น list ที่อาจมีคำซ้ำ)"""
+    terms = []
+    for token in TOKEN_RE.findall(normalize(text)):
+        if THAI_RUN_RE.fullmatch(token):
+            terms.extend(thai_bigrams(token))
+        else:
+            terms.append(token)
+    return [term[:MAX_TERM_LENGTH] for term in terms]
+
+
+def product_terms(product):
+    """น้ำหนักของแต่ละคำในสินค้า: ชื่อสินค้ามีน้ำหนักมากกว่ารายละเอียด"""
+    weights = Counter()
+    for term in tokenize(product.name):
+        weights[term] += NAME_WEIGHT
+    for term in tokenize(product.description):
+        weights[term] += DESCRIPTION_WEIGHT
+    return weights
+
+
+def index_products(products):
+    """สร้างดัชนีของสินค้าชุดนี้ใหม่ (ลบของเดิมแล้ว insert ครั้งเดียว)"""
+    products = list(products)
+    if not products:
+        return
+    ProductSearchTerm.objects.filter(product__in=products).delete()
+    ProductSearchTerm.objects.bulk_create([
+        ProductSearchTerm(product=product, term=term, weight=weight)
+        for product in products
+        for term, weight in product_terms(product).items()
+    ], batch_size=1000)
+
+
+def term_filter(term):
+    # Prefix match written as a range so the B-tree index on term is used
+    return Q(term__gte=term, term__lt=term + '\uffff')
+
+
+def search_products(queryset, query):
+    """กรองสินค้าที่มีทุกคำในคำค้น และเติมคะแนนความเกี่ยวข้อง search_rank"""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return queryset
+    
+    any_term = Q()
+    for term in terms:
+        matches = ProductSearchTerm.objects.filter(term_filter(term)).values('product_id')
+        queryset = queryset.filter(id__in=matches)
+        any_term |= term_filter(term)
+    
+    rank = (ProductSearchTerm.objects
+            .filter(any_term, product=OuterRef('pk'))
+            .values('product')
+            .annotate(score=Sum('weight'))
+            .values('score'))
+    return queryset.annotate(search_rank=Subquery(rank))
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """ค้นหาด้วย ?search= ผ่านดัชนี เรียงตามความเกี่ยวข้องถ้าไม่ได้ระบุ ordering"""
+    search_param = api_settings.SEARCH_PARAM
+    
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        
+        queryset = search_products(queryset, query)
+        if 'search_rank' in queryset.query.annotations and api_settings.ORDERING_PARAM not in request.query_params:
+            queryset = queryset.order_by('-search_rank', '-created_at')
+        return queryset
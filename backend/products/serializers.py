@@ -1,23 +1,53 @@
 from rest_framework import serializers
-from .models import Product, Category
+from core.counters import SaveChangedFieldsMixin, add_pending
+from core.fieldsets import FieldsetMixin
+from core.images import variant_srcset
+from .models import Product, Category, Review
+from .reviews import STARS, histogram
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(FieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SaveChangedFieldsMixin, FieldsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     shop_name = serializers.CharField(source='shop.name', read_only=True)
+    image_srcset = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'description', 'price', 'original_price', 
-            'discount_percentage', 'stock', 'sold', 'rating', 'image',
-            'category', 'category_name', 'shop', 'shop_name', 'created_at'
+            'discount_percentage', 'stock', 'sold', 'rating', 'review_count', 'rating_histogram',
+            'image', 'image_srcset', 'category', 'category_name', 'shop', 'shop_name', 'created_at'
         ]
-        read_only_fields = ['sold', 'rating', 'shop', 'created_at']
+        read_only_fields = ['sold', 'rating', 'review_count', 'shop', 'created_at']
+        field_sources = {
+            'image_srcset': ['image', 'image_variants'],
+            'rating_histogram': [f'rating_{star}' for star in STARS],
+        }
+        expandable_fields = {
+            'category': (CategorySerializer, ['id', 'name', 'icon']),
+            # follower_count/is_following would cost queries per row, and
+            # is_following differs per user while the list is cached for all
+            'shop': ('shops.serializers.ShopSerializer',
+                     ['id', 'name', 'slug', 'logo', 'logo_srcset', 'rating', 'is_verified'],
+                     ['id', 'name', 'slug', 'description', 'logo', 'logo_srcset', 'banner', 'banner_srcset',
+                      'city', 'rating', 'review_count', 'rating_histogram', 'total_products', 'total_sold',
+                      'is_verified', 'created_at']),
+        }
+    
+    def get_image_srcset(self, obj):
+        return variant_srcset(obj.image, obj.image_variants, self.context.get('request'))
+    
+    def get_rating_histogram(self, obj):
+        return histogram(obj)
+    
+    def to_representation(self, instance):
+        # Sales not yet compacted into the columns (see core.counters)
+        return add_pending(super().to_representation(instance), instance, ['stock', 'sold'])
     
     def validate_price(self, value):
         """ตรวจสอบราคา"""
@@ -40,4 +70,27 @@ class ProductSerializer(serializers.ModelSerializer):
                     'original_price': 'ราคาเดิมต้องมากกว่าหรือเท่ากับราคาปัจจุบัน'
                 })
         
-        return data
\ No newline at end of file
+        return data
+
+class ReviewSerializer(FieldsetMixin, serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    
+    class Meta:
+        model = Review
+        fields = ['id', 'product', 'user', 'username', 'rating', 'comment', 'created_at', 'updated_at']
+        read_only_fields = ['user', 'created_at', 'updated_at']
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        # A review stays on the product it was written for
+        if self.instance is not None:
+            fields['product'].read_only = True
+        return fields
+    
+    def validate(self, data):
+        """หนึ่งรีวิวต่อผู้ใช้ต่อสินค้า"""
+        product = data.get('product')
+        request = self.context.get('request')
+        if product is not None and Review.objects.filter(product=product, user=request.user).exists():
+            raise serializers.ValidationError({'product': 'คุณรีวิวสินค้านี้แล้ว'})
+        return data
@@ -0,0 +1,62 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.cache import bump_version
+from core.images import track_image_fields
+from orders.signals import order_placed
+from .models import Product, Category, Review
+from .reviews import record_review_change
+from .search import index_products
+
+track_image_fields(Product, 'image')
+
+
+@receiver(post_init, sender=Product)
+def remember_search_text(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not fetched
+    instance._indexed_text = (instance.__dict__.get('name'), instance.__dict__.get('description'))
+
+
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, created, **kwargs):
+    text = (instance.name, instance.description)
+    if created or text != instance._indexed_text:
+        index_products([instance])
+        instance._indexed_text = text
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(order_placed)
+def expire_product_responses(sender, **kwargs):
+    bump_version('products')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def expire_category_responses(sender, **kwargs):
+    bump_version('categories')
+
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    instance._loaded_rating = instance.__dict__.get('rating')
+
+
+@receiver(post_save, sender=Review)
+def count_review_save(sender, instance, created, **kwargs):
+    old_rating = None if created else instance._loaded_rating
+    if old_rating != instance.rating:
+        record_review_change(instance.product_id, old_rating, instance.rating)
+    instance._loaded_rating = instance.rating
+
+
+@receiver(post_delete, sender=Review)
+def count_review_delete(sender, instance, **kwargs):
+    record_review_change(instance.product_id, instance._loaded_rating)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def expire_review_responses(sender, **kwargs):
+    bump_version('reviews')
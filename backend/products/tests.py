@@ -1,3 +1,706 @@
+import io
+import json
+from base64 import urlsafe_b64encode
+import os
+import tempfile
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from core.jobs import enqueue, run_pending
+from core.models import Snapshot
+from shops.models import Shop, ShopFollower
+from .home import SNAPSHOT_NAME
+from .models import Product, Category, ProductSearchTerm, Review
+from .search import MAX_TERM_LENGTH, tokenize
+
+
+class ProductQueryCountTests(TestCase):
+    """จำนวน query ของ endpoint ต้องคงที่ ไม่ขึ้นกับจำนวนแถว"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        cls.shop = Shop.objects.create(owner=cls.seller, name='Shop', slug='shop', phone='0800000000',
+                                       email='shop@example.com', address='addr', city='BKK', postal_code='10100')
+        cls.categories = [Category.objects.create(name=f'Category {i}') for i in range(3)]
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+    
+    def create_products(self, count):
+        Product.objects.bulk_create([
+            Product(name=f'Product {i}', description='desc', price=100 + i, stock=10,
+                    category=self.categories[i % 3], shop=self.shop)
+            for i in range(count)
+        ])
+    
+    def assertConstantQueries(self, num, url):
+        for count in (2, 10):
+            Product.objects.all().delete()
+            self.create_products(count)
+            cache.clear()
+            with self.assertNumQueries(num):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+    
+    def test_product_list(self):
+        self.assertConstantQueries(1, '/api/products/')
+    
+    def test_product_list_filtered(self):
+        # the filterset validates the category id with one lookup
+        self.assertConstantQueries(2, f'/api/products/?category={self.categories[0].id}&ordering=price')
+    
+    def test_my_products(self):
+        for count in (2, 10):
+            Product.objects.all().delete()
+            self.create_products(count)
+            client = APIClient()
+            client.force_authenticate(User.objects.get(pk=self.seller.pk))
+            # shop lookup for the user + product list
+            with self.assertNumQueries(2):
+                response = client.get('/api/products/my_products/')
+            self.assertEqual(response.status_code, 200)
+    
+    def test_product_detail(self):
+        self.create_products(1)
+        product = Product.objects.get()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_category_list(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/categories/')
+        self.assertEqual(response.status_code, 200)
+    
+    def get_sparse(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        return response, queries[0]['sql']
+    
+    def test_sparse_fields(self):
+        self.create_products(3)
+        response, sql = self.get_sparse('/api/products/?fields=id,name,price,image_srcset,rating_histogram')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'price', 'image_srcset', 'rating_histogram'})
+        self.assertNotIn('"description"', sql)
+        # No joins or pending-counter subqueries for fields that are not returned
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('countershard', sql)
+        
+        response, sql = self.get_sparse('/api/products/?omit=description')
+        self.assertNotIn('description', response.data['results'][0])
+        self.assertIn('shop_name', response.data['results'][0])
+        self.assertNotIn('"description"', sql)
+    
+    def test_sparse_fields_keep_the_cursor_column(self):
+        self.create_products(3)
+        response = self.client.get('/api/products/?fields=id&ordering=price&page_size=2')
+        self.assertEqual([set(row) for row in response.data['results']], [{'id'}, {'id'}])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['id'] for row in response.data['results']], [Product.objects.order_by('price').last().id])
+    
+    def test_expand(self):
+        self.create_products(2)
+        response, sql = self.get_sparse('/api/products/?fields=id,category,shop.name&expand=category,shop')
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'category', 'shop'})
+        self.assertEqual(set(row['category']), {'id', 'name', 'icon'})
+        self.assertEqual(row['shop'], {'name': 'Shop'})
+        self.assertNotIn('"description"', sql)
+    
+    def test_expand_leaves_out_per_user_shop_fields(self):
+        follower = User.objects.create_user(username='follower', email='follower@example.com', password='pass1234')
+        ShopFollower.objects.create(shop=self.shop, user=follower)
+        url = '/api/products/?fields=id,shop.name,shop.is_following,shop.follower_count&expand=shop'
+        self.assertConstantQueries(1, url)
+        
+        # The list is cached for everyone, so the follower's answer must not reach others
+        client = APIClient()
+        client.force_authenticate(follower)
+        shops = [client.get(url).data['results'][0]['shop'], self.client.get(url).data['results'][0]['shop']]
+        self.assertEqual(shops, [{'name': 'Shop'}, {'name': 'Shop'}])
+
+
+class KeysetPaginationTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Category')
+        Product.objects.bulk_create([
+            Product(name=f'Item {i}', description='desc', price=100 + i % 2, stock=1, sold=i % 3, category=category)
+            for i in range(7)
+        ])
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+    
+    def walk(self, url):
+        """ids ของทุกหน้าตามลิงก์ next และลิงก์ previous ของหน้าสุดท้าย"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['id'] for row in response.data['results']])
+            previous, url = response.data['previous'], response.data['next']
+        return pages, previous
+    
+    def test_pages_cover_every_row_once(self):
+        for ordering in ['', 'price', '-sold', 'created_at']:
+            with self.subTest(ordering=ordering):
+                pages, previous = self.walk(f'/api/products/?page_size=2&ordering={ordering}')
+                ids = [pk for page in pages for pk in page]
+                self.assertEqual(sorted(ids), sorted(Product.objects.values_list('id', flat=True)))
+                self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+                response = self.client.get(previous)
+                self.assertEqual([row['id'] for row in response.data['results']], pages[-2])
+    
+    def cursor(self, position):
+        return urlsafe_b64encode(json.dumps(position).encode()).decode()
+    
+    def test_malformed_cursors_are_not_found(self):
+        valid = {'v': '2026-01-01T00:00:00+00:00', 'k': 1, 'r': 0}
+        cursors = ['not-base64!', self.cursor([1, 2]), self.cursor({'v': 1})] + [
+            self.cursor({**valid, **change}) for change in [
+                {'v': 'abc'}, {'v': None}, {'v': [1]}, {'v': {'a': 1}}, {'v': 5},
+                {'k': 'abc'}, {'k': None}, {'k': 2 ** 70}, {'k': [1]}, {'r': 'x'}, {'r': 2},
+            ]
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get('/api/products/', {'cursor': cursor}).status_code, 404)
+        for ordering, value in [('price', 'abc'), ('price', 'NaN'), ('sold', 'abc'), ('sold', True)]:
+            with self.subTest(ordering=ordering, value=value):
+                cursor = self.cursor({'v': value, 'k': 1, 'r': 0})
+                response = self.client.get('/api/products/', {'cursor': cursor, 'ordering': ordering})
+                self.assertEqual(response.status_code, 404)
+        
+        response = self.client.get('/api/products/', {'cursor': self.cursor(valid)})
+        self.assertEqual(response.status_code, 200)
+
+
+class SearchTests(TestCase):
+    """ดัชนีค้นหา (products.search): การตัดคำ การอัปเดตดัชนี และการค้นผ่าน API"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category')
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+    
+    def create(self, name, description='', price=100):
+        return Product.objects.create(name=name, description=description, price=price, stock=1,
+                                      category=self.category)
+    
+    def terms(self, product):
+        return dict(ProductSearchTerm.objects.filter(product=product).values_list('term', 'weight'))
+    
+    def search(self, query, **params):
+        response = self.client.get('/api/products/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.data['results']]
+    
+    def test_thai_runs_become_cluster_bigrams(self):
+        # Vowels and tone marks stay with their consonant
+        self.assertEqual(tokenize('เสื้อผ้า'), ['เสื้อ', 'อผ้', 'ผ้า'])
+        self.assertEqual(tokenize('กระเป๋า'), ['กร', 'ระ', 'ะเป๋', 'เป๋า'])
+        # A word of one or two clusters is one term
+        self.assertEqual(tokenize('ไม้'), ['ไม้'])
+        self.assertEqual(tokenize('น้ำ'), ['น้ำ'])
+        self.assertEqual(tokenize('เสื้อยืด cotton'), ['เสื้อ', 'อยื', 'ยืด', 'cotton'])
+    
+    def test_latin_words_are_indexed_whole(self):
+        self.assertEqual(tokenize('iPhone 15 Pro_Max, 100%!'), ['iphone', '15', 'pro', 'max', '100'])
+        # Decomposed accents match the composed form
+        self.assertEqual(tokenize('Cafe\u0301'), ['café'])
+        self.assertEqual(tokenize('x' * 100), ['x' * MAX_TERM_LENGTH])
+        self.assertEqual(tokenize(' ...  '), [])
+    
+    def test_index_follows_saves_and_deletes(self):
+        product = self.create('Red shirt', 'red cotton')
+        self.assertEqual(self.terms(product), {'red': 4, 'shirt': 3, 'cotton': 1})
+        
+        # Edits that leave the text alone do not touch the index
+        product.price = 120
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+        self.assertFalse(any('productsearchterm' in query['sql'] for query in queries))
+        
+        product.name = 'เสื้อ'
+        product.save()
+        self.assertEqual(self.terms(product), {'เสื้อ': 3, 'red': 1, 'cotton': 1})
+        
+        product_id = product.pk
+        product.delete()
+        self.assertFalse(ProductSearchTerm.objects.filter(product_id=product_id).exists())
+    
+    def test_rebuild_command(self):
+        self.create('Red shirt')
+        self.create('Blue shirt')
+        ProductSearchTerm.objects.all().delete()
+        call_command('rebuild_search_index', batch_size=1, stdout=io.StringIO())
+        self.assertEqual(ProductSearchTerm.objects.filter(term='shirt').count(), 2)
+    
+    def test_search_matches_every_term_by_prefix(self):
+        self.create('เสื้อยืด cotton')
+        self.create('เสื้อเชิ้ต linen')
+        self.create('กระเป๋าผ้า cotton')
+        
+        self.assertEqual(set(self.search('cotton')), {'เสื้อยืด cotton', 'กระเป๋าผ้า cotton'})
+        self.assertEqual(self.search('cott เสื้อ'), ['เสื้อยืด cotton'])
+        # Any part of a Thai word
+        self.assertEqual(self.search('ยืด'), ['เสื้อยืด cotton'])
+        self.assertEqual(self.search('เป๋า'), ['กระเป๋าผ้า cotton'])
+        self.assertEqual(self.search('wool'), [])
+        # Nothing to search for: the plain list
+        self.assertEqual(len(self.search('!!')), 3)
+    
+    def test_ranked_by_weight_unless_ordered(self):
+        self.create('Bag', 'a bag for a phone', price=10)
+        self.create('Phone', 'phone case', price=30)
+        self.create('Phone stand', price=20)
+        
+        # Name hits outweigh description hits; repeats add up
+        self.assertEqual(self.search('phone'), ['Phone', 'Phone stand', 'Bag'])
+        self.assertEqual(self.search('phone', ordering='price'), ['Bag', 'Phone stand', 'Phone'])
+
+
+class AsyncViewTests(TestCase):
+    """endpoint แบบ async ต้องตอบเหมือน endpoint ของ DRF"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.phones = Category.objects.create(name='Phones')
+        cls.books = Category.objects.create(name='Books')
+        for i in range(5):
+            Product.objects.create(name=f'Phone {i}', description='เสื้อยืด', price=100 + i, stock=3,
+                                   category=cls.phones if i % 2 else cls.books)
+    
+    def setUp(self):
+        cache.clear()
+    
+    async def get(self, url, **params):
+        response = await self.async_client.get(url, params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response
+    
+    async def test_product_list_matches_drf(self):
+        for params in ({}, {'category': self.phones.pk, 'ordering': 'price'}, {'search': 'phone 3'},
+                       {'min_price': 102, 'ordering': '-price'}):
+            response = await self.get('/api/async/products/', **params)
+            self.assertEqual(response.status_code, 200)
+            expected = await sync_to_async(self.client.get)('/api/products/', params)
+            self.assertEqual(response.json(), expected.json())
+    
+    async def test_product_detail(self):
+        product = await Product.objects.aget(name='Phone 2')
+        response = await self.get(f'/api/async/products/{product.pk}/')
+        self.assertEqual(response.json()['name'], 'Phone 2')
+        
+        response = await self.get('/api/async/products/999999/')
+        self.assertEqual((response.status_code, response.json()), (404, {'detail': 'No Product matches the given query.'}))
+    
+    async def test_category_list(self):
+        response = await self.get('/api/async/categories/')
+        self.assertEqual([category['name'] for category in response.json()], ['Phones', 'Books'])
+    
+    async def test_errors(self):
+        response = await self.async_client.post('/api/async/categories/')
+        self.assertEqual(response.status_code, 405)
+        response = await self.get('/api/async/products/', shop='abc')
+        self.assertEqual(response.status_code, 400)
+        response = await self.get('/api/async/products/', cursor='bad')
+        self.assertEqual(response.status_code, 404)
+
+
+class CatalogCacheTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        cls.shop = Shop.objects.create(owner=cls.seller, name='Shop', slug='shop', phone='0800000000',
+                                       email='shop@example.com', address='addr', city='BKK', postal_code='10100')
+        cls.category = Category.objects.create(name='Category')
+        cls.product = Product.objects.create(name='Product', description='desc', price=100, stock=10,
+                                             category=cls.category, shop=cls.shop)
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+    
+    def test_cached_list_skips_queries(self):
+        self.client.get('/api/products/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+    
+    def test_query_params_are_normalized(self):
+        self.client.get('/api/products/?ordering=price&search=')
+        with self.assertNumQueries(0):
+            self.client.get('/api/products/?ordering=price')
+    
+    def test_conditional_get(self):
+        etag = self.client.get(f'/api/products/{self.product.id}/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/products/{self.product.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_product_write_invalidates(self):
+        etag = self.client.get('/api/products/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Renamed'
+            self.product.save()
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['name'], 'Renamed')
+    
+    def test_category_write_invalidates(self):
+        self.client.get('/api/categories/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Another')
+        response = self.client.get('/api/categories/')
+        self.assertEqual(len(response.data), 2)
+    
+    def test_shop_write_invalidates_products(self):
+        self.client.get('/api/products/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shop.name = 'Renamed shop'
+            self.shop.save()
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.data['results'][0]['shop_name'], 'Renamed shop')
+
+
+
+class ReviewAggregateTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        cls.shop = Shop.objects.create(owner=cls.seller, name='Shop', slug='shop', phone='0800000000',
+                                       email='shop@example.com', address='addr', city='BKK', postal_code='10100')
+        cls.category = Category.objects.create(name='Category')
+        cls.product = Product.objects.create(name='Product', description='desc', price=100, stock=10,
+                                             category=cls.category, shop=cls.shop)
+        cls.other = Product.objects.create(name='Other', description='desc', price=100, stock=10,
+                                           category=cls.category, shop=cls.shop)
+        cls.buyers = [
+            User.objects.create_user(username=f'buyer{i}', email=f'buyer{i}@example.com', password='pass1234')
+            for i in range(3)
+        ]
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+    
+    def review(self, buyer, rating, product=None):
+        self.client.force_authenticate(buyer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/reviews/', {
+                'product': (product or self.product).id, 'rating': rating, 'comment': 'ok'
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+    
+    def assertAggregates(self, obj, count, rating, stars):
+        obj.refresh_from_db()
+        self.assertEqual(obj.review_count, count)
+        self.assertEqual(obj.rating_sum, sum(star * n for star, n in stars.items()))
+        self.assertEqual(obj.rating, Decimal(rating))
+        self.assertEqual({star: getattr(obj, f'rating_{star}') for star in range(1, 6)},
+                         {star: stars.get(star, 0) for star in range(1, 6)})
+    
+    def test_create_edit_delete(self):
+        first = self.review(self.buyers[0], 5)
+        self.review(self.buyers[1], 4)
+        self.review(self.buyers[2], 4)
+        self.assertAggregates(self.product, 3, '4.33', {5: 1, 4: 2})
+        
+        self.client.force_authenticate(self.buyers[0])
+        # Review lookup + save + one UPDATE each for product and shop; no review is re-read
+        with self.assertNumQueries(4):
+            response = self.client.patch(f'/api/reviews/{first}/', {'rating': 1}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertAggregates(self.product, 3, '3.00', {1: 1, 4: 2})
+        
+        response = self.client.delete(f'/api/reviews/{first}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertAggregates(self.product, 2, '4.00', {4: 2})
+        
+        Review.objects.all().delete()
+        self.assertAggregates(self.product, 0, '0.00', {})
+    
+    def test_shop_totals_cover_all_products(self):
+        self.review(self.buyers[0], 5)
+        self.review(self.buyers[0], 2, product=self.other)
+        self.assertAggregates(self.shop, 2, '3.50', {5: 1, 2: 1})
+        
+        response = self.client.get(f'/api/shops/{self.shop.slug}/')
+        self.assertEqual(response.data['review_count'], 2)
+        self.assertEqual(response.data['rating_histogram'], {5: 1, 4: 0, 3: 0, 2: 1, 1: 0})
+    
+    def test_rating_drives_filter_and_ordering(self):
+        self.review(self.buyers[0], 5)
+        self.review(self.buyers[0], 2, product=self.other)
+        response = self.client.get('/api/products/?min_rating=4')
+        self.assertEqual([row['id'] for row in response.data['results']], [self.product.id])
+        response = self.client.get('/api/products/?ordering=rating')
+        self.assertEqual([row['id'] for row in response.data['results']], [self.other.id, self.product.id])
+    
+    def test_one_review_per_user(self):
+        self.review(self.buyers[0], 5)
+        response = self.client.post('/api/reviews/', {'product': self.product.id, 'rating': 3}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/reviews/', {'product': self.product.id, 'rating': 6}, format='json')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_only_author_can_edit(self):
+        review_id = self.review(self.buyers[0], 5)
+        self.client.force_authenticate(self.buyers[1])
+        response = self.client.patch(f'/api/reviews/{review_id}/', {'rating': 1}, format='json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.delete(f'/api/reviews/{review_id}/')
+        self.assertEqual(response.status_code, 404)
+    
+    def test_list_is_paginated_and_invalidated(self):
+        for buyer, rating in zip(self.buyers, (5, 4, 5)):
+            self.review(buyer, rating)
+        self.client.force_authenticate(None)
+        
+        response = self.client.get(f'/api/reviews/?product={self.product.id}&page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        
+        response = self.client.get(f'/api/reviews/?product={self.product.id}&rating=5')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(self.client.get('/api/reviews/').status_code, 400)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.filter(user=self.buyers[0]).update(comment='edited')
+            Review.objects.get(user=self.buyers[0]).save()
+        response = self.client.get(f'/api/reviews/?product={self.product.id}&rating=5')
+        self.assertIn('edited', [row['comment'] for row in response.data['results']])
+    
+    def test_rebuild_repairs_drift(self):
+        self.review(self.buyers[0], 5)
+        self.review(self.buyers[1], 3)
+        self.review(self.buyers[2], 4, product=self.other)
+        Product.objects.update(review_count=99, rating_sum=0, rating_5=7, rating=Decimal('1.00'))
+        Shop.objects.update(review_count=0, rating=0)
+        
+        call_command('rebuild_ratings', stdout=io.StringIO())
+        
+        self.assertAggregates(self.product, 2, '4.00', {5: 1, 3: 1})
+        self.assertAggregates(self.other, 1, '4.00', {4: 1})
+        self.assertAggregates(self.shop, 3, '4.00', {5: 1, 4: 1, 3: 1})
+    
+    def test_benchmark_lists_reviews_of_a_product(self):
+        review_id = self.review(self.buyers[0], 5)
+        Product.objects.filter(pk=self.product.pk).update(sold=10)
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'bench.json')
+            stdout = io.StringIO()
+            call_command('benchmark', user=self.seller.email, filter='/api/reviews/', iterations=1, warmup=0,
+                         output=output, stdout=stdout)
+            with open(output, encoding='utf-8') as fh:
+                results = json.load(fh)['results']
+        
+        self.assertEqual([(row['url'], row['status']) for row in results],
+                         [(f'/api/reviews/?product={self.product.id}', 200), (f'/api/reviews/{review_id}/', 200)])
+
+
+class ProductFacetTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        cls.other_seller = User.objects.create_user(username='seller2', email='seller2@example.com', password='pass1234')
+        cls.shop = Shop.objects.create(owner=cls.seller, name='Shop', slug='shop', phone='0800000000',
+                                       email='shop@example.com', address='addr', city='BKK', postal_code='10100')
+        cls.other_shop = Shop.objects.create(owner=cls.other_seller, name='Other', slug='other', phone='0800000000',
+                                             email='other@example.com', address='addr', city='BKK', postal_code='10100')
+        cls.phones = Category.objects.create(name='Phones')
+        cls.books = Category.objects.create(name='Books')
+        # (category, shop, price, rating)
+        rows = [
+            (cls.phones, cls.shop, 150, '4.50'),
+            (cls.phones, cls.shop, 420, '3.20'),
+            (cls.phones, cls.other_shop, 980, '5.00'),
+            (cls.books, cls.other_shop, 120, '4.00'),
+            (cls.books, cls.other_shop, 90, '0'),
+        ]
+        Product.objects.bulk_create([
+            Product(name=f'Item {i}', description='desc', price=price, rating=Decimal(rating), stock=1,
+                    category=category, shop=shop)
+            for i, (category, shop, price, rating) in enumerate(rows)
+        ])
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+    
+    def facets(self, query=''):
+        response = self.client.get(f'/api/products/?facets=1{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['facets']
+    
+    def test_counts(self):
+        facets = self.facets()
+        self.assertEqual(facets['total'], 5)
+        self.assertEqual([(row['name'], row['count']) for row in facets['category']], [('Phones', 3), ('Books', 2)])
+        self.assertEqual([(row['slug'], row['count']) for row in facets['shop']], [('other', 3), ('shop', 2)])
+        self.assertEqual([(row['min_rating'], row['count']) for row in facets['rating']],
+                         [(5, 1), (4, 3), (3, 4), (2, 4), (1, 4)])
+        
+        price = facets['price']
+        self.assertEqual((price['min'], price['max']), (90, 980))
+        self.assertEqual(sum(bucket['count'] for bucket in price['buckets']), 5)
+        # Ten buckets over 90-980 round to a width of 100
+        self.assertEqual([(bucket['from'], bucket['count']) for bucket in price['buckets']],
+                         [(0, 1), (100, 2), (400, 1), (900, 1)])
+    
+    def test_facet_ignores_its_own_filter(self):
+        facets = self.facets(f'&category={self.books.id}&min_price=100')
+        # Other categories are still counted, under the other filters
+        self.assertEqual([(row['name'], row['count']) for row in facets['category']], [('Phones', 3), ('Books', 1)])
+        self.assertEqual(facets['total'], 1)
+        # The price histogram is not narrowed by the price filter itself
+        self.assertEqual(sum(bucket['count'] for bucket in facets['price']['buckets']), 2)
+        self.assertEqual([(row['slug'], row['count']) for row in facets['shop']], [('other', 1)])
+    
+    def test_cached_per_filter_set(self):
+        self.facets('&min_rating=3')
+        # Same filters on another page/ordering: only the list itself is queried
+        with self.assertNumQueries(1):
+            facets = self.facets('&min_rating=3&ordering=price')
+        self.assertEqual(facets['total'], 4)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='New', description='desc', price=500, rating=Decimal('3.5'),
+                                   category=self.books, shop=self.shop)
+        self.assertEqual(self.facets('&min_rating=3')['total'], 5)
+    
+    def test_one_query_per_facet(self):
+        # list + category + shop + rating + price (min/max and buckets)
+        with self.assertNumQueries(6):
+            self.facets()
+    
+    def test_without_facets(self):
+        response = self.client.get('/api/products/')
+        self.assertNotIn('facets', response.data)
+
 
-# Create your tests here.
+class HomeFeedTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        cls.shop = Shop.objects.create(owner=cls.seller, name='Shop', slug='shop', phone='0800000000',
+                                       email='shop@example.com', address='addr', city='BKK', postal_code='10100')
+        cls.phones = Category.objects.create(name='Phones', icon='phone')
+        cls.books = Category.objects.create(name='Books', icon='book')
+        cls.empty = Category.objects.create(name='Empty')
+        # (category, sold); created in this order, so the last is the newest
+        rows = [(cls.phones, 5), (cls.phones, 50), (cls.phones, 20), (cls.books, 10), (cls.books, 1)]
+        cls.products = [
+            Product.objects.create(name=f'Item {i}', description='desc', price=100, stock=1, sold=sold,
+                                   category=category, shop=cls.shop)
+            for i, (category, sold) in enumerate(rows)
+        ]
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+    
+    def build(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('products.build_home_feed')
+            self.assertEqual(run_pending(), 1)
+    
+    def names(self, products):
+        return [product['name'] for product in products]
+    
+    def test_sections(self):
+        self.build()
+        response = self.client.get('/api/home/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([category['name'] for category in data['categories']], ['Phones', 'Books', 'Empty'])
+        self.assertEqual(self.names(data['best_sellers']), ['Item 1', 'Item 2', 'Item 3', 'Item 0', 'Item 4'])
+        self.assertEqual(self.names(data['new_arrivals']), ['Item 4', 'Item 3', 'Item 2', 'Item 1', 'Item 0'])
+        self.assertEqual([(section['name'], section['icon'], self.names(section['products']))
+                          for section in data['by_category']],
+                         [('Phones', 'phone', ['Item 1', 'Item 2', 'Item 0']), ('Books', 'book', ['Item 3', 'Item 4'])])
+        # Product cards only
+        self.assertEqual(set(data['best_sellers'][0]),
+                         {'id', 'name', 'price', 'original_price', 'discount_percentage', 'rating',
+                          'sold', 'stock', 'image', 'image_srcset', 'category'})
+    
+    def test_per_category_limit(self):
+        with self.settings(HOME_FEED_SIZE=2, HOME_FEED_CATEGORY_SIZE=1):
+            self.build()
+        data = self.client.get('/api/home/').json()
+        self.assertEqual(self.names(data['best_sellers']), ['Item 1', 'Item 2'])
+        self.assertEqual([self.names(section['products']) for section in data['by_category']],
+                         [['Item 1'], ['Item 3']])
+    
+    def test_served_from_cache(self):
+        self.build()
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/home/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+    
+    def test_cache_miss_reads_the_stored_snapshot(self):
+        self.build()
+        content = self.client.get('/api/home/').content
+        # Another process, with an empty cache of its own
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/home/').content, content)
+        with self.assertNumQueries(0):
+            self.client.get('/api/home/')
+    
+    def test_built_on_first_request(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get('/api/home/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['best_sellers']), 5)
+        self.assertTrue(Snapshot.objects.filter(name=SNAPSHOT_NAME).exists())
+    
+    def test_conditional_get(self):
+        self.build()
+        etag = self.client.get('/api/home/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/home/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_rebuild_replaces_the_snapshot(self):
+        self.build()
+        etag = self.client.get('/api/home/')['ETag']
+        Product.objects.filter(pk=self.products[4].pk).update(sold=100)
+        # Unchanged until the next build
+        self.assertEqual(self.client.get('/api/home/')['ETag'], etag)
+        
+        self.build()
+        response = self.client.get('/api/home/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names(response.json()['best_sellers'])[0], 'Item 4')
+        self.assertEqual(Snapshot.objects.count(), 1)
+    
+    def test_read_only(self):
+        self.assertEqual(self.client.post('/api/home/').status_code, 405)
@@ -1,29 +1,77 @@
-from rest_framework import viewsets, filters, status
+from rest_framework import viewsets, filters, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.views.decorators.http import require_safe
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer
+from core.cache import cache_response
+from core.counters import with_pending
+from core.fieldsets import FieldsetViewMixin
+from core.jobs import enqueue
+from core.snapshots import snapshot_response
+from .facets import product_facets
+from .home import publish_home_feed, read_home_feed
+from .models import Product, Category, Review
+from .pagination import ProductPagination, ReviewPagination
+from .search import ProductSearchFilter
+from .serializers import ProductSerializer, CategorySerializer, ReviewSerializer
+
+def filter_products(queryset, params):
+    """ตัวกรองหมวดหมู่ ช่วงราคา และคะแนน (ใช้ร่วมกับ async view)"""
+    # Category filter
+    category = params.get('category', None)
+    if category:
+        queryset = queryset.filter(category__id=category)
+    
+    # Price range filter
+    min_price = params.get('min_price', None)
+    max_price = params.get('max_price', None)
+    
+    if min_price:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price:
+        queryset = queryset.filter(price__lte=max_price)
+    
+    # Rating filter
+    min_rating = params.get('min_rating', None)
+    if min_rating:
+        queryset = queryset.filter(rating__gte=min_rating)
+    
+    return queryset
+
+@require_safe
+def home_feed(request):
+    """ข้อมูลหน้าแรกทั้งหมด (ขายดี สินค้าใหม่ ขายดีแต่ละหมวดหมู่) จาก snapshot ที่สร้างไว้ล่วงหน้า"""
+    snapshot = read_home_feed()
+    if snapshot is None:
+        # Before the first scheduled build
+        snapshot = publish_home_feed()
+    return snapshot_response(request, snapshot)
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+    
+    @cache_response('categories')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response('categories')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(FieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    
-    # Search fields
-    search_fields = ['name', 'description']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
+    pagination_class = ProductPagination
     
     # Filter fields
     filterset_fields = ['category', 'shop']
     
     # Ordering fields
-    ordering_fields = ['price', 'sold', 'rating', 'created_at']
+    ordering_fields = ProductPagination.ordering_fields
     ordering = ['-created_at']
     
     def get_permissions(self):
@@ -32,7 +80,8 @@ class ProductViewSet(viewsets.ModelViewSet):
         return [AllowAny()]
     
     def get_queryset(self):
-        queryset = Product.objects.all()
+        counters = [field for field in ('stock', 'sold') if self.wants(field)]
+        queryset = self.sparse(with_pending(Product.objects.select_related('category', 'shop'), *counters))
         
         # ถ้าเป็น seller ดูเฉพาะสินค้าของตัวเอง
         if self.action in ['my_products']:
@@ -40,26 +89,19 @@ class ProductViewSet(viewsets.ModelViewSet):
                 return queryset.filter(shop=self.request.user.shop)
             return queryset.none()
         
-        # Category filter
-        category = self.request.query_params.get('category', None)
-        if category:
-            queryset = queryset.filter(category__id=category)
-        
-        # Price range filter
-        min_price = self.request.query_params.get('min_price', None)
-        max_price = self.request.query_params.get('max_price', None)
-        
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-        
-        # Rating filter
-        min_rating = self.request.query_params.get('min_rating', None)
-        if min_rating:
-            queryset = queryset.filter(rating__gte=min_rating)
-        
-        return queryset
+        return filter_products(queryset, self.request.query_params)
+    
+    @cache_response('products', 'categories', 'shops')
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # ?facets=1 adds category/shop/rating counts and a price histogram
+        if request.query_params.get('facets') in ('1', 'true'):
+            response.data['facets'] = product_facets(request.query_params)
+        return response
+    
+    @cache_response('products', 'categories', 'shops')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_products(self, request):
@@ -87,9 +129,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer.save(shop=self.request.user.shop)
         
         # Update shop stats
-        shop = self.request.user.shop
-        shop.total_products = shop.products.count()
-        shop.save()
+        enqueue('shops.count_products', shop_id=self.request.user.shop.pk)
     
     def perform_update(self, serializer):
         """อัปเดตสินค้า"""
@@ -106,13 +146,12 @@ class ProductViewSet(viewsets.ModelViewSet):
         if instance.shop and instance.shop.owner != self.request.user:
             raise ValueError('คุณไม่มีสิทธิ์ลบสินค้านี้')
         
-        shop = instance.shop
+        shop_id = instance.shop_id
         instance.delete()
         
         # Update shop stats
-        if shop:
-            shop.total_products = shop.products.count()
-            shop.save()
+        if shop_id:
+            enqueue('shops.count_products', shop_id=shop_id)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def toggle_stock(self, request, pk=None):
@@ -125,9 +164,42 @@ class ProductViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_403_FORBIDDEN)
         
         product.stock = 0 if product.stock > 0 else 100
-        product.save()
+        # Only stock: the loaded counter and rating columns may be stale
+        product.save(update_fields=['stock'])
         
         return Response({
             'message': 'อัปเดตสถานะสินค้าสำเร็จ',
             'stock': product.stock
-        })
\ No newline at end of file
+        })
+
+class ReviewViewSet(viewsets.ModelViewSet):
+    """รีวิวสินค้า: อ่านได้ทุกคน เขียน/แก้/ลบได้เฉพาะรีวิวของตัวเอง"""
+    serializer_class = ReviewSerializer
+    pagination_class = ReviewPagination
+    
+    def get_permissions(self):
+        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+            return [IsAuthenticated()]
+        return [AllowAny()]
+    
+    def get_queryset(self):
+        queryset = Review.objects.select_related('user')
+        if self.action in ['update', 'partial_update', 'destroy']:
+            return queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            # Always one product's reviews, so pages walk the (product, …) indexes
+            product = self.request.query_params.get('product')
+            if not product or not product.isdigit():
+                raise serializers.ValidationError({'product': 'ต้องระบุ product'})
+            queryset = queryset.filter(product_id=product)
+            rating = self.request.query_params.get('rating', '')
+            if rating.isdigit():
+                queryset = queryset.filter(rating=rating)
+        return queryset
+    
+    @cache_response('reviews')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
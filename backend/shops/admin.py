@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Shop, ShopFollower
+from .models import Shop, ShopFollower, ShopDailyStats
 
 @admin.register(Shop)
 class ShopAdmin(admin.ModelAdmin):
@@ -11,4 +11,10 @@ class ShopAdmin(admin.ModelAdmin):
 @admin.register(ShopFollower)
 class ShopFollowerAdmin(admin.ModelAdmin):
     list_display = ['shop', 'user', 'created_at']
-    list_filter = ['created_at']
\ No newline at end of file
+    list_filter = ['created_at']
+
+@admin.register(ShopDailyStats)
+class ShopDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['shop', 'date', 'total_orders', 'pending_orders', 'delivered_orders', 'revenue']
+    list_filter = ['date']
+    search_fields = ['shop__name']
@@ -0,0 +1,18 @@
+from django.http import Http404
+
+from core.async_api import aget_user, async_api_view, json_response
+from .models import Shop
+from .serializers import ShopSerializer
+from .views import with_follower_info
+
+
+@async_api_view
+async def shop_detail(request, slug):
+    """รายละเอียดร้านค้า (async)"""
+    user = await aget_user(request)
+    queryset = with_follower_info(Shop.objects.filter(is_active=True), user)
+    try:
+        shop = await queryset.aget(slug=slug)
+    except Shop.DoesNotExist:
+        raise Http404('No Shop matches the given query.')
+    return json_response(ShopSerializer(shop, context={'request': request}).data)
@@ -0,0 +1,250 @@
+"""
+Bulk product import for a shop.
+
+Rows are read one at a time from CSV or JSON Lines (optionally inside a
+zip together with the images they reference), validated with a single
+reusable serializer and inserted with bulk_create in batches. Side
+effects that Product.save() would trigger per row (search index, image
+variants, cache versions, shop.total_products) are done once per batch
+or once per import instead.
+
+Files may be UTF-8 or, as Excel saves Thai CSV files, Windows-874
+(TIS-620); the whole file is checked before the first row is imported.
+"""
+import codecs
+import csv
+import io
+import json
+import os
+import zipfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from rest_framework import serializers
+
+from core.cache import bump_version
+from core.images import check_image, schedule_remote_images, schedule_variants
+from products.models import Category, Product
+from products.search import index_products
+from .models import Shop
+
+FORMATS = ('csv', 'jsonl')
+# Tried in order; Windows-874 is a superset of TIS-620
+ENCODINGS = ('utf-8-sig', 'cp874')
+
+
+class ImportFileError(ValueError):
+    """The upload as a whole cannot be read (as opposed to a bad row)"""
+
+
+class ImportProductRowSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField(allow_blank=True, default='')
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    original_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    discount_percentage = serializers.IntegerField(default=0, min_value=0, max_value=100)
+    stock = serializers.IntegerField(default=0, min_value=0)
+    # Category id or name
+    category = serializers.CharField()
+    # http(s) URL, or a path inside the uploaded zip
+    image = serializers.CharField(required=False, allow_blank=True, default='')
+    
+    def validate_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("ราคาต้องมากกว่า 0")
+        return value
+    
+    def validate_category(self, value):
+        categories = self.context['categories']
+        category_id = categories.get(value.strip().lower())
+        if category_id is None:
+            raise serializers.ValidationError(f"ไม่พบหมวดหมู่ {value}")
+        return category_id
+
+
+def category_lookup():
+    """{'<id>': id, '<name lower>': id} for every category, in one query"""
+    lookup = {}
+    for category_id, name in Category.objects.values_list('id', 'name'):
+        lookup[name.strip().lower()] = category_id
+        lookup[str(category_id)] = category_id
+    return lookup
+
+
+def detect_format(name, requested=None):
+    if requested:
+        if requested not in FORMATS:
+            raise ImportFileError(f"ไม่รองรับรูปแบบ {requested}")
+        return requested
+    extension = os.path.splitext(name or '')[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    raise ImportFileError("รองรับเฉพาะไฟล์ .csv, .jsonl หรือ .zip")
+
+
+def detect_encoding(stream, chunk_size=64 * 1024):
+    """The first of ENCODINGS that decodes the whole stream; the stream is rewound"""
+    for encoding in ENCODINGS:
+        stream.seek(0)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            continue
+        stream.seek(0)
+        return encoding
+    raise ImportFileError("อ่านไฟล์ไม่ได้ ต้องบันทึกเป็น UTF-8 หรือ TIS-620")
+
+
+def read_rows(stream, file_format, encoding='utf-8-sig'):
+    """Yield (row number, dict or None) from a binary stream"""
+    text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        try:
+            # Header is line 1, so data rows start at 2 like a spreadsheet
+            for number, row in enumerate(reader, start=2):
+                yield number, row
+        except csv.Error as exc:
+            raise ImportFileError(f"อ่านไฟล์ CSV ไม่ได้ที่บรรทัด {reader.line_num}: {exc}")
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+class ProductImporter:
+    """Import products into `shop`; `run(upload)` returns the report dict"""
+    
+    def __init__(self, shop, batch_size=None, max_errors=None):
+        self.shop = shop
+        self.batch_size = batch_size or settings.PRODUCT_IMPORT_BATCH_SIZE
+        self.max_errors = max_errors or settings.PRODUCT_IMPORT_MAX_ERRORS
+        self.row_serializer = ImportProductRowSerializer(context={'categories': category_lookup()})
+        self.archive = None
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+    
+    def run(self, upload, file_format=None):
+        name = getattr(upload, 'name', '')
+        # The underlying file of an UploadedFile (spooled to disk when large)
+        upload = getattr(upload, 'file', upload)
+        try:
+            if name.lower().endswith('.zip'):
+                try:
+                    self.archive = zipfile.ZipFile(upload)
+                except zipfile.BadZipFile:
+                    raise ImportFileError("ไฟล์ zip เสียหาย")
+                member = self.find_rows_file(file_format)
+                file_format = detect_format(member, file_format)
+                with self.archive.open(member) as stream:
+                    self.import_rows(read_rows(stream, file_format, detect_encoding(stream)))
+            else:
+                file_format = detect_format(name, file_format)
+                self.import_rows(read_rows(upload, file_format, detect_encoding(upload)))
+        finally:
+            if self.created:
+                # Once per import instead of after every product
+                Shop.objects.filter(pk=self.shop.pk).update(total_products=self.shop.products.count())
+                bump_version('products', 'shops')
+        
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+    
+    def find_rows_file(self, file_format):
+        extensions = ('.' + file_format,) if file_format else ('.csv', '.jsonl', '.ndjson')
+        for member in self.archive.namelist():
+            if member.lower().endswith(extensions) and not member.startswith('__MACOSX/'):
+                return member
+        raise ImportFileError("ไม่พบไฟล์ .csv หรือ .jsonl ใน zip")
+    
+    def import_rows(self, rows):
+        batch = []
+        try:
+            for number, row in rows:
+                product, remote_url = self.build(number, row)
+                if product is not None:
+                    batch.append((product, remote_url))
+                if len(batch) >= self.batch_size:
+                    self.insert(batch)
+                    batch = []
+        except ImportFileError as exc:
+            if self.created:
+                # Earlier batches are committed; say so rather than hide them
+                raise ImportFileError(f"{exc} (นำเข้าแล้ว {self.created} รายการ)")
+            raise
+        if batch:
+            self.insert(batch)
+    
+    def build(self, number, row):
+        if row is None:
+            self.reject(number, {'non_field_errors': ['อ่านแถวนี้ไม่ได้']})
+            return None, None
+        # Empty CSV cells mean "not given"
+        row = {key: value for key, value in row.items() if key and value not in ('', None)}
+        try:
+            data = self.row_serializer.run_validation(row)
+            image, remote_url = self.resolve_image(data.pop('image'))
+        except serializers.ValidationError as exc:
+            self.reject(number, exc.detail)
+            return None, None
+        
+        data['category_id'] = data.pop('category')
+        return Product(shop=self.shop, image=image, **data), remote_url
+    
+    def resolve_image(self, reference):
+        """(stored file name, URL to fetch later) for the row's image column"""
+        if not reference:
+            return None, None
+        if reference.startswith(('http://', 'https://')):
+            return None, reference
+        if self.archive is None:
+            raise serializers.ValidationError({'image': ["ต้องเป็น URL หรืออัปโหลดรูปมาใน zip"]})
+        
+        try:
+            info = self.archive.getinfo(reference.lstrip('/'))
+        except KeyError:
+            raise serializers.ValidationError({'image': [f"ไม่พบไฟล์ {reference} ใน zip"]})
+        if info.file_size > settings.IMAGE_DOWNLOAD_MAX_BYTES:
+            raise serializers.ValidationError({'image': ["รูปภาพใหญ่เกินไป"]})
+        content = self.archive.read(info)
+        try:
+            check_image(content)
+        except ValueError as exc:
+            raise serializers.ValidationError({'image': [str(exc)]})
+        
+        field = Product._meta.get_field('image')
+        name = field.generate_filename(None, os.path.basename(info.filename))
+        return field.storage.save(name, ContentFile(content)), None
+    
+    def reject(self, number, detail):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': number, 'errors': detail})
+    
+    def insert(self, batch):
+        products = [product for product, _ in batch]
+        with transaction.atomic():
+            Product.objects.bulk_create(products)
+            # bulk_create skips the post_save receivers
+            index_products(products)
+            schedule_variants(*(product.image for product in products if product.image))
+            schedule_remote_images(Product, 'image', [
+                (product.pk, remote_url) for product, remote_url in batch if remote_url
+            ])
+        self.created += len(products)
@@ -0,0 +1,11 @@
+from core.cache import bump_version
+from core.jobs import job
+from products.models import Product
+from .models import Shop
+
+
+@job('shops.count_products')
+def count_products(shop_id):
+    """นับจำนวนสินค้าของร้านใหม่"""
+    Shop.objects.filter(pk=shop_id).update(total_products=Product.objects.filter(shop_id=shop_id).count())
+    bump_version('shops')
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+from core.counters import discard
+from orders.models import OrderItem
+from shops.models import Shop, ShopDailyStats
+from shops.stats import status_deltas
+
+
+class Command(BaseCommand):
+    help = 'สร้างยอดสรุปรายวันของร้านค้าใหม่จากประวัติคำสั่งซื้อ'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', help='slug ของร้านที่ต้องการสร้างใหม่ (ค่าเริ่มต้น: ทุกร้าน)')
+    
+    def handle(self, *args, **options):
+        items = OrderItem.objects.filter(shop__isnull=False)
+        stats = ShopDailyStats.objects.all()
+        
+        if options['shop']:
+            try:
+                shop = Shop.objects.get(slug=options['shop'])
+            except Shop.DoesNotExist:
+                raise CommandError(f"ไม่พบร้าน {options['shop']}")
+            items = items.filter(shop=shop)
+            stats = stats.filter(shop=shop)
+        
+        # One row per (shop, order); grouped in the database and streamed
+        rows = (items
+                .values('shop', 'order_id', 'order__status',
+                        date=TruncDate('order__created_at'))
+                .annotate(subtotal=Sum('subtotal'), units=Sum('quantity'))
+                .order_by())
+        
+        totals = defaultdict(lambda: defaultdict(int))
+        sold = defaultdict(int)
+        for row in rows.iterator(chunk_size=2000):
+            if row['order__status'] != 'cancelled':
+                sold[row['shop']] += row['units']
+            day = totals[(row['shop'], row['date'])]
+            day['total_orders'] += 1
+            for field, value in status_deltas(row['order__status']).items():
+                day[field] += value
+            if row['order__status'] == 'delivered':
+                day['revenue'] += row['subtotal']
+        
+        with transaction.atomic():
+            stats.delete()
+            ShopDailyStats.objects.bulk_create([
+                ShopDailyStats(
+                    shop_id=shop_id,
+                    date=date,
+                    total_orders=day['total_orders'],
+                    pending_orders=day['pending_orders'],
+                    delivered_orders=day['delivered_orders'],
+                    revenue=day['revenue'] or Decimal('0'),
+                )
+                for (shop_id, date), day in totals.items()
+            ], batch_size=1000)
+            
+            shops = Shop.objects.filter(pk=shop.pk) if options['shop'] else Shop.objects.all()
+            for shop_id in shops.values_list('pk', flat=True):
+                Shop.objects.filter(pk=shop_id).update(total_sold=sold.get(shop_id, 0))
+                discard(Shop, shop_id, 'total_sold')
+        
+        self.stdout.write(self.style.SUCCESS(f'สร้างยอดสรุปใหม่ {len(totals)} แถว'))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_orders', models.IntegerField(default=0)),
+                ('pending_orders', models.IntegerField(default=0)),
+                ('delivered_orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='shops.shop')),
+            ],
+            options={
+                'verbose_name_plural': 'Shop daily stats',
+                'ordering': ['-date'],
+                'unique_together': {('shop', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shops', '0003_reviews'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='banner_variants',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='logo_variants',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
@@ -12,6 +12,9 @@ class Shop(models.Model):
     # Shop Info
     logo = models.ImageField(upload_to='shops/logos/', null=True, blank=True)
     banner = models.ImageField(upload_to='shops/banners/', null=True, blank=True)
+    # Widths of the WebP/JPEG variants made so far (see core.images)
+    logo_variants = models.JSONField(default=list, blank=True, editable=False)
+    banner_variants = models.JSONField(default=list, blank=True, editable=False)
     
     # Contact
     phone = models.CharField(max_length=20)
@@ -24,6 +27,14 @@ class Shop(models.Model):
     
     # Stats
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    # Reviews of all the shop's products (see products.reviews)
+    review_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
     total_products = models.IntegerField(default=0)
     total_sold = models.IntegerField(default=0)
     
@@ -50,4 +61,22 @@ class ShopFollower(models.Model):
         unique_together = ['shop', 'user']
     
     def __str__(self):
-        return f"{self.user.username} follows {self.shop.name}"
\ No newline at end of file
+        return f"{self.user.username} follows {self.shop.name}"
+
+class ShopDailyStats(models.Model):
+    """ยอดสรุปรายวันของร้าน อัปเดตทีละคำสั่งซื้อแทนการสแกนประวัติทั้งหมด"""
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    
+    total_orders = models.IntegerField(default=0)
+    pending_orders = models.IntegerField(default=0)
+    delivered_orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ['shop', 'date']
+        ordering = ['-date']
+        verbose_name_plural = "Shop daily stats"
+    
+    def __str__(self):
+        return f"{self.shop.name} {self.date}"
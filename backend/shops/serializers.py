@@ -1,26 +1,59 @@
 from rest_framework import serializers
+from core.counters import SaveChangedFieldsMixin, add_pending
+from core.fieldsets import FieldsetMixin
+from core.jobs import enqueue
+from core.images import variant_srcset
 from .models import Shop, ShopFollower
+from products.reviews import STARS, histogram
 from products.serializers import ProductSerializer
 
-class ShopSerializer(serializers.ModelSerializer):
+class ShopSerializer(SaveChangedFieldsMixin, FieldsetMixin, serializers.ModelSerializer):
     owner_username = serializers.CharField(source='owner.username', read_only=True)
     follower_count = serializers.SerializerMethodField()
     is_following = serializers.SerializerMethodField()
+    logo_srcset = serializers.SerializerMethodField()
+    banner_srcset = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
     
     class Meta:
         model = Shop
         fields = ['id', 'owner', 'owner_username', 'name', 'slug', 'description',
-                  'logo', 'banner', 'phone', 'email', 'address', 'city', 
-                  'postal_code', 'rating', 'total_products', 'total_sold',
+                  'logo', 'logo_srcset', 'banner', 'banner_srcset', 'phone', 'email', 'address', 'city', 
+                  'postal_code', 'rating', 'review_count', 'rating_histogram', 'total_products', 'total_sold',
                   'is_active', 'is_verified', 'follower_count', 'is_following',
                   'created_at', 'updated_at']
-        read_only_fields = ['owner', 'slug', 'rating', 'total_products', 
+        read_only_fields = ['owner', 'slug', 'rating', 'review_count', 'total_products', 
                            'total_sold', 'is_verified', 'created_at', 'updated_at']
+        field_sources = {
+            'logo_srcset': ['logo', 'logo_variants'],
+            'banner_srcset': ['banner', 'banner_variants'],
+            'rating_histogram': [f'rating_{star}' for star in STARS],
+            # Annotated by the view (see with_follower_info)
+            'follower_count': [],
+            'is_following': [],
+        }
+    
+    def to_representation(self, instance):
+        return add_pending(super().to_representation(instance), instance, ['total_sold'])
+    
+    def get_logo_srcset(self, obj):
+        return variant_srcset(obj.logo, obj.logo_variants, self.context.get('request'))
+    
+    def get_banner_srcset(self, obj):
+        return variant_srcset(obj.banner, obj.banner_variants, self.context.get('request'))
+    
+    def get_rating_histogram(self, obj):
+        return histogram(obj)
     
     def get_follower_count(self, obj):
+        # Annotated by ShopViewSet; fall back to a query for bare instances
+        if hasattr(obj, 'follower_total'):
+            return obj.follower_total
         return obj.followers.count()
     
     def get_is_following(self, obj):
+        if hasattr(obj, 'followed_by_user'):
+            return obj.followed_by_user
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return ShopFollower.objects.filter(shop=obj, user=request.user).exists()
@@ -40,11 +73,12 @@ class ShopSerializer(serializers.ModelSerializer):
             counter += 1
         validated_data['slug'] = slug
         
+        shop = super().create(validated_data)
+        
         # Set user as seller
-        request.user.is_seller = True
-        request.user.save()
+        enqueue('accounts.mark_seller', user_id=request.user.pk)
         
-        return super().create(validated_data)
+        return shop
 
 class CreateProductSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=200)
@@ -70,7 +104,6 @@ class CreateProductSerializer(serializers.Serializer):
         )
         
         # Update shop stats
-        shop.total_products = shop.products.count()
-        shop.save()
+        enqueue('shops.count_products', shop_id=shop.pk)
         
         return product
\ No newline at end of file
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.cache import bump_version
+from core.images import track_image_fields
+from orders.models import Order
+from orders.signals import order_placed
+from .models import Shop
+from .stats import record_order_placed, record_status_change
+
+track_image_fields(Shop, 'logo', 'banner')
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred status field is not fetched
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(order_placed)
+def count_placed_order(sender, order, **kwargs):
+    record_order_placed(order)
+
+
+@receiver(post_save, sender=Order)
+def count_status_change(sender, instance, created, **kwargs):
+    old_status = instance._loaded_status
+    if not created and old_status is not None and old_status != instance.status:
+        record_status_change(instance, old_status, instance.status)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def expire_shop_responses(sender, **kwargs):
+    bump_version('shops')
@@ -0,0 +1,70 @@
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from core.counters import increment
+from .models import Shop, ShopDailyStats
+
+PENDING_STATUSES = ('pending', 'confirmed')
+
+
+def status_deltas(status, sign=1):
+    """ค่าที่ต้องบวก/ลบในแถวสรุปเมื่อคำสั่งซื้อเข้าหรือออกจากสถานะนี้"""
+    deltas = {}
+    if status in PENDING_STATUSES:
+        deltas['pending_orders'] = sign
+    elif status == 'delivered':
+        deltas['delivered_orders'] = sign
+    return deltas
+
+
+def order_shares(order):
+    """ยอดรวมและจำนวนชิ้นของแต่ละร้านในคำสั่งซื้อ: [(shop_id, subtotal, units), ...]"""
+    from orders.models import OrderItem
+    
+    rows = (OrderItem.objects
+            .filter(order=order, shop__isnull=False)
+            .values('shop')
+            .annotate(subtotal=Sum('subtotal'), units=Sum('quantity'))
+            .order_by())
+    return [(row['shop'], row['subtotal'], row['units']) for row in rows]
+
+
+def apply_deltas(shop_id, date, deltas):
+    if not deltas:
+        return
+    ShopDailyStats.objects.get_or_create(shop_id=shop_id, date=date)
+    ShopDailyStats.objects.filter(shop_id=shop_id, date=date).update(
+        **{field: F(field) + value for field, value in deltas.items()}
+    )
+
+
+def record_order_placed(order):
+    """นับคำสั่งซื้อใหม่เข้าในยอดรายวันของทุกร้านที่มีสินค้าในคำสั่งซื้อ"""
+    date = timezone.localdate(order.created_at)
+    for shop_id, subtotal, units in order_shares(order):
+        deltas = {'total_orders': 1, **status_deltas(order.status)}
+        if order.status == 'delivered':
+            deltas['revenue'] = subtotal
+        apply_deltas(shop_id, date, deltas)
+        increment(Shop, shop_id, 'total_sold', units)
+
+
+def record_status_change(order, old_status, new_status):
+    """ย้ายคำสั่งซื้อจากสถานะเดิมไปสถานะใหม่ในยอดรายวัน"""
+    deltas = status_deltas(old_status, -1)
+    for field, value in status_deltas(new_status).items():
+        deltas[field] = deltas.get(field, 0) + value
+    deltas = {field: value for field, value in deltas.items() if value}
+    revenue_sign = (new_status == 'delivered') - (old_status == 'delivered')
+    # Cancelled orders do not count towards Shop.total_sold
+    sold_sign = (old_status == 'cancelled') - (new_status == 'cancelled')
+    if not deltas and not revenue_sign and not sold_sign:
+        return
+    
+    date = timezone.localdate(order.created_at)
+    for shop_id, subtotal, units in order_shares(order):
+        shop_deltas = dict(deltas)
+        if revenue_sign:
+            shop_deltas['revenue'] = subtotal * revenue_sign
+        apply_deltas(shop_id, date, shop_deltas)
+        increment(Shop, shop_id, 'total_sold', units * sold_sign)
@@ -1,3 +1,414 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from core.counters import current
+from core.images import variant_name
+from core.jobs import enqueue, run_pending
+from core.models import Job
+from orders.models import Order, OrderItem
+from products.models import Product, Category
+from .models import Shop, ShopDailyStats, ShopFollower
+
+
+class ShopQueryCountTests(TestCase):
+    """จำนวน query ของ endpoint ต้องคงที่ ไม่ขึ้นกับจำนวนแถว"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+        cls.seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        cls.shop = cls.create_shop(cls.seller, 'shop')
+        cls.category = Category.objects.create(name='Category')
+    
+    @staticmethod
+    def create_shop(owner, slug):
+        return Shop.objects.create(owner=owner, name=slug, slug=slug, phone='0800000000',
+                                   email=f'{slug}@example.com', address='addr', city='BKK', postal_code='10100')
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.seller_client = APIClient()
+        self.seller_client.force_authenticate(self.seller)
+    
+    def create_shops(self, count):
+        User.objects.filter(username__startswith='owner').delete()
+        for i in range(count):
+            owner = User.objects.create_user(username=f'owner{i}', email=f'owner{i}@example.com', password='x')
+            shop = self.create_shop(owner, f'shop-{i}')
+            ShopFollower.objects.create(shop=shop, user=self.buyer)
+    
+    def create_orders(self, count):
+        Order.objects.all().delete()
+        Product.objects.all().delete()
+        for i in range(count):
+            product = Product.objects.create(name=f'Product {i}', description='desc', price=100,
+                                             stock=10, category=self.category, shop=self.shop)
+            order = Order.objects.create(
+                user=self.buyer, order_number=f'ORDTEST{i}', full_name='Buyer', phone='0800000000',
+                address='addr', city='BKK', district='Pathumwan', postal_code='10330',
+                subtotal=100, total=100, payment_method='cod'
+            )
+            OrderItem.objects.create(order=order, product=product, shop=self.shop,
+                                     product_name=product.name, product_price=100, quantity=1)
+    
+    def test_shop_list(self):
+        for count in (2, 10):
+            self.create_shops(count)
+            with self.assertNumQueries(1):
+                response = self.client.get('/api/shops/')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(all(shop['is_following'] for shop in response.data if shop['slug'] != 'shop'))
+    
+    def test_shop_list_anonymous(self):
+        self.create_shops(5)
+        with self.assertNumQueries(1):
+            response = APIClient().get('/api/shops/')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_shop_detail(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/shops/shop/')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_my_shop(self):
+        with self.assertNumQueries(1):
+            response = self.seller_client.get('/api/shops/my_shop/')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_shop_products(self):
+        for count in (2, 10):
+            self.create_orders(count)
+            # shop + products
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/shops/shop/products/')
+            self.assertEqual(response.status_code, 200)
+    
+    def test_shop_orders(self):
+        for count in (2, 10):
+            self.create_orders(count)
+            # shop + orders + items
+            with self.assertNumQueries(3):
+                response = self.seller_client.get('/api/shops/shop/orders/')
+            self.assertEqual(response.status_code, 200)
+    
+    def test_sparse_shop_list(self):
+        self.create_shops(3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/shops/?fields=id,name,slug,logo_srcset')
+        self.assertEqual(set(response.data[0]), {'id', 'name', 'slug', 'logo_srcset'})
+        # Follower counts, follow state and the owner join are skipped
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertNotIn('shopfollower', queries[0]['sql'])
+        self.assertNotIn('JOIN', queries[0]['sql'])
+    
+    def test_shop_orders_show_only_the_shops_lines(self):
+        self.create_orders(1)
+        other = self.create_shop(User.objects.create_user(username='other', email='other@example.com', password='x'),
+                                 'other')
+        product = Product.objects.create(name='Other product', description='desc', price=500,
+                                         stock=10, category=self.category, shop=other)
+        order = Order.objects.get()
+        OrderItem.objects.create(order=order, product=product, product_name=product.name,
+                                 product_price=250, quantity=2)
+        Order.objects.update(subtotal=600, total=600)
+        
+        response = self.seller_client.get('/api/shops/shop/orders/')
+        [row] = response.data['results']
+        self.assertEqual([item['product_name'] for item in row['items']], ['Product 0'])
+        self.assertEqual(row['shop_subtotal'], '100.00')
+        # Amounts that include the other shop's lines are not shown
+        self.assertNotIn('total', row)
+        self.assertNotIn('subtotal', row)
+        
+        client = APIClient()
+        client.force_authenticate(other.owner)
+        [row] = client.get('/api/shops/other/orders/').data['results']
+        self.assertEqual([item['product_name'] for item in row['items']], ['Other product'])
+        self.assertEqual(row['shop_subtotal'], '500.00')
+    
+    def test_sparse_shop_orders(self):
+        self.create_orders(3)
+        # shop + orders, no items
+        with self.assertNumQueries(2):
+            response = self.seller_client.get('/api/shops/shop/orders/?fields=order_number,shop_subtotal')
+        self.assertEqual(set(response.data['results'][0]), {'order_number', 'shop_subtotal'})
+        
+        with self.assertNumQueries(3):
+            response = self.seller_client.get('/api/shops/shop/orders/?fields=order_number,items.quantity')
+        self.assertEqual(response.data['results'][0]['items'], [{'quantity': 1}])
+    
+    def test_shop_stats(self):
+        for count in (2, 10):
+            self.create_orders(count)
+            # shop + rollups + products + followers
+            with self.assertNumQueries(4):
+                response = self.seller_client.get('/api/shops/shop/stats/')
+            self.assertEqual(response.status_code, 200)
+    
+    
+    async def test_async_shop_detail(self):
+        await ShopFollower.objects.acreate(shop=self.shop, user=self.buyer)
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.buyer)}'}
+        response = await self.async_client.get('/api/async/shops/shop/', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        expected = await sync_to_async(self.client.get)('/api/shops/shop/')
+        self.assertEqual(response.json(), expected.json())
+        self.assertTrue(response.json()['is_following'])
+        
+        response = await self.async_client.get('/api/async/shops/missing/', headers=headers)
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get('/api/async/shops/shop/', headers={'Authorization': 'Bearer bad'})
+        self.assertEqual(response.status_code, 401)
+
+
+class ShopDailyStatsTests(TestCase):
+    """ยอดสรุปรายวันที่อัปเดตทีละคำสั่งซื้อต้องตรงกับการคำนวณใหม่จากประวัติ"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        cls.buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+        cls.shop_a = Shop.objects.create(owner=cls.seller, name='A', slug='shop-a')
+        cls.shop_b = Shop.objects.create(owner=cls.buyer, name='B', slug='shop-b')
+        category = Category.objects.create(name='Category')
+        cls.product_a = Product.objects.create(name='A1', description='desc', price=100, stock=100,
+                                               category=category, shop=cls.shop_a)
+        cls.product_b = Product.objects.create(name='B1', description='desc', price=50, stock=100,
+                                               category=category, shop=cls.shop_b)
+        cls.no_shop = Product.objects.create(name='X', description='desc', price=10, stock=100, category=category)
+    
+    def setUp(self):
+        cache.clear()
+    
+    def place(self, items, days_ago=0):
+        """คำสั่งซื้อที่ผ่านการชำระเงิน (งาน orders.order_placed ยังไม่ได้รัน)"""
+        order = Order.objects.create(user=self.buyer, order_number=f'ORDSTATS{Order.objects.count()}',
+                                     full_name='Buyer', phone='0800000000', address='addr', city='BKK',
+                                     district='Pathumwan', postal_code='10330', subtotal=0, total=0,
+                                     payment_method='cod')
+        if days_ago:
+            Order.objects.filter(pk=order.pk).update(created_at=order.created_at - timedelta(days=days_ago))
+            order = Order.objects.get(pk=order.pk)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, shop=product.shop, product_name=product.name,
+                      product_price=product.price, quantity=quantity, subtotal=product.price * quantity)
+            for product, quantity in items
+        ])
+        enqueue('orders.order_placed', key=f'order-placed:{order.pk}', order_id=order.pk, status=order.status)
+        return order
+    
+    def move(self, order, *statuses):
+        for status in statuses:
+            order.status = status
+            order.save()
+    
+    def rollups(self):
+        return {
+            (row.shop_id, (timezone.localdate() - row.date).days):
+                (row.total_orders, row.pending_orders, row.delivered_orders, row.revenue)
+            for row in ShopDailyStats.objects.all()
+        }
+    
+    def sold(self):
+        return current(Shop.objects.get(pk=self.shop_a.pk), 'total_sold'), \
+            current(Shop.objects.get(pk=self.shop_b.pk), 'total_sold')
+    
+    def test_incremental_rollups_match_a_rebuild(self):
+        self.place([(self.product_a, 2), (self.product_b, 1), (self.no_shop, 5)])
+        run_pending()
+        delivered = self.place([(self.product_a, 1)], days_ago=1)
+        self.move(delivered, 'confirmed', 'shipped', 'delivered')
+        cancelled = self.place([(self.product_b, 3)])
+        run_pending()
+        self.move(cancelled, 'cancelled')
+        # Status changes that land before the job runs count the same
+        refunded = self.place([(self.product_a, 1), (self.product_b, 2)])
+        self.move(refunded, 'delivered', 'cancelled')
+        run_pending()
+        
+        expected = {
+            (self.shop_a.pk, 0): (2, 1, 0, Decimal('0')),
+            (self.shop_a.pk, 1): (1, 0, 1, Decimal('100')),
+            (self.shop_b.pk, 0): (3, 1, 0, Decimal('0')),
+        }
+        self.assertEqual(self.rollups(), expected)
+        self.assertEqual(self.sold(), (3, 1))
+        
+        call_command('rebuild_shop_stats', stdout=io.StringIO())
+        self.assertEqual(self.rollups(), expected)
+        self.assertEqual(self.sold(), (3, 1))
+    
+    def test_rebuild_one_shop(self):
+        order = self.place([(self.product_a, 1), (self.product_b, 1)])
+        run_pending()
+        self.move(order, 'delivered')
+        ShopDailyStats.objects.update(total_orders=99)
+        
+        call_command('rebuild_shop_stats', shop='shop-a', stdout=io.StringIO())
+        self.assertEqual(self.rollups(), {
+            (self.shop_a.pk, 0): (1, 0, 1, Decimal('100')),
+            (self.shop_b.pk, 0): (99, 0, 1, Decimal('50')),
+        })
+        with self.assertRaises(CommandError):
+            call_command('rebuild_shop_stats', shop='missing', stdout=io.StringIO())
+    
+    def test_stats_endpoint_sums_the_rollups(self):
+        today = self.place([(self.product_a, 2)])
+        earlier = self.place([(self.product_a, 1)], days_ago=3)
+        run_pending()
+        self.move(earlier, 'delivered')
+        self.move(today, 'confirmed')
+        
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        response = client.get('/api/shops/shop-a/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['total_orders'], response.data['pending_orders'],
+                          response.data['total_revenue']), (2, 1, Decimal('100')))
+
+
+class ProductImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        cls.shop = Shop.objects.create(owner=cls.seller, name='shop', slug='shop', phone='0800000000',
+                                       email='shop@example.com', address='addr', city='BKK', postal_code='10100')
+        cls.category = Category.objects.create(name='Gadgets')
+    
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+    
+    def upload(self, name, content, **data):
+        return self.client.post('/api/shops/shop/import_products/', {
+            'file': SimpleUploadedFile(name, content), **data
+        }, format='multipart')
+    
+    def test_csv_import_reports_bad_rows(self):
+        rows = ['name,description,price,stock,category']
+        rows += [f'Item {i},desc,{i + 1},5,Gadgets' for i in range(1200)]
+        rows += ['Free thing,desc,0,5,Gadgets', 'Lost,desc,10,5,Unknown']
+        
+        # Batched: the query count grows with batches of 500, not with rows
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload('products.csv', '\n'.join(rows).encode())
+        self.assertLess(len(queries), 60)
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (1200, 2))
+        self.assertEqual([error['row'] for error in response.data['errors']], [1202, 1203])
+        self.assertIn('price', response.data['errors'][0]['errors'])
+        self.assertEqual(Shop.objects.get(pk=self.shop.pk).total_products, 1200)
+        # Imported products are searchable right away
+        self.assertEqual(self.client.get('/api/products/', {'search': 'item'}).status_code, 200)
+        self.assertTrue(Product.objects.filter(name='Item 7', search_terms__term='item').exists())
+    
+    def test_zip_with_bundled_images(self):
+        image = io.BytesIO()
+        Image.new('RGB', (10, 10), 'red').save(image, 'PNG')
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as bundle:
+            bundle.writestr('images/red.png', image.getvalue())
+            bundle.writestr('products.jsonl', '\n'.join([
+                json.dumps({'name': 'Red', 'price': 10, 'category': self.category.id, 'image': 'images/red.png'}),
+                json.dumps({'name': 'Missing', 'price': 10, 'category': self.category.id, 'image': 'nope.png'}),
+                'not json',
+            ]))
+        
+        response = self.upload('bundle.zip', archive.getvalue())
+        
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 2))
+        product = Product.objects.get(name='Red')
+        self.assertTrue(product.image.name.startswith('products/red'))
+        self.assertTrue(product.image.storage.exists(product.image.name))
+        # Variants are made by the job worker
+        self.assertEqual(Job.objects.filter(name='core.image_variants').count(), 1)
+        run_pending()
+        self.assertTrue(product.image.storage.exists(variant_name(product.image.name, 200, 'webp')))
+    
+    def test_thai_excel_csv(self):
+        # Excel saves Thai CSV files as Windows-874 (TIS-620)
+        content = 'name,description,price,category\nเสื้อยืด,ผ้าฝ้าย “แท้”,199,Gadgets\n'.encode('cp874')
+        response = self.upload('products.csv', content)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Product.objects.get().description, 'ผ้าฝ้าย “แท้”')
+    
+    def test_unreadable_encoding_imports_nothing(self):
+        rows = 'name,price,category\n' + 'Item,1,Gadgets\n' * 3
+        response = self.upload('products.csv', rows.encode() + b'\xff\xfe,1,Gadgets\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('UTF-8', response.data['error'])
+        self.assertFalse(Product.objects.exists())
+    
+    @override_settings(PRODUCT_IMPORT_BATCH_SIZE=1)
+    def test_broken_csv_reports_what_was_imported(self):
+        huge = 'x' * 200_000
+        response = self.upload('products.csv', f'name,price,category\nA,1,Gadgets\n"{huge}",1,Gadgets\n'.encode())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('นำเข้าแล้ว 1 รายการ', response.data['error'])
+        self.assertEqual(Shop.objects.get(pk=self.shop.pk).total_products, 1)
+    
+    def test_only_the_owner_can_import(self):
+        self.client.force_authenticate(User.objects.create_user(
+            username='other', email='other@example.com', password='pass1234'
+        ))
+        response = self.upload('products.csv', b'name,price,category\nA,1,Gadgets')
+        self.assertEqual(response.status_code, 403)
+
+
+
+class ShopJobTests(TestCase):
+    """การนับสถิติร้านและการตั้งผู้ขายทำในคิวงาน ไม่ใช่ใน request"""
+    
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        self.category = Category.objects.create(name='Category')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+    
+    def test_open_shop_and_add_product(self):
+        response = self.client.post('/api/shops/', {
+            'name': 'My Shop', 'phone': '0800000000', 'email': 'shop@example.com',
+            'address': 'addr', 'city': 'BKK', 'postal_code': '10100',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        slug = response.data['slug']
+        response = self.client.post(f'/api/shops/{slug}/add_product/', {
+            'name': 'Item', 'description': 'desc', 'price': 10, 'category': self.category.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        
+        self.assertFalse(User.objects.get(pk=self.seller.pk).is_seller)
+        self.assertEqual(Shop.objects.get(slug=slug).total_products, 0)
+        
+        run_pending()
+        self.assertTrue(User.objects.get(pk=self.seller.pk).is_seller)
+        self.assertEqual(Shop.objects.get(slug=slug).total_products, 1)
@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import ShopViewSet
 
 router = DefaultRouter()
@@ -7,4 +8,6 @@ router.register(r'shops', ShopViewSet, basename='shop')
 
 urlpatterns = [
     path('', include(router.urls)),
+    # Async read-only fast path for ASGI deployments
+    path('async/shops/<slug:slug>/', async_views.shop_detail, name='async-shop-detail'),
 ]
\ No newline at end of file
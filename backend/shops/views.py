@@ -1,15 +1,37 @@
+from decimal import Decimal
+from django.db.models import Count, DecimalField, Exists, OuterRef, Sum, Value
+from django.db.models.functions import Coalesce
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from .imports import ImportFileError, ProductImporter
 from .models import Shop, ShopFollower
 from .serializers import ShopSerializer, CreateProductSerializer
+from core.counters import with_pending
+from core.fieldsets import FieldsetViewMixin
+from core.pagination import KeysetPagination
 from products.models import Product
+from products.pagination import ProductPagination
 from products.serializers import ProductSerializer
-from orders.models import Order
-from orders.serializers import OrderSerializer
+from orders.exports import export_response, filter_order_items
+from orders.models import Order, OrderItem
+from orders.serializers import OrderItemSerializer, ShopOrderSerializer
 
-class ShopViewSet(viewsets.ModelViewSet):
+def with_follower_info(queryset, user, count=True, following=True, total_sold=True):
+    """เติมจำนวนผู้ติดตามและสถานะการติดตามใน query เดียว (เฉพาะค่าที่ต้องใช้)"""
+    annotations = {}
+    if count:
+        annotations['follower_total'] = Count('followers')
+    if following:
+        if user.is_authenticated:
+            annotations['followed_by_user'] = Exists(ShopFollower.objects.filter(shop=OuterRef('pk'), user=user))
+        else:
+            annotations['followed_by_user'] = Value(False)
+    queryset = queryset.select_related('owner').annotate(**annotations)
+    return with_pending(queryset, *(['total_sold'] if total_sold else []))
+
+class ShopViewSet(FieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Shop.objects.filter(is_active=True)
     serializer_class = ShopSerializer
     lookup_field = 'slug'
@@ -26,13 +48,22 @@ class ShopViewSet(viewsets.ModelViewSet):
         if self.action == 'my_shop':
             return queryset.filter(owner=self.request.user)
         
-        return queryset
+        return self.with_follower_info(queryset)
+    
+    def with_follower_info(self, queryset):
+        if self.action not in ['list', 'retrieve', 'my_shop']:
+            # Actions that only look the shop up; ?fields= is about their own output
+            return with_follower_info(queryset, self.request.user)
+        return self.sparse(with_follower_info(
+            queryset, self.request.user, count=self.wants('follower_count'),
+            following=self.wants('is_following'), total_sold=self.wants('total_sold'),
+        ))
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_shop(self, request):
         """ดูร้านค้าของตัวเอง"""
         try:
-            shop = Shop.objects.get(owner=request.user)
+            shop = self.with_follower_info(Shop.objects.all()).get(owner=request.user)
             serializer = self.get_serializer(shop)
             return Response(serializer.data)
         except Shop.DoesNotExist:
@@ -42,16 +73,14 @@ class ShopViewSet(viewsets.ModelViewSet):
     def products(self, request, slug=None):
         """ดูสินค้าทั้งหมดของร้าน"""
         shop = self.get_object()
-        products = Product.objects.filter(shop=shop)
-        
-        # Pagination
-        page = self.paginate_queryset(products)
-        if page is not None:
-            serializer = ProductSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        counters = [field for field in ('stock', 'sold') if self.wants(field)]
+        products = with_pending(Product.objects.filter(shop=shop).select_related('category', 'shop'), *counters)
+        
+        paginator = ProductPagination()
+        products = self.sparse(products, ProductSerializer, paginator)
+        page = paginator.paginate_queryset(products, request, view=self)
+        serializer = ProductSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def add_product(self, request, slug=None):
@@ -69,6 +98,26 @@ class ShopViewSet(viewsets.ModelViewSet):
             return Response(ProductSerializer(product).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def import_products(self, request, slug=None):
+        """นำเข้าสินค้าจำนวนมากจากไฟล์ CSV/JSONL (หรือ zip ที่มีรูปภาพ)"""
+        shop = self.get_object()
+        
+        if shop.owner != request.user:
+            return Response({'error': 'คุณไม่มีสิทธิ์เพิ่มสินค้าในร้านนี้'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'กรุณาแนบไฟล์สินค้า'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            report = ProductImporter(shop).run(upload, request.data.get('file_format') or None)
+        except ImportFileError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST)
+    
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def orders(self, request, slug=None):
         """ดูคำสั่งซื้อทั้งหมดของร้าน"""
@@ -79,16 +128,34 @@ class ShopViewSet(viewsets.ModelViewSet):
             return Response({'error': 'คุณไม่มีสิทธิ์ดูข้อมูลนี้'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
-        # Get orders that contain products from this shop
-        orders = Order.objects.filter(items__product__shop=shop).distinct()
+        # Orders with lines from this shop, via the (shop, order) index on
+        # OrderItem; only this shop's lines and subtotal are returned
+        orders = Order.objects.filter(items__shop=shop).annotate(shop_subtotal=Sum('items__subtotal'))
+        items = self.prefetch(Order, 'items', OrderItem.objects.filter(shop=shop), OrderItemSerializer,
+                              to_attr='shop_items')
+        if items is not None:
+            orders = orders.prefetch_related(items)
+        
+        paginator = KeysetPagination()
+        orders = self.sparse(orders, ShopOrderSerializer, paginator)
+        page = paginator.paginate_queryset(orders, request, view=self)
+        serializer = ShopOrderSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+    
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def export_orders(self, request, slug=None):
+        """ดาวน์โหลดรายการขายของร้านเป็น CSV/JSONL"""
+        shop = self.get_object()
         
-        page = self.paginate_queryset(orders)
-        if page is not None:
-            serializer = OrderSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        if shop.owner != request.user:
+            return Response({'error': 'คุณไม่มีสิทธิ์ดูข้อมูลนี้'}, 
+                          status=status.HTTP_403_FORBIDDEN)
         
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        # The shop filter comes from the URL, not the query string
+        params = request.query_params.copy()
+        params.pop('shop', None)
+        items = filter_order_items(OrderItem.objects.filter(shop=shop), params)
+        return export_response(items, request.query_params.get('file_format', 'csv'), name=f'orders-{shop.slug}')
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def follow(self, request, slug=None):
@@ -127,17 +194,18 @@ class ShopViewSet(viewsets.ModelViewSet):
             return Response({'error': 'คุณไม่มีสิทธิ์ดูข้อมูลนี้'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
+        # Read the per-day rollups instead of scanning the order history
+        totals = shop.daily_stats.aggregate(
+            total_orders=Coalesce(Sum('total_orders'), 0),
+            total_revenue=Coalesce(Sum('revenue'), Value(Decimal('0')), output_field=DecimalField()),
+            pending_orders=Coalesce(Sum('pending_orders'), 0),
+        )
+        
         stats = {
             'total_products': shop.products.count(),
-            'total_orders': Order.objects.filter(items__product__shop=shop).distinct().count(),
-            'total_revenue': sum(order.total for order in Order.objects.filter(
-                items__product__shop=shop, 
-                status='delivered'
-            ).distinct()),
-            'pending_orders': Order.objects.filter(
-                items__product__shop=shop, 
-                status__in=['pending', 'confirmed']
-            ).distinct().count(),
+            'total_orders': totals['total_orders'],
+            'total_revenue': totals['total_revenue'],
+            'pending_orders': totals['pending_orders'],
             'followers': shop.followers.count(),
         }
         
@@ -12,11 +12,19 @@ const ProductCard = ({ product }) => {
     >
       {/* Product Image */}
       <div className="relative overflow-hidden bg-gray-100">
-        <img
-          src={product.image || 'https://images.unsplash.com/photo-1505740420928-5e560c06d30e?w=300&h=300&fit=crop'}
-          alt={product.name}
-          className="w-full h-64 object-cover group-hover:scale-110 transition-transform duration-300"
-        />
+        <picture>
+          {product.image_srcset && (
+            <source type="image/webp" srcSet={product.image_srcset.webp} sizes="(min-width: 1024px) 200px, 50vw" />
+          )}
+          <img
+            src={product.image || 'https://images.unsplash.com/photo-1505740420928-5e560c06d30e?w=300&h=300&fit=crop'}
+            srcSet={product.image_srcset?.jpeg}
+            sizes="(min-width: 1024px) 200px, 50vw"
+            loading="lazy"
+            alt={product.name}
+            className="w-full h-64 object-cover group-hover:scale-110 transition-transform duration-300"
+          />
+        </picture>
         
         {/* Discount Badge */}
         {product.discount_percentage > 0 && (
@@ -1,28 +1,8 @@
-import { useState, useEffect } from 'react';
 import ProductCard from './ProductCard';
-import { getProducts } from '../services/api';
-
-const ProductList = () => {
-  const [products, setProducts] = useState([]);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    fetchProducts();
-  }, []);
-
-  const fetchProducts = async () => {
-    try {
-      const response = await getProducts();
-      setProducts(response.data);
-    } catch (error) {
-      console.error('Error fetching products:', error);
-      // ถ้า API ยังไม่พร้อม ใช้ข้อมูลตัวอย่าง
-      setProducts(dummyProducts);
-    } finally {
-      setLoading(false);
-    }
-  };
 
+// Renders one section of the home page feed (see HomePage); `products` is
+// null when the feed could not be loaded
+const ProductList = ({ title = 'สินค้าแนะนำ', products = null, loading = false, showMore = false }) => {
   // ข้อมูลตัวอย่างกรณี Backend ยังไม่พร้อม
   const dummyProducts = [
     {
@@ -115,6 +95,8 @@ const ProductList = () => {
     },
   ];
 
+  const items = products || dummyProducts;
+
   if (loading) {
     return (
       <div className="container mx-auto px-4 py-8">
@@ -133,23 +115,25 @@ const ProductList = () => {
         {/* Section Header */}
         <div className="bg-white p-4 mb-4 flex items-center">
           <h2 className="text-[#ee4d2d] text-lg font-semibold uppercase">
-            สินค้าแนะนำ
+            {title}
           </h2>
         </div>
 
         {/* Products Grid */}
         <div className="grid grid-cols-2 md:grid-cols-4 lg:grid-cols-6 gap-3">
-          {products.map((product) => (
+          {items.map((product) => (
             <ProductCard key={product.id} product={product} />
           ))}
         </div>
 
         {/* Load More Button */}
-        <div className="text-center mt-8">
-          <button className="bg-white border border-gray-300 hover:bg-gray-50 px-16 py-3 text-gray-700">
-            ดูเพิ่มเติม
-          </button>
-        </div>
+        {showMore && (
+          <div className="text-center mt-8">
+            <button className="bg-white border border-gray-300 hover:bg-gray-50 px-16 py-3 text-gray-700">
+              ดูเพิ่มเติม
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { useNavigate, Link } from 'react-router-dom';
 import { useCart } from '../context/CartContext';
 import { useAuth } from '../context/AuthContext';
@@ -24,8 +24,56 @@ const CheckoutPage = () => {
   const [paymentMethod, setPaymentMethod] = useState('cod');
   const [loading, setLoading] = useState(false);
 
+  const [reservation, setReservation] = useState(null);
+  const [reservationError, setReservationError] = useState('');
+  const orderPlaced = useRef(false);
+
   const selectedItems = cartItems.filter(item => item.selected);
   const subtotal = getTotal();
+
+  // จองสต็อกไว้ระหว่างกรอกข้อมูล (ปล่อยคืนเมื่อออกจากหน้าโดยไม่สั่งซื้อ)
+  const reservationItems = JSON.stringify(
+    selectedItems.map(item => ({ product_id: item.id, quantity: item.quantity }))
+  );
+
+  useEffect(() => {
+    const items = JSON.parse(reservationItems);
+    if (!isAuthenticated || items.length === 0) return;
+
+    const token = localStorage.getItem('access_token');
+    let held = null;
+    let cancelled = false;
+
+    fetch('http://localhost:8000/api/reservations/', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token}`
+      },
+      body: JSON.stringify({ items })
+    })
+      .then(async (response) => {
+        const result = await response.json();
+        if (response.ok) {
+          held = result;
+          if (!cancelled) setReservation(result);
+        } else if (!cancelled) {
+          setReservationError(result.items || result.detail || 'ไม่สามารถจองสินค้าได้');
+        }
+      })
+      .catch((error) => console.error('Error reserving stock:', error));
+
+    return () => {
+      cancelled = true;
+      if (held && !orderPlaced.current) {
+        fetch(`http://localhost:8000/api/reservations/${held.id}/`, {
+          method: 'DELETE',
+          headers: { 'Authorization': `Bearer ${token}` }
+        }).catch(() => {});
+      }
+    };
+  }, [reservationItems, isAuthenticated]);
+
   const shippingFee = subtotal >= 200 ? 0 : 30;
   const discount = 0;
   const total = subtotal + shippingFee - discount;
@@ -60,6 +108,7 @@ const CheckoutPage = () => {
         district: shippingInfo.district,
         postal_code: shippingInfo.postalCode,
         payment_method: paymentMethod,
+        ...(reservation && { reservation_id: reservation.id }),
         items: selectedItems.map(item => ({
           product_id: item.id,
           quantity: item.quantity,
@@ -81,12 +130,13 @@ const CheckoutPage = () => {
       const result = await response.json();
 
       if (response.ok) {
+        orderPlaced.current = true;
         alert(`สั่งซื้อสำเร็จ! 🎉\n\nเลขที่คำสั่งซื้อ: ${result.order_number}\nยอดรวม: ฿${result.total}`);
         clearCart();
         navigate('/');
       } else {
         console.error('Error response:', result);
-        alert('เกิดข้อผิดพลาด: ' + (result.detail || result.error || 'ไม่สามารถสั่งซื้อได้'));
+        alert('เกิดข้อผิดพลาด: ' + (result.detail || result.error || result.items || result.reservation_id || 'ไม่สามารถสั่งซื้อได้'));
       }
     } catch (error) {
       console.error('Error:', error);
@@ -161,6 +211,18 @@ const CheckoutPage = () => {
           </div>
         </div>
 
+        {/* Stock Reservation */}
+        {reservation && (
+          <div className="mb-6 bg-green-50 border border-green-200 text-green-700 text-sm rounded-lg px-4 py-3">
+            สินค้าถูกจองไว้ให้คุณถึงเวลา {new Date(reservation.expires_at).toLocaleTimeString('th-TH', { hour: '2-digit', minute: '2-digit' })} น.
+          </div>
+        )}
+        {reservationError && (
+          <div className="mb-6 bg-red-50 border border-red-200 text-red-700 text-sm rounded-lg px-4 py-3">
+            {reservationError}
+          </div>
+        )}
+
         <form onSubmit={handleSubmit}>
           <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
             {/* Left Column */}
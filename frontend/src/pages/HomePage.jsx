@@ -1,9 +1,30 @@
+import { useState, useEffect } from 'react';
 import Navbar from '../components/Navbar';
 import CategoryGrid from '../components/CategoryGrid';
 import BannerCarousel from '../components/BannerCarousel';
 import ProductList from '../components/ProductList';
+import { getHomeFeed } from '../services/api';
 
 const HomePage = () => {
+  // Every section comes from one precomputed response (GET /api/home/)
+  const [feed, setFeed] = useState(null);
+  const [loading, setLoading] = useState(true);
+
+  useEffect(() => {
+    fetchFeed();
+  }, []);
+
+  const fetchFeed = async () => {
+    try {
+      const response = await getHomeFeed();
+      setFeed(response.data);
+    } catch (error) {
+      console.error('Error fetching home feed:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   return (
     <div className="min-h-screen bg-gray-100">
       {/* Navbar */}
@@ -15,7 +36,7 @@ const HomePage = () => {
       </div>
 
       {/* Categories */}
-      <CategoryGrid />
+      <CategoryGrid categories={feed?.categories} />
 
       {/* Flash Sale Section */}
       <div className="container mx-auto px-4 py-6">
@@ -67,8 +88,14 @@ const HomePage = () => {
         </div>
       </div>
 
-      {/* Product List */}
-      <ProductList />
+      {/* Product Sections */}
+      <ProductList title="สินค้าขายดี" products={feed?.best_sellers ?? null} loading={loading} showMore />
+      {feed?.new_arrivals?.length > 0 && (
+        <ProductList title="สินค้าใหม่" products={feed.new_arrivals} />
+      )}
+      {feed?.by_category?.map((section) => (
+        <ProductList key={section.id} title={`ขายดีในหมวด ${section.name}`} products={section.products} />
+      ))}
 
       {/* Footer */}
       <footer className="bg-white mt-8 border-t">
@@ -9,6 +9,8 @@ const OrdersPage = () => {
   const { user, isAuthenticated } = useAuth();
   const [orders, setOrders] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextUrl, setNextUrl] = useState(null);
   const [activeTab, setActiveTab] = useState('all');
 
   useEffect(() => {
@@ -19,11 +21,19 @@ const OrdersPage = () => {
     fetchOrders();
   }, [isAuthenticated, navigate]);
 
-  const fetchOrders = async () => {
-    setLoading(true);
+  // Only the columns this list renders
+  const fields = [
+    'id', 'order_number', 'created_at', 'status', 'payment_status', 'payment_method_display', 'total',
+    'items.id', 'items.product_image', 'items.product_name', 'items.variant', 'items.quantity', 'items.subtotal',
+  ].join(',');
+
+  // คำสั่งซื้อแบ่งหน้าแบบ cursor: หน้าถัดไปต่อท้ายรายการเดิม
+  const fetchOrders = async (url = `http://localhost:8000/api/orders/?fields=${fields}`) => {
+    const more = url.includes('cursor=');
+    more ? setLoadingMore(true) : setLoading(true);
     try {
       const token = localStorage.getItem('access_token');
-      const response = await fetch('http://localhost:8000/api/orders/', {
+      const response = await fetch(url, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
@@ -31,14 +41,16 @@ const OrdersPage = () => {
 
       if (response.ok) {
         const data = await response.json();
-        setOrders(data.results || data);
+        const results = data.results || data;
+        setOrders((prev) => (more ? [...prev, ...results] : results));
+        setNextUrl(data.next || null);
       } else {
         console.error('Failed to fetch orders');
       }
     } catch (error) {
       console.error('Error:', error);
     } finally {
-      setLoading(false);
+      more ? setLoadingMore(false) : setLoading(false);
     }
   };
 
@@ -246,6 +258,18 @@ const OrdersPage = () => {
             </Link>
           </div>
         )}
+
+        {!loading && nextUrl && (
+          <div className="text-center mt-6">
+            <button
+              onClick={() => fetchOrders(nextUrl)}
+              disabled={loadingMore}
+              className="px-16 py-3 bg-white border border-gray-300 hover:bg-gray-50 text-gray-700 rounded-lg disabled:opacity-50"
+            >
+              {loadingMore ? 'กำลังโหลด...' : 'ดูคำสั่งซื้อเพิ่มเติม'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
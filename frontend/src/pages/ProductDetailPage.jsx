@@ -4,23 +4,30 @@ import { StarIcon, HeartIcon, ShoppingCartIcon, TruckIcon, ShieldCheckIcon } fro
 import { StarIcon as StarIconSolid } from '@heroicons/react/24/solid';
 import Navbar from '../components/Navbar';
 import ProductCard from '../components/ProductCard';
+import { PRODUCT_CARD_FIELDS } from '../services/api';
 import { useCart } from '../context/CartContext';
+import { useAuth } from '../context/AuthContext';
 import axios from 'axios';
 
 const ProductDetailPage = () => {
   const { id } = useParams();
   const navigate = useNavigate();
   const { addToCart } = useCart();
+  const { isAuthenticated } = useAuth();
   const [product, setProduct] = useState(null);
   const [relatedProducts, setRelatedProducts] = useState([]);
   const [selectedImage, setSelectedImage] = useState(0);
   const [quantity, setQuantity] = useState(1);
   const [selectedVariant, setSelectedVariant] = useState(null);
   const [activeTab, setActiveTab] = useState('description');
+  const [reviews, setReviews] = useState([]);
+  const [reviewsNext, setReviewsNext] = useState(null);
+  const [reviewForm, setReviewForm] = useState({ rating: 5, comment: '' });
 
   useEffect(() => {
     fetchProduct();
     fetchRelatedProducts();
+    fetchReviews();
   }, [id]);
 
   const fetchProduct = async () => {
@@ -33,10 +40,36 @@ const ProductDetailPage = () => {
     }
   };
 
+  // รีวิวแบ่งหน้าแบบ cursor: หน้าถัดไปต่อท้ายรายการเดิม
+  const fetchReviews = async (url = `http://localhost:8000/api/reviews/?product=${id}`) => {
+    try {
+      const response = await axios.get(url);
+      setReviews((prev) => (url.includes('cursor=') ? [...prev, ...response.data.results] : response.data.results));
+      setReviewsNext(response.data.next);
+    } catch (error) {
+      console.error('Error fetching reviews:', error);
+    }
+  };
+
+  const handleSubmitReview = async (e) => {
+    e.preventDefault();
+    try {
+      const token = localStorage.getItem('access_token');
+      await axios.post('http://localhost:8000/api/reviews/', { product: id, ...reviewForm }, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      setReviewForm({ rating: 5, comment: '' });
+      fetchReviews();
+      fetchProduct();
+    } catch (error) {
+      alert(error.response?.data?.product || 'ไม่สามารถส่งรีวิวได้');
+    }
+  };
+
   const fetchRelatedProducts = async () => {
     try {
-      const response = await axios.get('http://localhost:8000/api/products/');
-      setRelatedProducts(response.data.slice(0, 6));
+      const response = await axios.get(`http://localhost:8000/api/products/?page_size=6&fields=${PRODUCT_CARD_FIELDS}`);
+      setRelatedProducts((response.data.results || response.data).slice(0, 6));
     } catch (error) {
       setRelatedProducts(dummyRelatedProducts);
     }
@@ -206,6 +239,9 @@ const ProductDetailPage = () => {
                     </div>
                   </div>
                 </div>
+                <div className="border-l pl-6">
+                  <span className="text-gray-600">{product.review_count || 0} รีวิว</span>
+                </div>
                 <div className="border-l pl-6">
                   <span className="text-gray-600">{product.sold} ขายแล้ว</span>
                 </div>
@@ -361,8 +397,76 @@ const ProductDetailPage = () => {
               )}
 
               {activeTab === 'reviews' && (
-                <div className="text-center py-8 text-gray-500">
-                  ยังไม่มีรีวิว
+                <div className="space-y-6">
+                  {product.rating_histogram && (
+                    <div className="bg-gray-50 p-4 rounded-lg space-y-1">
+                      {[5, 4, 3, 2, 1].map((star) => (
+                        <div key={star} className="flex items-center gap-2 text-sm text-gray-600">
+                          <span className="w-12">{star} ดาว</span>
+                          <div className="flex-1 bg-gray-200 h-2 rounded">
+                            <div
+                              className="bg-[#ee4d2d] h-2 rounded"
+                              style={{ width: `${product.review_count ? (product.rating_histogram[star] / product.review_count) * 100 : 0}%` }}
+                            />
+                          </div>
+                          <span className="w-10 text-right">{product.rating_histogram[star]}</span>
+                        </div>
+                      ))}
+                    </div>
+                  )}
+
+                  {isAuthenticated && (
+                    <form onSubmit={handleSubmitReview} className="space-y-3">
+                      <div className="flex gap-1">
+                        {[1, 2, 3, 4, 5].map((star) => (
+                          <button type="button" key={star} onClick={() => setReviewForm({ ...reviewForm, rating: star })}>
+                            <StarIconSolid className={`w-6 h-6 ${star <= reviewForm.rating ? 'text-[#ee4d2d]' : 'text-gray-300'}`} />
+                          </button>
+                        ))}
+                      </div>
+                      <textarea
+                        value={reviewForm.comment}
+                        onChange={(e) => setReviewForm({ ...reviewForm, comment: e.target.value })}
+                        className="w-full border border-gray-300 rounded-lg p-3 text-sm"
+                        rows={3}
+                        placeholder="เขียนรีวิวสินค้านี้"
+                      />
+                      <button type="submit" className="bg-[#ee4d2d] text-white px-4 py-2 rounded-lg text-sm hover:bg-[#d73211]">
+                        ส่งรีวิว
+                      </button>
+                    </form>
+                  )}
+
+                  {reviews.length > 0 ? (
+                    <div className="divide-y">
+                      {reviews.map((review) => (
+                        <div key={review.id} className="py-4">
+                          <div className="flex items-center gap-2 text-sm">
+                            <span className="font-medium text-gray-800">{review.username}</span>
+                            <div className="flex">
+                              {[...Array(5)].map((_, i) => (
+                                <StarIconSolid
+                                  key={i}
+                                  className={`w-3 h-3 ${i < review.rating ? 'text-[#ee4d2d]' : 'text-gray-300'}`}
+                                />
+                              ))}
+                            </div>
+                          </div>
+                          <p className="text-gray-700 text-sm mt-1">{review.comment}</p>
+                        </div>
+                      ))}
+                    </div>
+                  ) : (
+                    <div className="text-center py-8 text-gray-500">
+                      ยังไม่มีรีวิว
+                    </div>
+                  )}
+
+                  {reviewsNext && (
+                    <button onClick={() => fetchReviews(reviewsNext)} className="w-full text-[#ee4d2d] text-sm hover:underline">
+                      ดูรีวิวเพิ่มเติม
+                    </button>
+                  )}
                 </div>
               )}
             </div>
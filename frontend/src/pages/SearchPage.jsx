@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react';
 import { useSearchParams, Link } from 'react-router-dom';
 import Navbar from '../components/Navbar';
 import ProductCard from '../components/ProductCard';
+import { PRODUCT_CARD_FIELDS } from '../services/api';
 import { FunnelIcon, AdjustmentsHorizontalIcon } from '@heroicons/react/24/outline';
 import axios from 'axios';
 
@@ -9,7 +10,10 @@ const SearchPage = () => {
   const [searchParams, setSearchParams] = useSearchParams();
   const [products, setProducts] = useState([]);
   const [categories, setCategories] = useState([]);
+  const [facets, setFacets] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextUrl, setNextUrl] = useState(null);
   const [showFilters, setShowFilters] = useState(true);
 
   // Filter states
@@ -50,17 +54,39 @@ const SearchPage = () => {
       if (filters.maxPrice) params.append('max_price', filters.maxPrice);
       if (filters.minRating) params.append('min_rating', filters.minRating);
       if (filters.sortBy) params.append('ordering', filters.sortBy);
+      // จำนวนสินค้าต่อหมวดหมู่/คะแนน และกราฟช่วงราคา มากับ response เดียวกัน
+      params.append('facets', '1');
+      params.append('fields', PRODUCT_CARD_FIELDS);
 
       const response = await axios.get(`http://localhost:8000/api/products/?${params}`);
       setProducts(response.data.results || response.data);
+      setNextUrl(response.data.next || null);
+      setFacets(response.data.facets || null);
     } catch (error) {
       console.error('Error fetching products:', error);
       setProducts([]);
+      setNextUrl(null);
     } finally {
       setLoading(false);
     }
   };
 
+  // หน้าถัดไป (cursor) ต่อท้ายรายการเดิม; facets ของตัวกรองชุดนี้มีแล้ว
+  const fetchMoreProducts = async () => {
+    setLoadingMore(true);
+    try {
+      const url = new URL(nextUrl);
+      url.searchParams.delete('facets');
+      const response = await axios.get(url.toString());
+      setProducts((prev) => [...prev, ...response.data.results]);
+      setNextUrl(response.data.next || null);
+    } catch (error) {
+      console.error('Error fetching products:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleFilterChange = (key, value) => {
     const newFilters = { ...filters, [key]: value };
     setFilters(newFilters);
@@ -117,7 +143,7 @@ const SearchPage = () => {
                 {filters.search ? `ผลการค้นหา "${filters.search}"` : 'สินค้าทั้งหมด'}
               </h1>
               <p className="text-sm text-gray-600 mt-1">
-                พบ {products.length} รายการ
+                พบ {facets ? facets.total : products.length} รายการ
               </p>
             </div>
 
@@ -170,6 +196,11 @@ const SearchPage = () => {
                         className="w-4 h-4 text-[#ee4d2d]"
                       />
                       <span className="ml-2 text-gray-700">{cat.name}</span>
+                      {facets && (
+                        <span className="ml-auto text-xs text-gray-400">
+                          {facets.category.find((row) => row.id === cat.id)?.count || 0}
+                        </span>
+                      )}
                     </label>
                   ))}
                 </div>
@@ -179,6 +210,23 @@ const SearchPage = () => {
               <div className="mb-6">
                 <h3 className="font-semibold text-gray-700 mb-3">ช่วงราคา</h3>
                 <div className="space-y-3">
+                  {/* Price Histogram: click a bar to filter by its range */}
+                  {facets?.price.buckets.length > 0 && (
+                    <div className="flex items-end gap-1 h-16">
+                      {facets.price.buckets.map((bucket) => (
+                        <button
+                          key={bucket.from}
+                          title={`฿${bucket.from} - ฿${bucket.to}: ${bucket.count} รายการ`}
+                          onClick={() => {
+                            handleFilterChange('minPrice', String(bucket.from));
+                            handleFilterChange('maxPrice', String(bucket.to));
+                          }}
+                          className="flex-1 bg-orange-200 hover:bg-[#ee4d2d] rounded-t"
+                          style={{ height: `${(bucket.count / Math.max(...facets.price.buckets.map((b) => b.count))) * 100}%` }}
+                        />
+                      ))}
+                    </div>
+                  )}
                   <div className="flex items-center gap-2">
                     <input
                       type="number"
@@ -258,6 +306,11 @@ const SearchPage = () => {
                           </span>
                         ))}
                         <span className="ml-1 text-sm text-gray-600">ขึ้นไป</span>
+                        {facets && (
+                          <span className="ml-2 text-xs text-gray-400">
+                            ({facets.rating.find((row) => row.min_rating === rating)?.count || 0})
+                          </span>
+                        )}
                       </div>
                     </label>
                   ))}
@@ -320,6 +373,18 @@ const SearchPage = () => {
                 </button>
               </div>
             )}
+
+            {!loading && nextUrl && (
+              <div className="text-center mt-6">
+                <button
+                  onClick={fetchMoreProducts}
+                  disabled={loadingMore}
+                  className="px-16 py-3 bg-white border border-gray-300 hover:bg-gray-50 text-gray-700 rounded-lg disabled:opacity-50"
+                >
+                  {loadingMore ? 'กำลังโหลด...' : 'ดูสินค้าเพิ่มเติม'}
+                </button>
+              </div>
+            )}
           </div>
         </div>
       </div>
@@ -78,6 +78,29 @@ const SellerDashboardPage = () => {
     }
   };
 
+  // ดาวน์โหลดประวัติคำสั่งซื้อของร้านเป็นไฟล์ CSV
+  const handleExportOrders = async () => {
+    try {
+      const token = localStorage.getItem('access_token');
+      const response = await fetch(`http://localhost:8000/api/shops/${shop.slug}/export_orders/?file_format=csv`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      if (!response.ok) {
+        alert('ไม่สามารถดาวน์โหลดคำสั่งซื้อได้');
+        return;
+      }
+      const filename = response.headers.get('Content-Disposition')?.match(/filename="(.+)"/)?.[1] || 'orders.csv';
+      const url = URL.createObjectURL(await response.blob());
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = filename;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      console.error('Error:', error);
+    }
+  };
+
   if (loading) {
     return (
       <div className="min-h-screen bg-gray-100">
@@ -172,9 +195,14 @@ const SellerDashboardPage = () => {
           <div className="bg-white rounded-lg shadow-sm p-6">
             <div className="flex items-center justify-between mb-4">
               <h2 className="text-lg font-semibold text-gray-800">คำสั่งซื้อล่าสุด</h2>
-              <Link to="/seller/orders" className="text-[#ee4d2d] text-sm hover:underline">
-                ดูทั้งหมด
-              </Link>
+              <div className="flex items-center gap-4">
+                <button onClick={handleExportOrders} className="text-gray-600 text-sm hover:text-[#ee4d2d] hover:underline">
+                  ดาวน์โหลด CSV
+                </button>
+                <Link to="/seller/orders" className="text-[#ee4d2d] text-sm hover:underline">
+                  ดูทั้งหมด
+                </Link>
+              </div>
             </div>
 
             {orders.length > 0 ? (
@@ -190,7 +218,7 @@ const SellerDashboardPage = () => {
                     <div className="flex items-center justify-between">
                       <span className="text-sm text-gray-600">{order.items?.length} รายการ</span>
                       <span className="font-semibold text-[#ee4d2d]">
-                        ฿{parseFloat(order.total).toFixed(2)}
+                        ฿{parseFloat(order.shop_subtotal).toFixed(2)}
                       </span>
                     </div>
                   </div>
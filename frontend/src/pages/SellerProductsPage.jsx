@@ -15,8 +15,11 @@ const SellerProductsPage = () => {
   const { isAuthenticated } = useAuth();
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextUrl, setNextUrl] = useState(null);
   const [filter, setFilter] = useState('all');
   const [searchQuery, setSearchQuery] = useState('');
+  const [importing, setImporting] = useState(false);
 
   useEffect(() => {
     if (!isAuthenticated) {
@@ -26,17 +29,21 @@ const SellerProductsPage = () => {
     fetchProducts();
   }, [isAuthenticated, navigate]);
 
-  const fetchProducts = async () => {
-    setLoading(true);
+  // สินค้าแบ่งหน้าแบบ cursor: หน้าถัดไปต่อท้ายรายการเดิม
+  const fetchProducts = async (url = 'http://localhost:8000/api/products/my_products/') => {
+    const more = url.includes('cursor=');
+    more ? setLoadingMore(true) : setLoading(true);
     try {
       const token = localStorage.getItem('access_token');
-      const response = await fetch('http://localhost:8000/api/products/my_products/', {
+      const response = await fetch(url, {
         headers: { 'Authorization': `Bearer ${token}` }
       });
 
       if (response.ok) {
         const data = await response.json();
-        setProducts(data.results || data);
+        const results = data.results || data;
+        setProducts((prev) => (more ? [...prev, ...results] : results));
+        setNextUrl(data.next || null);
       } else if (response.status === 404) {
         // ยังไม่มีร้านค้า
         alert('กรุณาสร้างร้านค้าก่อน');
@@ -47,7 +54,52 @@ const SellerProductsPage = () => {
     } catch (error) {
       console.error('Error:', error);
     } finally {
-      setLoading(false);
+      more ? setLoadingMore(false) : setLoading(false);
+    }
+  };
+
+  // นำเข้าสินค้าจำนวนมากจากไฟล์ CSV / JSONL / ZIP (พร้อมรูปภาพ)
+  const handleImport = async (e) => {
+    const file = e.target.files[0];
+    e.target.value = '';
+    if (!file) return;
+
+    setImporting(true);
+    try {
+      const token = localStorage.getItem('access_token');
+      const shopResponse = await fetch('http://localhost:8000/api/shops/my_shop/', {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      if (!shopResponse.ok) {
+        alert('กรุณาสร้างร้านค้าก่อน');
+        return;
+      }
+      const shop = await shopResponse.json();
+
+      const formData = new FormData();
+      formData.append('file', file);
+      const response = await fetch(`http://localhost:8000/api/shops/${shop.slug}/import_products/`, {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${token}` },
+        body: formData
+      });
+      const report = await response.json();
+
+      if (report.error) {
+        alert('เกิดข้อผิดพลาด: ' + report.error);
+        return;
+      }
+      const failedRows = report.errors
+        .slice(0, 10)
+        .map(error => `แถว ${error.row}: ${Object.values(error.errors).flat().join(', ')}`)
+        .join('\n');
+      alert(`นำเข้าสำเร็จ ${report.created} รายการ, ไม่สำเร็จ ${report.failed} รายการ` + (failedRows ? `\n\n${failedRows}` : ''));
+      fetchProducts();
+    } catch (error) {
+      console.error('Error:', error);
+      alert('เกิดข้อผิดพลาดในการเชื่อมต่อ');
+    } finally {
+      setImporting(false);
     }
   };
 
@@ -114,13 +166,25 @@ const SellerProductsPage = () => {
             <h1 className="text-2xl font-semibold text-gray-800">จัดการสินค้า</h1>
             <p className="text-gray-600 mt-1">จัดการสินค้าทั้งหมดของคุณ</p>
           </div>
-          <Link
-            to="/seller/products/add"
-            className="flex items-center gap-2 bg-[#ee4d2d] text-white px-6 py-3 rounded-lg hover:bg-[#d73211] font-semibold"
-          >
-            <PlusIcon className="w-5 h-5" />
-            เพิ่มสินค้าใหม่
-          </Link>
+          <div className="flex items-center gap-3">
+            <label className="flex items-center gap-2 border border-[#ee4d2d] text-[#ee4d2d] px-6 py-3 rounded-lg hover:bg-orange-50 font-semibold cursor-pointer">
+              {importing ? 'กำลังนำเข้า...' : 'นำเข้าจากไฟล์'}
+              <input
+                type="file"
+                accept=".csv,.jsonl,.ndjson,.zip"
+                onChange={handleImport}
+                disabled={importing}
+                className="hidden"
+              />
+            </label>
+            <Link
+              to="/seller/products/add"
+              className="flex items-center gap-2 bg-[#ee4d2d] text-white px-6 py-3 rounded-lg hover:bg-[#d73211] font-semibold"
+            >
+              <PlusIcon className="w-5 h-5" />
+              เพิ่มสินค้าใหม่
+            </Link>
+          </div>
         </div>
 
         {/* Stats Cards */}
@@ -306,6 +370,18 @@ const SellerProductsPage = () => {
               )}
             </div>
           )}
+
+          {!loading && nextUrl && (
+            <div className="p-4 text-center border-t">
+              <button
+                onClick={() => fetchProducts(nextUrl)}
+                disabled={loadingMore}
+                className="px-16 py-2 bg-white border border-gray-300 hover:bg-gray-50 text-gray-700 rounded-lg disabled:opacity-50"
+              >
+                {loadingMore ? 'กำลังโหลด...' : 'ดูสินค้าเพิ่มเติม'}
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
@@ -9,6 +9,11 @@ export const api = axios.create({
   },
 });
 
-export const getProducts = () => api.get('/products/');
+// Only what ProductCard renders (?fields= narrows both the response and the query)
+export const PRODUCT_CARD_FIELDS = 'id,name,price,original_price,discount_percentage,rating,sold,stock,image,image_srcset';
+
+export const getProducts = () => api.get('/products/', { params: { fields: PRODUCT_CARD_FIELDS } });
 export const getCategories = () => api.get('/categories/');
+// Home page sections, rebuilt every few minutes by a background job
+export const getHomeFeed = () => api.get('/home/');
 export const getProductById = (id) => api.get(`/products/${id}/`);
\ No newline at end of file